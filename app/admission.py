@@ -0,0 +1,116 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Overloaded(Exception):
+    """Trop de calculs de prédiction en cours : la requête est refusée."""
+
+
+class ExplainStage:
+    """Étape d'explication d'une requête : créneau obtenu et échéance du budget."""
+
+    def __init__(self, admitted, deadline):
+        self.admitted = admitted
+        self.deadline = deadline
+
+    def remaining_s(self):
+        """Temps restant avant l'échéance (None : pas de budget)."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+class AdmissionControl:
+    """Limites de charge de /predict/ et budget de l'étape d'explication.
+
+    - `max_in_flight` calculs de prédiction au plus en même temps ; au-delà,
+      `admit()` lève Overloaded (réponse 503 avec Retry-After) ;
+    - `explain_concurrency` étapes d'explication (SHAP, rendu waterfall) au
+      plus en même temps, avec un budget de `explain_budget_ms` attente
+      comprise : une requête qui n'obtient pas de créneau à temps, ou dont le
+      budget est épuisé, reçoit son score sans explication (réponse dégradée).
+
+    Une limite ou un budget à 0 est désactivé.
+    """
+
+    def __init__(self, max_in_flight=64, explain_concurrency=4, explain_budget_ms=0):
+        self.max_in_flight = max_in_flight
+        self.explain_concurrency = explain_concurrency
+        self.explain_budget_ms = explain_budget_ms
+        self._explain_slots = (
+            threading.BoundedSemaphore(explain_concurrency)
+            if explain_concurrency > 0
+            else None
+        )
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.explain_running = 0
+        self.degraded = {}
+
+    @contextmanager
+    def admit(self):
+        """Réserve une place de calcul, ou lève Overloaded si tout est occupé."""
+        with self._lock:
+            if self.max_in_flight > 0 and self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                raise Overloaded(f"{self.in_flight} prédictions en cours")
+            self.in_flight += 1
+            self.admitted += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    @contextmanager
+    def explain_stage(self):
+        """Attend un créneau d'explication dans la limite du budget.
+
+        Produit un ExplainStage : `admitted` est faux si aucun créneau ne
+        s'est libéré avant l'échéance.
+        """
+        deadline = None
+        if self.explain_budget_ms > 0:
+            deadline = time.monotonic() + self.explain_budget_ms / 1000
+        slots = self._explain_slots
+        if slots is None:
+            admitted = True
+        elif deadline is None:
+            admitted = slots.acquire()
+        else:
+            admitted = slots.acquire(timeout=self.explain_budget_ms / 1000)
+        if admitted:
+            with self._lock:
+                self.explain_running += 1
+        try:
+            yield ExplainStage(admitted, deadline)
+        finally:
+            if admitted:
+                with self._lock:
+                    self.explain_running -= 1
+                if slots is not None:
+                    slots.release()
+
+    def degrade(self, reason):
+        """Compte une réponse dégradée (motif : "explain_saturated"...)."""
+        with self._lock:
+            self.degraded[reason] = self.degraded.get(reason, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "explain_concurrency": self.explain_concurrency,
+                "explain_running": self.explain_running,
+                "explain_budget_ms": self.explain_budget_ms,
+                "degraded": dict(self.degraded),
+            }
@@ -1,25 +1,43 @@
-from fastapi import FastAPI, Query, HTTPException
+import time
+
+# Début du démarrage : référence du détail des temps par phase (/ready)
+STARTUP_T0 = time.perf_counter()
+
+import asyncio
+from fastapi import FastAPI, Header, Query, HTTPException, Response
 from pydantic import BaseModel
+import numpy as np
 import pandas as pd
 import joblib
 import os
-import shap
 from sqlalchemy import create_engine, text
-import matplotlib
-
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-import io
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.concurrency import run_in_threadpool
 import base64
 from dotenv import load_dotenv
 import json
-import time
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Annotated, Any, Literal
+
+from app.admission import AdmissionControl, Overloaded
+from app.cache import LRUCache, SingleFlight, hash_row
+from app.explain_pool import ExplanationPool
+from app.explanation_store import ExplanationStore
+from app.explainer import fast_contributions, get_estimator
+from app.feature_cache import predict_proba_processed
+from app.feature_store import EmployeeStore
+from app.log_writer import LogWriter
+from app.model_registry import LoadedModel, ModelRegistry
+from app.reference_features import DERIVED_COLUMNS, SOURCE_COLUMNS, RowFeaturizer
+from app.sqlite_profile import apply_pragmas, create_sqlite_engine, sqlite_pragmas
+from app.tree_engine import FlatTreeEnsemble
+from app.waterfall import waterfall_png, waterfall_svg
 
 # Chargement variables d'environnement
 ENV = os.getenv("ENV", "dev")
 if ENV == "dev":
     load_dotenv(".env")
-    from psycopg2 import connect
 
 demo_user = os.getenv("DB_USER_DEMO")
 demo_pwd = os.getenv("DB_PW_DEMO")
@@ -31,9 +49,61 @@ db_name = os.getenv("DB_NAME")
 DB_TYPE = os.getenv("DB_TYPE", "postgresql")
 
 READONLY_DB = os.getenv("READONLY_DB", "0") == "1"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "2000"))
+SIMULATE_MAX_POINTS = int(os.getenv("SIMULATE_MAX_POINTS", "2000"))
+WATERFALL_CACHE_SIZE = int(os.getenv("WATERFALL_CACHE_SIZE", "256"))
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL_S = float(os.getenv("RESULT_CACHE_TTL_S", "300"))
+MODEL_VERSION = os.getenv("MODEL_VERSION", "1.0")
+LOG_ASYNC = os.getenv("LOG_ASYNC", "1") == "1"
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "200"))
+LOG_FLUSH_MS = int(os.getenv("LOG_FLUSH_MS", "500"))
+EMPLOYEE_STORE_REFRESH_S = float(os.getenv("EMPLOYEE_STORE_REFRESH_S", "30"))
+# SQLite : "production" (WAL, un écrivain, lecteurs en lecture seule) ou "basic"
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+SQLITE_READERS = int(os.getenv("SQLITE_READERS", "8"))
+SQLITE_PRAGMAS = {
+    "busy_timeout_ms": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_kb": int(os.getenv("SQLITE_CACHE_KB", "65536")),
+    "mmap_mb": int(os.getenv("SQLITE_MMAP_MB", "256")),
+}
+# Contrôle de charge de /predict/ (0 : pas de limite)
+PREDICT_MAX_IN_FLIGHT = int(os.getenv("PREDICT_MAX_IN_FLIGHT", "64"))
+PREDICT_RETRY_AFTER_S = int(os.getenv("PREDICT_RETRY_AFTER_S", "1"))
+EXPLAIN_MAX_CONCURRENCY = int(
+    os.getenv("EXPLAIN_MAX_CONCURRENCY", str(2 * (os.cpu_count() or 1)))
+)
+EXPLAIN_BUDGET_MS = float(os.getenv("EXPLAIN_BUDGET_MS", "5000"))
+
+# Durées des phases de démarrage (ms), exposées par /ready
+startup_phases = {"imports": round((time.perf_counter() - STARTUP_T0) * 1000, 1)}
+# Passe à l'état prêt une fois le passage de chauffe terminé
+app_ready = threading.Event()
+
+
+@contextmanager
+def startup_phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_phases[name] = round((time.perf_counter() - start) * 1000, 1)
+        print(f"Démarrage - {name} : {startup_phases[name]:.1f} ms")
 
 
 def get_engine(role="demo"):
+    if DB_TYPE == "sqlite" and SQLITE_PROFILE == "production":
+        if role not in ("demo", "log"):
+            raise ValueError("Role must be 'demo' or 'log'")
+        # Logs : connexion d'écriture unique ; lectures (raw) : pool en lecture seule
+        return create_sqlite_engine(
+            db_name,
+            role="writer" if role == "log" else "reader",
+            readers=SQLITE_READERS,
+            wal=not READONLY_DB,
+            **SQLITE_PRAGMAS,
+        )
     if DB_TYPE == "sqlite":
         db_connect = f"sqlite:///{db_name}"
     else:
@@ -46,6 +116,41 @@ def get_engine(role="demo"):
     return create_engine(db_connect)
 
 
+# Pilotes asynchrones des mêmes bases, pour les endpoints async
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+_async_engines = {}
+
+
+def get_async_engine(sync_engine):
+    """Engine SQLAlchemy async (aiosqlite, asyncpg) sur la base de `sync_engine`.
+
+    Un engine par boucle d'événements : ses connexions ne servent qu'à elle.
+    """
+    key = (sync_engine, asyncio.get_running_loop())
+    async_engine = _async_engines.get(key)
+    if async_engine is None:
+        url = sync_engine.url.set(drivername=ASYNC_DRIVERS[sync_engine.dialect.name])
+        async_engine = _async_engines[key] = create_async_engine(url)
+        if sync_engine.dialect.name == "sqlite" and SQLITE_PROFILE == "production":
+            # Lectures seules : les écritures SQLite passent par engine_log
+            apply_pragmas(
+                async_engine.sync_engine, sqlite_pragmas("reader", **SQLITE_PRAGMAS)
+            )
+    return async_engine
+
+
+async def dispose_async_engines():
+    """Ferme les pools async de la boucle courante (arrêt de l'API).
+
+    Ceux d'une boucle déjà fermée sont seulement oubliés : leurs connexions
+    ne peuvent plus être fermées proprement.
+    """
+    loop = asyncio.get_running_loop()
+    for key in list(_async_engines):
+        if key[1] is loop or key[1].is_closed():
+            await _async_engines.pop(key).dispose(close=key[1] is loop)
+
+
 engine = None
 engine_log = None
 
@@ -54,13 +159,140 @@ def set_engine_for_tests(new_engine):
     global engine, engine_log
     engine = new_engine
     engine_log = new_engine
+    employee_store.clear()
 
 
 if engine is None or engine_log is None:
     engine = get_engine(role="demo")
     engine_log = get_engine(role="log")
 
+# Table raw en mémoire : la base n'est plus lue à chaque prédiction
+employee_store = EmployeeStore(
+    lambda: engine, refresh_interval_s=EMPLOYEE_STORE_REFRESH_S
+)
+
+
+def warm_up():
+    """Charge la table raw et préprocesse ses features, si ce n'est pas déjà fait.
+
+    Appelé au démarrage de l'API, ou une seule fois avant le fork des
+    workers par `app.server`.
+    """
+    if not employee_store.loaded:
+        with startup_phase("table raw"):
+            employee_store.load()
+        print(f"Table raw chargée en mémoire : {len(employee_store)} employés")
+    model = model_registry.current
+    if not model.is_dummy and not model.feature_cache.stats()["rows"]:
+        with startup_phase("features préprocessées"):
+            prepare_model(model)
+
+
+def warm_model(model):
+    """Score et explique une ligne synthétique (moyenne des features).
+
+    Les premières requêtes ne paient plus l'initialisation de XGBoost
+    (DMatrix, prédicteur) ni celle du pool d'explication.
+    """
+    if model.is_dummy:
+        return
+    preprocessor = model.pipeline.named_steps["preprocessor"]
+    X_processed = np.zeros((1, len(preprocessor.get_feature_names_out())))
+    score_processed(model, X_processed)
+    pool = model.explain_pool
+    if pool is not None and pool.running:
+        pool.contributions(X_processed, "fast")
+    else:
+        fast_contributions(get_estimator(model.pipeline), X_processed)
+
+
+def warm_explain_stack(model):
+    """Importe shap et matplotlib, construit l'explainer SHAP et rend une image.
+
+    Utile au mode explain=full et aux images PNG uniquement : au démarrage,
+    cette étape tourne en arrière-plan et ne retarde pas /ready.
+    """
+    if model.is_dummy:
+        return
+    # Propriété paresseuse : l'accès construit et met en cache l'explainer
+    _ = model.explainer
+    preprocessor = model.pipeline.named_steps["preprocessor"]
+    feature_names = list(preprocessor.get_feature_names_out())
+    waterfall_png(np.zeros(len(feature_names)), 0.0, feature_names)
+
+
+def _warm_explain_stack_in_background(model):
+    try:
+        with startup_phase("explainer SHAP et rendu PNG (arrière-plan)"):
+            warm_explain_stack(model)
+    except Exception as e:  # noqa: BLE001
+        print(f"Préchargement de l'explainer SHAP impossible: {e}")
+
+
+def start_up():
+    """Démarrage complet : données, pool d'explication, passage de chauffe, puis prêt."""
+    global explain_pools_enabled
+    try:
+        warm_up()
+    except Exception as e:  # noqa: BLE001
+        # Chargement retenté à la première requête
+        print(f"Chargement de la table raw impossible au démarrage: {e}")
+    model = model_registry.current
+    if EXPLAIN_WORKERS > 0 and not model.is_dummy:
+        explain_pools_enabled = True
+        try:
+            with startup_phase("pool d'explication"):
+                prepare_model(model)
+        except Exception as e:  # noqa: BLE001
+            # Les explications restent calculées dans le processus API
+            print(f"Pool d'explication indisponible: {e}")
+    with startup_phase("passage de chauffe"):
+        warm_model(model)
+    startup_phases["total"] = round((time.perf_counter() - STARTUP_T0) * 1000, 1)
+    app_ready.set()
+    print(f"API prête en {startup_phases['total']:.1f} ms")
+    if not model.is_dummy:
+        threading.Thread(
+            target=_warm_explain_stack_in_background,
+            args=(model,),
+            name="explain-warm-up",
+            daemon=True,
+        ).start()
+
+
+def _start_up_in_background():
+    try:
+        start_up()
+    except Exception as e:  # noqa: BLE001
+        # /ready reste à 503 : le déploiement ne route pas de trafic
+        print(f"Démarrage de l'API impossible: {e}")
+    model_registry.start_watching()
+    employee_store.start_watching()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Démarrage en tâche de fond : le serveur ouvre son socket tout de suite,
+    # /health répond et /ready renvoie 503 jusqu'à la fin du passage de chauffe
+    app_ready.clear()
+    startup = threading.Thread(
+        target=_start_up_in_background, name="start-up", daemon=True
+    )
+    startup.start()
+    yield
+    startup.join()
+    employee_store.stop()
+    model_registry.stop()
+    for model in (model_registry.current, model_registry.previous):
+        if model is not None and model.explain_pool is not None:
+            model.explain_pool.stop()
+    # Écrit les logs encore en file avant l'arrêt du serveur
+    log_writer.stop()
+    await dispose_async_engines()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="API Attrition Demo",
     description=f"Swagger FastAPI + accès BDD via SQLAlchemy [{ENV}]",
     version="1.0",
@@ -91,24 +323,190 @@ class DummyModel:
         return np.array([[0.4, 0.6] for _ in range(len(X))])
 
 
-model_path = os.path.join(
-    os.path.dirname(__file__), "..", "models", "model_pipeline.joblib"
+MODELS_DIR = os.getenv(
+    "MODELS_DIR", os.path.join(os.path.dirname(__file__), "..", "models")
 )
+# Fréquence de recherche d'un nouveau modèle dans MODELS_DIR (0 : désactivé)
+MODEL_WATCH_INTERVAL_S = float(os.getenv("MODEL_WATCH_INTERVAL_S", "10"))
 
 MODEL_MOCK = os.getenv("MODEL_MOCK", "0") == "1"
+# Moteur d'inférence du classifieur : "xgboost" (natif) ou "numpy" (arbres aplatis)
+MODEL_ENGINE = os.getenv("MODEL_ENGINE", "xgboost")
+TREE_ENGINE_MAX_ROWS = int(os.getenv("TREE_ENGINE_MAX_ROWS", "32"))
+
+# Pool de processus pour SHAP et le rendu waterfall, un par version servie.
+# Chaque worker charge modèle et explainer : 2 au plus par défaut, en laissant
+# un CPU au processus principal (0 sur une machine à un seul CPU)
+EXPLAIN_WORKERS = int(
+    os.getenv("EXPLAIN_WORKERS", str(max(0, min(2, (os.cpu_count() or 1) - 1))))
+)
+# Les pools ne sont lancés qu'avec l'API (lifespan), jamais à l'import
+explain_pools_enabled = False
+
+
+def load_pipeline(path):
+    # Tableaux NumPy mappés en lecture seule : pages partagées entre workers
+    return joblib.load(path, mmap_mode="r")
+
+
+def prepare_model(model):
+    """Construit les artefacts manquants d'une version avant de la servir.
+
+    Moteur d'arbres (MODEL_ENGINE=numpy), features préprocessées de toute la
+    table raw et pool d'explication ; pour une version activée à chaud,
+    passage de chauffe et explainer SHAP en plus, afin qu'elle soit servie
+    sans recalcul à la première requête.
+    """
+    if model.is_dummy:
+        return
+    if MODEL_ENGINE == "numpy" and model.tree_engine is None:
+        model.tree_engine = FlatTreeEnsemble.from_xgb(get_estimator(model.pipeline))
+    if employee_store.loaded and not model.feature_cache.stats()["rows"]:
+        model.feature_cache.build(
+            model.pipeline,
+            model.fingerprint,
+            employee_store.get_many(employee_store.ids()).to_dict(orient="records"),
+        )
+    if explain_pools_enabled and model.path is not None:
+        if model.explain_pool is None:
+            model.explain_pool = ExplanationPool(
+                model.path, max_workers=EXPLAIN_WORKERS
+            )
+        model.explain_pool.start()
+    if app_ready.is_set():
+        # Bascule à chaud (déjà en tâche de fond) : tout est préparé avant activation
+        warm_model(model)
+        warm_explain_stack(model)
+
+
+def retire_model(model):
+    """Arrête le pool d'explication d'une version remplacée.
+
+    L'arrêt attend la fin des requêtes en cours (délai d'une tâche du pool) ;
+    il est annulé si la version a été réactivée entre-temps.
+    """
+    pool = model.explain_pool
+    if pool is None or not pool.running:
+        return
 
+    def stop():
+        if model_registry.current is not model:
+            pool.stop()
+
+    timer = threading.Timer(pool.timeout_s, stop)
+    timer.daemon = True
+    timer.start()
+
+
+# Versions du modèle : la courante est lue une fois par requête
+model_registry = ModelRegistry(
+    MODELS_DIR,
+    load=load_pipeline,
+    prepare=prepare_model,
+    retire=retire_model,
+    default_version=MODEL_VERSION,
+    watch_interval_s=MODEL_WATCH_INTERVAL_S,
+)
 if not MODEL_MOCK:
     try:
-        model_pipeline = joblib.load(model_path)
+        with startup_phase("chargement du modèle"):
+            model_registry.load_latest()
+        print(f"Modèle {model_registry.current.fingerprint} chargé")
     except FileNotFoundError:
         # Fallback automatique sur le mock si réel absent...
-        model_pipeline = DummyModel()
+        model_registry.activate(LoadedModel(DummyModel(), MODEL_VERSION))
 else:
-    model_pipeline = DummyModel()
+    model_registry.activate(LoadedModel(DummyModel(), MODEL_VERSION))
+
+# Explications précalculées (scripts/precompute_explanations.py), lues avant calcul
+EXPLANATION_STORE_PATH = os.getenv(
+    "EXPLANATION_STORE_PATH", os.path.join(MODELS_DIR, "explanations.sqlite")
+)
+explanation_store = ExplanationStore(EXPLANATION_STORE_PATH)
 
-model_path = os.path.join(
-    os.path.dirname(__file__), "..", "models", "model_pipeline.joblib"
+# Statistiques de référence des colonnes dérivées (scripts/create_db.py)
+REFERENCE_STATS_PATH = os.getenv(
+    "REFERENCE_STATS_PATH", os.path.join(MODELS_DIR, "reference_stats.json")
 )
+_featurizer_lock = threading.Lock()
+_featurizer = None
+
+
+def get_featurizer():
+    """Colonnes dérivées d'un employé absent de `raw` (chargé au premier appel).
+
+    Sans artefact, les statistiques sont calculées une fois sur la table `raw`
+    en mémoire (mêmes valeurs que celles de l'ingestion).
+    """
+    global _featurizer
+    if _featurizer is None:
+        with _featurizer_lock:
+            if _featurizer is None:
+                try:
+                    _featurizer = RowFeaturizer.load(REFERENCE_STATS_PATH)
+                except FileNotFoundError:
+                    print(
+                        f"{REFERENCE_STATS_PATH} absent : statistiques de la table raw"
+                    )
+                    _featurizer = RowFeaturizer.from_frame(
+                        employee_store.get_many(employee_store.ids())
+                    )
+    return _featurizer
+
+
+# Images waterfall, clé (id_employee, empreinte ligne raw, version modèle, format)
+waterfall_cache = LRUCache(maxsize=WATERFALL_CACHE_SIZE)
+
+# Résultats de predict_core, clé : voir result_key
+result_cache = LRUCache(maxsize=RESULT_CACHE_SIZE, ttl_s=RESULT_CACHE_TTL_S)
+
+# Prédictions en cours : les requêtes identiques simultanées partagent un calcul
+predict_flights = SingleFlight()
+
+# Calculs de prédiction simultanés et budget de l'étape d'explication
+admission = AdmissionControl(
+    max_in_flight=PREDICT_MAX_IN_FLIGHT,
+    explain_concurrency=EXPLAIN_MAX_CONCURRENCY,
+    explain_budget_ms=EXPLAIN_BUDGET_MS,
+)
+
+
+def result_key(id_employee, emp_features, model_version, explain, with_image):
+    """Clé d'un résultat : il ne change que si la ligne raw ou le modèle change."""
+    return (id_employee, hash_row(emp_features), model_version, explain, with_image)
+
+
+def result_etag(key):
+    """ETag HTTP (fort) dérivé de la clé du résultat."""
+    return '"' + hash_row(list(key)) + '"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def insert_model_input(conn, payload_dict):
+    """Insère une entrée dans model_input et retourne son identifiant."""
+    if conn.engine.dialect.name == "sqlite":
+        conn.execute(
+            text("INSERT INTO model_input (payload) VALUES (:payload)"),
+            {"payload": json.dumps(payload_dict)},
+        )
+        result = conn.execute(text("SELECT last_insert_rowid()"))
+        row = result.fetchone()
+        return row[0] if row else None
+    else:
+        result = conn.execute(
+            text(
+                "INSERT INTO model_input (payload) "
+                "VALUES (:payload) RETURNING input_id;"
+            ),
+            {"payload": json.dumps(payload_dict)},
+        )
+        return result.fetchone()[0]
 
 
 def log_model_input(payload_dict):
@@ -119,23 +517,7 @@ def log_model_input(payload_dict):
         return -1
 
     with engine_log.begin() as conn:
-        if conn.engine.dialect.name == "sqlite":
-            conn.execute(
-                text("INSERT INTO model_input (payload) VALUES (:payload)"),
-                {"payload": json.dumps(payload_dict)},
-            )
-            result = conn.execute(text("SELECT last_insert_rowid()"))
-            row = result.fetchone()
-            return row[0] if row else None
-        else:
-            result = conn.execute(
-                text(
-                    "INSERT INTO model_input (payload) "
-                    "VALUES (:payload) RETURNING input_id;"
-                ),
-                {"payload": json.dumps(payload_dict)},
-            )
-            return result.fetchone()[0]
+        return insert_model_input(conn, payload_dict)
 
 
 def log_model_output(input_id, prediction, model_version=None):
@@ -179,6 +561,62 @@ def log_model_output(input_id, prediction, model_version=None):
             return result.fetchone()[0]
 
 
+def log_model_outputs(input_id, predictions, model_version=None):
+    """Journalise en une seule transaction les sorties d'un lot de prédictions."""
+    if READONLY_DB or not predictions:
+        return
+
+    with engine_log.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO model_output "
+                "(input_id, prediction, model_version) "
+                "VALUES (:input_id, :prediction, :model_version)"
+            ),
+            [
+                {
+                    "input_id": input_id,
+                    "prediction": json.dumps(prediction),
+                    "model_version": model_version,
+                }
+                for prediction in predictions
+            ],
+        )
+
+
+API_LOG_INSERT = text(
+    """
+    INSERT INTO api_log (
+        event_type, request_payload, response_payload,
+        http_code, user_id, duration_ms, error_detail
+    ) VALUES (
+        :event_type, :request_payload, :response_payload,
+        :http_code, :user_id, :duration_ms, :error_detail
+    )
+"""
+)
+
+
+def api_log_params(
+    event_type,
+    req=None,
+    resp=None,
+    http_code=None,
+    demo_user_id=None,
+    duration_ms=None,
+    error=None,
+):
+    return {
+        "event_type": event_type,
+        "request_payload": json.dumps(req) if req else None,
+        "response_payload": json.dumps(resp) if resp else None,
+        "http_code": http_code,
+        "user_id": demo_user_id,
+        "duration_ms": duration_ms,
+        "error_detail": error,
+    }
+
+
 def log_api_event(
     event_type,
     req=None,
@@ -193,172 +631,974 @@ def log_api_event(
         return
 
     with engine_log.begin() as conn:
+        conn.execute(
+            API_LOG_INSERT,
+            api_log_params(
+                event_type, req, resp, http_code, demo_user_id, duration_ms, error
+            ),
+        )
+
+
+def write_log_records(conn, records):
+    """Écrit des appels journalisés sur une connexion ouverte (une transaction).
+
+    Chaque enregistrement porte l'entrée, les sorties et l'événement API d'un
+    même appel : l'input_id est obtenu ici, côté thread d'écriture, puis
+    reporté sur les sorties, qui sont insérées avec les événements par
+    `executemany` (INSERT multi-lignes).
+    """
+    outputs = []
+    events = []
+    for record in records:
+        input_id = insert_model_input(conn, record["input"])
+        outputs.extend(
+            {
+                "input_id": input_id,
+                "prediction": json.dumps(prediction),
+                "model_version": record["model_version"],
+            }
+            for prediction in record["outputs"]
+        )
+        events.append(api_log_params(**record["event"]))
+    if outputs:
         conn.execute(
             text(
-                """
-                INSERT INTO api_log (
-                    event_type, request_payload, response_payload,
-                    http_code, user_id, duration_ms, error_detail
-                ) VALUES (
-                    :event_type, :request_payload, :response_payload,
-                    :http_code, :user_id, :duration_ms, :error_detail
-                )
-            """
+                "INSERT INTO model_output "
+                "(input_id, prediction, model_version) "
+                "VALUES (:input_id, :prediction, :model_version)"
             ),
+            outputs,
+        )
+    conn.execute(API_LOG_INSERT, events)
+
+
+def write_log_batch(records):
+    """Écrit un lot d'appels journalisés en une transaction (thread LogWriter)."""
+    with engine_log.begin() as conn:
+        write_log_records(conn, records)
+
+
+log_writer = LogWriter(
+    write_log_batch,
+    max_queue=LOG_QUEUE_MAX,
+    batch_size=LOG_BATCH_SIZE,
+    flush_interval_ms=LOG_FLUSH_MS,
+)
+
+
+def log_call(req, outputs, model_version=None, **event):
+    """Journalise un appel au modèle : entrée, sorties et événement api_log.
+
+    En mode LOG_ASYNC (par défaut) l'écriture est confiée au LogWriter et ne
+    bloque pas la requête ; sinon les trois tables sont écrites tout de suite.
+    """
+    if READONLY_DB:
+        return
+    event = {"req": req, "demo_user_id": "demo_user", **event}
+    if LOG_ASYNC:
+        log_writer.submit(
             {
-                "event_type": event_type,
-                "request_payload": json.dumps(req) if req else None,
-                "response_payload": json.dumps(resp) if resp else None,
-                "http_code": http_code,
-                "user_id": demo_user_id,
-                "duration_ms": duration_ms,
-                "error_detail": error,
-            },
+                "input": req,
+                "outputs": outputs,
+                "model_version": model_version,
+                "event": event,
+            }
         )
+        return
+    input_id = log_model_input(req)
+    if len(outputs) == 1:
+        log_model_output(input_id, outputs[0], model_version=model_version)
+    else:
+        log_model_outputs(input_id, outputs, model_version=model_version)
+    log_api_event(**event)
+
+
+async def alog_call(req, outputs, model_version=None, **event):
+    """log_call des endpoints async : sans LOG_ASYNC, écriture immédiate par
+    l'engine async, sans bloquer de thread pendant les INSERT (SQLite : par
+    la connexion d'écriture unique, depuis le threadpool)."""
+    if READONLY_DB or LOG_ASYNC:
+        # File du LogWriter : dépôt non bloquant
+        log_call(req, outputs, model_version, **event)
+        return
+    record = {
+        "input": req,
+        "outputs": outputs,
+        "model_version": model_version,
+        "event": {"req": req, "demo_user_id": "demo_user", **event},
+    }
+    if engine_log.dialect.name == "sqlite":
+        # Un seul écrivain SQLite : la connexion d'écriture d'engine_log
+        await run_in_threadpool(write_log_batch, [record])
+        return
+    async with get_async_engine(engine_log).begin() as conn:
+        await conn.run_sync(write_log_records, [record])
 
 
 def get_raw_employee(id_employee):
-    query = text("SELECT * FROM raw WHERE id_employee = :id")
     try:
-        with engine.connect() as conn:
-            df_emp = pd.read_sql(query, conn, params={"id": id_employee})
+        emp_features = employee_store.get(id_employee)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur base de données: {str(e)}")
-    if df_emp.empty:
+    if emp_features is None:
         raise HTTPException(status_code=404, detail="ID salarié non trouvé")
-    return df_emp.iloc[0]
+    return pd.Series(emp_features)
 
 
-def predict_core(id_employee):
-    emp_row = get_raw_employee(id_employee)
-    emp_features = emp_row.to_dict()
+def get_raw_employees(ids_employee):
+    """Lignes `raw` d'une liste d'employés (un seul accès au cache mémoire)."""
+    try:
+        return employee_store.get_many(ids_employee)
+    except Exception as e:  # noqa: BLE001
+        raise HTTPException(status_code=500, detail=f"Erreur base de données: {e!s}")
+
+
+def processed_features(model, records):
+    """Features préprocessées (matrice) de lignes `raw`, lues dans le cache."""
+    return model.feature_cache.get_many(model.pipeline, model.fingerprint, records)
+
+
+def score_processed(model, X_processed):
+    """Probabilités du modèle sur features préprocessées (moteur MODEL_ENGINE).
+
+    Le moteur NumPy n'est utilisé que pour les petits lots : au-delà de
+    TREE_ENGINE_MAX_ROWS lignes, XGBoost (multi-thread) reprend l'avantage.
+    """
+    if model.tree_engine is not None and len(X_processed) <= TREE_ENGINE_MAX_ROWS:
+        return predict_proba_processed(model.pipeline, X_processed, model.tree_engine)
+    return predict_proba_processed(model.pipeline, X_processed)
+
+
+def explain_processed(model, X_processed):
+    """Calcule les valeurs SHAP (objet Explanation) de features préprocessées."""
+    feature_names = model.feature_cache.feature_names
+    df_processed = pd.DataFrame(X_processed, columns=feature_names)
+
+    return feature_names, model.explainer(df_processed)
+
+
+def explain_contributions(model, X_processed, explain="fast", timeout_s=None):
+    """Contributions par ligne (dicts) selon le mode d'explication demandé.
+
+    - "none" : aucune contribution ;
+    - "fast" : TreeSHAP natif d'XGBoost (`pred_contribs`), sans shap ;
+    - "full" : `shap.TreeExplainer`.
+
+    Renvoie aussi, par ligne, l'explication (contributions, valeur de base,
+    features) utilisée pour le graphique waterfall. Le calcul est délégué au
+    pool de processus d'explication de la version s'il est démarré (attente
+    bornée par `timeout_s`).
+    """
+    if explain == "none":
+        return [{} for _ in range(len(X_processed))], None
+    feature_names = model.feature_cache.feature_names
+    pool = model.explain_pool
+    if pool is not None and pool.running:
+        values, base_values = pool.contributions(X_processed, explain, timeout_s)
+    elif explain == "fast":
+        values, base_values = fast_contributions(
+            get_estimator(model.pipeline), X_processed
+        )
+    else:
+        feature_names, shap_values = explain_processed(model, X_processed)
+        explanations = [
+            (row.values, row.base_values, row.data)
+            for row in (shap_values[i] for i in range(len(X_processed)))
+        ]
+        contribs = [dict(zip(feature_names, v.tolist())) for v, _, _ in explanations]
+        return contribs, explanations
+    contribs = [dict(zip(feature_names, row.tolist())) for row in values]
+    return contribs, list(zip(values, base_values, X_processed))
+
+
+def build_feature_frame(emp_features):
+    """DataFrame d'entrée du modèle à partir d'une ligne `raw` (dict)."""
+    emp_features = dict(emp_features)
     emp_features.pop("id_employee", None)
     emp_features.pop("attrition_num", None)
-    X_row = pd.DataFrame([emp_features])
+    return pd.DataFrame([emp_features])
+
+
+def render_waterfall(model, explanation, fmt="png", timeout_s=None):
+    """Rend une explication (contributions, valeur de base, features) en PNG ou SVG."""
+    pool = model.explain_pool
+    if pool is not None and pool.running:
+        return pool.render(explanation, fmt, timeout_s)
+    values, base_value, data = explanation
+    feature_names = model.feature_cache.feature_names
+    if fmt == "svg":
+        return waterfall_svg(values, base_value, feature_names, data).encode("utf-8")
+    return waterfall_png(values, base_value, feature_names, data)
+
+
+def get_waterfall_image(
+    id_employee, emp_features, fmt="png", explanation=None, model=None, timeout_s=None
+):
+    """Image waterfall d'un employé, servie depuis le cache LRU si possible."""
+    model = model or model_registry.current
+    if model.is_dummy:
+        raise HTTPException(
+            status_code=404, detail="Explication indisponible (modèle factice)"
+        )
+    row_hash = hash_row(emp_features)
+    key = (id_employee, row_hash, model.fingerprint, fmt)
+    image = waterfall_cache.get(key)
+    if image is None and explanation is None and fmt == "png":
+        stored = explanation_store.get(id_employee, model.fingerprint, row_hash)
+        if stored is not None:
+            image = stored["image_png"]
+            if image is None:
+                explanation = stored_explanation(model, emp_features, stored)
+            else:
+                waterfall_cache.put(key, image)
+    if image is None:
+        if explanation is None:
+            _, explanations = explain_contributions(
+                model, processed_features(model, [emp_features]), "fast", timeout_s
+            )
+            explanation = explanations[0]
+        image = render_waterfall(model, explanation, fmt, timeout_s)
+        waterfall_cache.put(key, image)
+    return image
+
+
+def stored_explanation(model, emp_features, stored):
+    """Explication (contributions, valeur de base, features) d'une entrée du store."""
+    X_processed = processed_features(model, [emp_features])
+    return stored["contributions"], stored["base_value"], X_processed[0]
+
+
+@contextmanager
+def predict_slot():
+    """Place de calcul /predict/, prise avant l'attente d'un thread : au-delà de
+    PREDICT_MAX_IN_FLIGHT requêtes en calcul ou en file, 503 avec Retry-After."""
+    try:
+        with admission.admit():
+            yield
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Serveur saturé ({e}), réessayer plus tard",
+            headers={"Retry-After": str(PREDICT_RETRY_AFTER_S)},
+        )
+
+
+def predict_core(id_employee, with_image=False, explain="fast"):
+    """Prédiction d'un employé ; un seul calcul pour des requêtes identiques simultanées."""
+    key = (id_employee, model_registry.current.fingerprint, explain, with_image)
+    return predict_flights.do(
+        key, lambda: _predict_core(id_employee, with_image, explain)
+    )
+
+
+def _predict_core(id_employee, with_image=False, explain="fast"):
+    # Version lue une seule fois : une bascule à chaud n'affecte pas la requête
+    model = model_registry.current
+    emp_row = get_raw_employee(id_employee)
+    emp_features = emp_row.to_dict()
+    key = result_key(id_employee, emp_features, model.fingerprint, explain, with_image)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+    result = compute_prediction(
+        model, id_employee, emp_features, key[1], with_image, explain
+    )
+    if result["degraded"] is None:
+        # Une réponse dégradée n'est pas gardée : la suivante sera complète
+        result_cache.put(key, result)
+    else:
+        admission.degrade(result["degraded"])
+    return result
 
-    score = float(model_pipeline.predict_proba(X_row)[0][1])
-    pred = "OUI" if score >= 0.55 else "NON"
 
+def compute_prediction(model, id_employee, emp_features, row_hash, with_image, explain):
+    """Score, contributions et image d'un employé (étape d'explication bornée).
+
+    Si aucun créneau d'explication ne se libère à temps ou si le budget est
+    dépassé, le résultat garde score et prédiction, et `degraded` indique
+    le motif : "explain_saturated", "explain_over_budget" ou
+    "image_over_budget".
+    """
+    img_b64 = ""
+    degraded = None
     # ----- PATCH : brancher DummyModel et normal en prod -----
-    if type(model_pipeline).__name__ == "DummyModel":
+    if model.is_dummy:
+        score = float(
+            model.pipeline.predict_proba(build_feature_frame(emp_features))[0][1]
+        )
         # Retourne des SHAP “fictifs”
-        contribs = {"dummy1": 0.0, "dummy2": 0.0}
-        img_b64 = ""
+        contribs = {} if explain == "none" else {"dummy1": 0.0, "dummy2": 0.0}
     else:
-        preprocessor = model_pipeline.named_steps["preprocessor"]
-        X_processed = preprocessor.transform(X_row)
-
-        if hasattr(preprocessor, "get_feature_names_out"):
-            feature_names = preprocessor.get_feature_names_out()
+        wants_image = with_image or explain == "full"
+        # Explication précalculée (contributions "fast") : ni score ni SHAP à calculer
+        stored = None
+        if explain != "full":
+            stored = explanation_store.get(id_employee, model.fingerprint, row_hash)
+        if stored is not None:
+            score = stored["score"]
+            contribs = {}
+            if explain == "fast":
+                feature_names = model.feature_cache.feature_names or list(
+                    model.pipeline.named_steps["preprocessor"].get_feature_names_out()
+                )
+                contribs = dict(zip(feature_names, stored["contributions"].tolist()))
+            png = stored["image_png"] if wants_image else None
         else:
-            feature_names = [f"feat_{i}" for i in range(X_processed.shape[1])]
-        df_processed = pd.DataFrame(X_processed, columns=feature_names)
-        estimator = list(model_pipeline.named_steps.values())[-1]
-        import shap
-
-        explainer = shap.TreeExplainer(estimator)
-        shap_values = explainer(df_processed)
-        shap_explanation = shap_values[0]
-        import matplotlib.pyplot as plt
-        import io
-        import base64
-
-        plt.clf()
-        shap.plots.waterfall(shap_explanation, show=False)
-        buf = io.BytesIO()
-        plt.savefig(buf, format="png", bbox_inches="tight")
-        plt.close()
-        buf.seek(0)
-        img_b64 = base64.b64encode(buf.read()).decode("utf-8")
-        contribs = dict(zip(feature_names, shap_explanation.values.tolist()))
+            # Un seul passage du préprocesseur, partagé par le score et SHAP
+            X_processed = processed_features(model, [emp_features])
+            score = float(score_processed(model, X_processed)[0][1])
+            contribs, png = {}, None
+        live_contribs = stored is None and explain != "none"
+        if live_contribs or (wants_image and png is None):
+            # SHAP et rendu : concurrence et durée bornées, réponse dégradée sinon
+            with admission.explain_stage() as stage:
+                if not stage.admitted:
+                    degraded = "explain_saturated"
+                else:
+                    try:
+                        explanation = None
+                        if live_contribs:
+                            all_contribs, explanations = explain_contributions(
+                                model, X_processed, explain, stage.remaining_s()
+                            )
+                            contribs = all_contribs[0]
+                            explanation = explanations[0]
+                        elif stored is not None:
+                            explanation = stored_explanation(
+                                model, emp_features, stored
+                            )
+                        if wants_image and stage.expired():
+                            degraded = "image_over_budget"
+                        elif wants_image:
+                            png = get_waterfall_image(
+                                id_employee,
+                                emp_features,
+                                "png",
+                                explanation,
+                                model,
+                                stage.remaining_s(),
+                            )
+                    except TimeoutError:
+                        degraded = "explain_over_budget"
+        if png is not None:
+            img_b64 = base64.b64encode(png).decode("utf-8")
+    pred = "OUI" if score >= 0.55 else "NON"
 
     return {
         "prediction": pred,
         "score": score,
-        "donnees_brutes": emp_row.to_dict(),
+        "donnees_brutes": emp_features,
         "id_employee": id_employee,
         "shap_waterfall": contribs,
         "shap_waterfall_img": img_b64,
+        "model_version": model.fingerprint,
+        "degraded": degraded,
     }
 
 
+def without_image(result):
+    """Copie du résultat sans l'image base64, pour la journalisation."""
+    return {k: v for k, v in result.items() if k != "shap_waterfall_img"}
+
+
+def predict_batch_core(ids_employee, explain="fast"):
+    """Prédit un lot d'employés : une requête SQL, un predict_proba, un passage SHAP.
+
+    Retourne la liste des résultats (dans l'ordre demandé, sans image) et la
+    liste des identifiants absents de `raw`.
+    """
+    model = model_registry.current
+    ids = list(dict.fromkeys(ids_employee))
+    df_raw = get_raw_employees(ids) if ids else pd.DataFrame()
+    found = set(df_raw["id_employee"].tolist()) if not df_raw.empty else set()
+    not_found = [i for i in ids if i not in found]
+    if not found:
+        return [], not_found
+
+    order = [i for i in ids if i in found]
+    df_raw = df_raw.set_index("id_employee", drop=False).loc[order]
+    records = df_raw.reset_index(drop=True).to_dict(orient="records")
+
+    if model.is_dummy:
+        X = pd.DataFrame(records).drop(
+            columns=["id_employee", "attrition_num"], errors="ignore"
+        )
+        scores = [float(p[1]) for p in model.pipeline.predict_proba(X)]
+        dummy = {} if explain == "none" else {"dummy1": 0.0, "dummy2": 0.0}
+        contribs = [dict(dummy) for _ in order]
+    else:
+        X_processed = processed_features(model, records)
+        scores = [float(p[1]) for p in score_processed(model, X_processed)]
+        contribs, _ = explain_contributions(model, X_processed, explain)
+
+    results = []
+    for raw, score, contrib in zip(records, scores, contribs):
+        results.append(
+            {
+                "prediction": "OUI" if score >= 0.55 else "NON",
+                "score": score,
+                "donnees_brutes": raw,
+                "id_employee": raw["id_employee"],
+                "shap_waterfall": contrib,
+                "model_version": model.fingerprint,
+            }
+        )
+    return results, not_found
+
+
+ExplainMode = Literal["none", "fast", "full"]
+
+
 class EmployeeRequest(BaseModel):
     id_employee: int
+    with_image: bool = False
+    explain: ExplainMode = "fast"
+
+
+def predict_outcome(id_employee, with_image, explain, if_none_match, compute=True):
+    """Résultat d'un appel /predict/ : (résultat, ETag, version du modèle).
+
+    Le résultat est None si le client a déjà la bonne version (304). Avec
+    `compute=False`, seuls la revalidation et le cache de résultats (lectures
+    mémoire) sont consultés : retourne None s'il faut calculer.
+    """
+    # Revalidation : ligne raw et version inchangées, rien à recalculer
+    version = model_registry.current.fingerprint
+    emp_features = get_raw_employee(id_employee).to_dict()
+    key = result_key(id_employee, emp_features, version, explain, with_image)
+    etag = result_etag(key)
+    if etag_matches(if_none_match, etag):
+        return None, etag, version
+    if compute:
+        result = predict_core(id_employee, with_image=with_image, explain=explain)
+    else:
+        result = result_cache.get(key)
+        if result is None:
+            return None
+    if result["degraded"] is not None:
+        return result, None, result["model_version"]
+    # Le modèle a pu changer entre-temps : ETag du résultat réellement servi
+    etag = result_etag(
+        result_key(
+            id_employee,
+            result["donnees_brutes"],
+            result["model_version"],
+            explain,
+            with_image,
+        )
+    )
+    return result, etag, result["model_version"]
+
+
+def predict_log_event(req, result, etag, version, duration_ms):
+    """Arguments de log_call pour un appel /predict/ servi (200 ou 304)."""
+    if result is None:
+        return {
+            "req": req,
+            "outputs": [],
+            "model_version": version,
+            "event_type": "predict_not_modified",
+            "http_code": 304,
+            "duration_ms": duration_ms,
+        }
+    return {
+        "req": req,
+        "outputs": [without_image(result)],
+        "model_version": version,
+        # Réponses dégradées tracées à part : dimensionnement de la capacité
+        "event_type": "predict_degraded" if result["degraded"] else "predict",
+        "resp": without_image(result),
+        "http_code": 200,
+        "duration_ms": duration_ms,
+        "error": result["degraded"],
+    }
+
+
+def predict_error_event(error, duration_ms):
+    """Événement api_log d'un appel /predict/ en échec et exception HTTP à lever."""
+    if isinstance(error, HTTPException):
+        event_type = "predict_rejected" if error.status_code == 503 else "predict_error"
+        event = {
+            "event_type": event_type,
+            "http_code": error.status_code,
+            "duration_ms": duration_ms,
+            "error": error.detail,
+        }
+        return event, error
+    event = {
+        "event_type": "predict_error",
+        "http_code": 500,
+        "duration_ms": duration_ms,
+        "error": str(error),
+    }
+    return event, HTTPException(status_code=500, detail="Erreur interne du serveur")
+
+
+def predict_response(result, etag, response=None):
+    if result is None:
+        return Response(status_code=304, headers={"ETag": etag})
+    if response is not None and etag is not None:
+        response.headers["ETag"] = etag
+    return result
+
+
+def predict(
+    id_employee,
+    with_image=False,
+    explain="fast",
+    response=None,
+    if_none_match=None,
+):
+    """/predict/ en synchrone (scripts, tests) : même réponse, même journalisation."""
+    start = time.time()
+    req = {"id_employee": id_employee}
+    try:
+        with predict_slot():
+            outcome = predict_outcome(id_employee, with_image, explain, if_none_match)
+    except Exception as e:  # noqa: BLE001
+        event, error = predict_error_event(e, int((time.time() - start) * 1000))
+        log_call(req, [], **event)
+        raise error
+    log_call(**predict_log_event(req, *outcome, int((time.time() - start) * 1000)))
+    return predict_response(*outcome[:2], response)
 
 
 @app.get("/predict/")
-def predict(id_employee: int = Query(...)):
+async def predict_async(
+    response: Response,
+    id_employee: int = Query(...),
+    with_image: bool = Query(
+        False, description="Inclure l'image waterfall base64 dans la réponse"
+    ),
+    explain: Annotated[
+        ExplainMode,
+        Query(
+            description="none : score seul ; fast : contributions XGBoost natives ; "
+            "full : SHAP + image waterfall"
+        ),
+    ] = "fast",
+    if_none_match: str | None = Header(None),
+):
     start = time.time()
+    req = {"id_employee": id_employee}
     try:
-        input_id = log_model_input({"id_employee": id_employee})
-        result = predict_core(id_employee)
-        log_model_output(input_id, result, model_version="1.0")
+        outcome = None
+        if employee_store.fresh:
+            # 304 et cache de résultats : lectures mémoire, servies dans la boucle
+            outcome = predict_outcome(
+                id_employee, with_image, explain, if_none_match, compute=False
+            )
+        if outcome is None:
+            # Préprocesseur, XGBoost, SHAP et rendu : calcul CPU hors de la boucle.
+            # Admission avant run_in_threadpool : l'attente d'un thread est bornée
+            with predict_slot():
+                outcome = await run_in_threadpool(
+                    predict_outcome, id_employee, with_image, explain, if_none_match
+                )
+    except Exception as e:
+        event, error = predict_error_event(e, int((time.time() - start) * 1000))
+        await alog_call(req, [], **event)
+        raise error
+    await alog_call(
+        **predict_log_event(req, *outcome, int((time.time() - start) * 1000))
+    )
+    return predict_response(*outcome[:2], response)
+
+
+@app.post("/predict/")
+async def predict_post_async(
+    payload: EmployeeRequest,
+    response: Response,
+    if_none_match: str | None = Header(None),
+):
+    return await predict_async(
+        response,
+        id_employee=payload.id_employee,
+        with_image=payload.with_image,
+        explain=payload.explain,
+        if_none_match=if_none_match,
+    )
+
+
+class NewEmployeeRequest(BaseModel):
+    features: dict[str, Any]
+
+
+def model_input_columns(model):
+    """Colonnes à fournir pour un employé absent de `raw` (hors colonnes dérivées)."""
+    preprocessor = model.pipeline.named_steps["preprocessor"]
+    columns = set(SOURCE_COLUMNS) | set(getattr(preprocessor, "feature_names_in_", []))
+    return columns - set(DERIVED_COLUMNS)
+
+
+def validate_inputs(model, values_by_column):
+    """Vérifie des valeurs fournies par le client, avant tout calcul (422 sinon).
+
+    `values_by_column` : {colonne: [valeurs]}. Colonnes numériques : nombres
+    (ni null, ni booléen) ; colonnes encodées : catégories vues à
+    l'entraînement, y compris pour le one-hot qui ignorerait une inconnue.
+    Les colonnes dérivées, recalculées ensuite, ne sont pas vérifiées.
+    """
+    schema = model.input_schema
+    for col, values in values_by_column.items():
+        if col in DERIVED_COLUMNS:
+            continue
+        categories = schema.get(col)
+        numeric = col in schema and categories is None
+        if col in SOURCE_COLUMNS and col != "poste_departement":
+            numeric = True
+        for value in values:
+            if numeric:
+                valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+                valid = valid and not (isinstance(value, float) and np.isnan(value))
+                expected = "nombre"
+            elif categories is not None:
+                valid = not isinstance(value, (list, dict)) and value in categories
+                expected = f"une de {', '.join(sorted(map(str, categories)))}"
+            else:
+                continue
+            if not valid:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Valeur invalide pour {col} : {value!r} "
+                    f"(attendu : {expected})",
+                )
+
+
+def score_rows(model, records):
+    """Probabilités de lignes `raw` hors cache (employés absents, points simulés)."""
+    if model.is_dummy:
+        X = pd.DataFrame(records).drop(
+            columns=["id_employee", "attrition_num"], errors="ignore"
+        )
+        return model.pipeline.predict_proba(X)
+    X_processed = model.feature_cache.transform(
+        model.pipeline, model.fingerprint, records
+    )
+    return score_processed(model, X_processed)
+
+
+def predict_new_core(features):
+    """Score d'un employé qui n'est pas (encore) dans `raw`.
+
+    Les colonnes dérivées sont recalculées à partir des statistiques de
+    référence : ni relecture de la table, ni cache par employé.
+    """
+    model = model_registry.current
+    missing = sorted(model_input_columns(model) - features.keys())
+    if missing:
+        raise HTTPException(
+            status_code=422, detail=f"Colonnes manquantes : {', '.join(missing)}"
+        )
+    validate_inputs(model, {col: [value] for col, value in features.items()})
+    featurizer = get_featurizer()
+    row = featurizer.featurize(features)
+    score = float(score_rows(model, [row])[0][1])
+    return {
+        "prediction": "OUI" if score >= 0.55 else "NON",
+        "score": score,
+        "donnees_brutes": row,
+        "model_version": model.fingerprint,
+        "reference_version": featurizer.version,
+    }
+
+
+@app.post("/predict/new")
+def predict_new(payload: NewEmployeeRequest):
+    start = time.time()
+    req = {"features": payload.features}
+    try:
+        result = predict_new_core(payload.features)
+    except Exception as e:  # noqa: BLE001
+        event, error = predict_error_event(e, int((time.time() - start) * 1000))
+        log_call(req, [], **{**event, "event_type": "predict_new_error"})
+        raise error
+    log_call(
+        req,
+        [result],
+        model_version=result["model_version"],
+        event_type="predict_new",
+        resp=result,
+        http_code=200,
+        duration_ms=int((time.time() - start) * 1000),
+    )
+    return result
+
+
+class SimulationRequest(BaseModel):
+    id_employee: int
+    grid: dict[str, list[Any]]
+
+
+def simulation_frame(base, grid):
+    """Colonnes modifiées et sources des colonnes dérivées, une ligne par point
+    de la grille (produit cartésien des valeurs).
+
+    Les points sont rangés dans l'ordre de `np.indices` : les scores se
+    remettent en forme avec `reshape(forme de la grille)`.
+    """
+    shape = tuple(len(values) for values in grid.values())
+    n_points = int(np.prod(shape))
+    frame = pd.DataFrame(
+        {col: [base[col]] * n_points for col in SOURCE_COLUMNS if col not in grid}
+    )
+    for axis, (col, values) in zip(np.indices(shape), grid.items()):
+        frame[col] = np.array(values, dtype=object)[axis.ravel()].tolist()
+    return frame, shape
+
+
+def simulation_records(featurizer, base, grid):
+    """Lignes `raw` complètes des points de la grille, puis la ligne d'origine."""
+    frame, shape = simulation_frame(base, grid)
+    featurized = featurizer.featurize_frame(frame)
+    changed = list(dict.fromkeys([*grid, *DERIVED_COLUMNS]))
+    columns = [featurized[col].tolist() for col in changed]
+    records = [{**base, **dict(zip(changed, values))} for values in zip(*columns)]
+    records.append(featurizer.featurize(base))
+    return records, shape
+
+
+def simulate_core(id_employee, grid):
+    """Scores d'un employé sur une grille de valeurs modifiées (« et si... »).
+
+    Les colonnes dérivées de chaque point sont recalculées en bloc à partir
+    des statistiques de référence, puis toute la grille, plus la ligne
+    d'origine, est préprocessée et scorée en un seul appel au modèle.
+    """
+    if not grid or any(not values for values in grid.values()):
+        raise HTTPException(status_code=422, detail="Grille vide")
+    base = get_raw_employee(id_employee).to_dict()
+    derived = sorted(set(grid) & set(DERIVED_COLUMNS))
+    fixed = {"id_employee", "attrition_num"}
+    unknown = sorted((set(grid) - set(base)) | (set(grid) & fixed))
+    if derived or unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Colonnes non modifiables : {', '.join(derived + unknown)}",
+        )
+    n_points = int(np.prod([len(values) for values in grid.values()]))
+    if n_points > SIMULATE_MAX_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Grille trop grande : {n_points} points "
+            f"(max {SIMULATE_MAX_POINTS})",
+        )
+    model = model_registry.current
+    validate_inputs(model, grid)
+    featurizer = get_featurizer()
+    records, shape = simulation_records(featurizer, base, grid)
+    scores = np.asarray(score_rows(model, records))[:, 1].astype(float)
+    return {
+        "id_employee": id_employee,
+        "axes": grid,
+        "shape": list(shape),
+        "scores": scores[:-1].reshape(shape).tolist(),
+        "baseline_score": float(scores[-1]),
+        "model_version": model.fingerprint,
+        "reference_version": featurizer.version,
+    }
+
+
+@app.post("/simulate")
+def simulate(payload: SimulationRequest):
+    start = time.time()
+    req = {"id_employee": payload.id_employee, "grid": payload.grid}
+    try:
+        result = simulate_core(payload.id_employee, payload.grid)
+    except Exception as e:  # noqa: BLE001
+        event, error = predict_error_event(e, int((time.time() - start) * 1000))
+        log_call(req, [], **{**event, "event_type": "simulate_error"})
+        raise error
+    log_call(
+        req,
+        [{"id_employee": payload.id_employee, "score": result["baseline_score"]}],
+        model_version=result["model_version"],
+        event_type="simulate",
+        resp={"shape": result["shape"], "baseline_score": result["baseline_score"]},
+        http_code=200,
+        duration_ms=int((time.time() - start) * 1000),
+    )
+    return result
+
+
+@app.get("/explain/{id_employee}/waterfall.png")
+def explain_waterfall(id_employee: int):
+    emp_features = get_raw_employee(id_employee).to_dict()
+    png = get_waterfall_image(id_employee, emp_features, "png")
+    return Response(content=png, media_type="image/png")
+
+
+@app.get("/explain/{id_employee}/waterfall.svg")
+def explain_waterfall_svg(id_employee: int):
+    emp_features = get_raw_employee(id_employee).to_dict()
+    svg = get_waterfall_image(id_employee, emp_features, "svg")
+    return Response(content=svg, media_type="image/svg+xml")
+
+
+class BatchRequest(BaseModel):
+    id_employees: list[int]
+    explain: ExplainMode = "fast"
+
+
+@app.post("/predict/batch")
+def predict_batch(payload: BatchRequest):
+    start = time.time()
+    req = {"id_employees": payload.id_employees}
+    try:
+        if len(payload.id_employees) > BATCH_MAX_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Lot trop volumineux (max {BATCH_MAX_SIZE} identifiants)",
+            )
+        results, not_found = predict_batch_core(
+            payload.id_employees, explain=payload.explain
+        )
         duration_ms = int((time.time() - start) * 1000)
-        log_api_event(
-            event_type="predict",
-            req={"id_employee": id_employee},
-            resp=result,
+        log_call(
+            req,
+            [
+                {
+                    "id_employee": r["id_employee"],
+                    "prediction": r["prediction"],
+                    "score": r["score"],
+                }
+                for r in results
+            ],
+            model_version=results[0]["model_version"] if results else None,
+            event_type="predict_batch",
+            resp={"count": len(results), "not_found": not_found},
             http_code=200,
-            demo_user_id="demo_user",
             duration_ms=duration_ms,
-            error=None,
         )
-        return result
+        return {"count": len(results), "results": results, "not_found": not_found}
     except HTTPException as e:
         duration_ms = int((time.time() - start) * 1000)
-        log_api_event(
-            event_type="predict_error",
-            req={"id_employee": id_employee},
-            resp=None,
+        log_call(
+            req,
+            [],
+            event_type="predict_batch_error",
             http_code=e.status_code,
-            demo_user_id="demo_user",
             duration_ms=duration_ms,
             error=e.detail,
         )
         raise e
-    except Exception as e:
+    except Exception as e:  # noqa: BLE001
         duration_ms = int((time.time() - start) * 1000)
-        log_api_event(
-            event_type="predict_error",
-            req={"id_employee": id_employee},
-            resp=None,
+        log_call(
+            req,
+            [],
+            event_type="predict_batch_error",
             http_code=500,
-            demo_user_id="demo_user",
             duration_ms=duration_ms,
             error=str(e),
         )
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
 
 
-@app.post("/predict/")
-def predict_post(payload: EmployeeRequest):
-    return predict(id_employee=payload.id_employee)
-
-
 @app.get("/health")
 def health():
     return {"status": "ok", "version": "1.0", "env": ENV}
 
 
-@app.get("/employee_list")
+@app.get("/ready")
+def ready():
+    """Prête à servir : données chargées et passage de chauffe terminé (503 sinon)."""
+    if not app_ready.is_set():
+        raise HTTPException(status_code=503, detail="Démarrage en cours")
+    return {
+        "ready": True,
+        "model_version": model_registry.current.fingerprint,
+        "startup_ms": startup_phases,
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "log_writer": log_writer.stats(),
+        "waterfall_cache": waterfall_cache.stats(),
+        "result_cache": result_cache.stats(),
+        "predict_coalescing": predict_flights.stats(),
+        "admission": admission.stats(),
+        "explanation_store": explanation_store.stats(),
+        "employee_store": employee_store.stats(),
+        "feature_cache": model_registry.current.feature_cache.stats(),
+        "reference_stats": _featurizer.info() if _featurizer is not None else None,
+        "explain_pool": (
+            model_registry.current.explain_pool.stats()
+            if model_registry.current.explain_pool is not None
+            else None
+        ),
+        "models": model_registry.stats(),
+    }
+
+
+@app.get("/models")
+def models():
+    return model_registry.stats()
+
+
+@app.post("/models/reload")
+def models_reload():
+    """Recherche immédiatement un nouveau modèle dans MODELS_DIR."""
+    model = model_registry.check()
+    return {"reloaded": model is not None, **model_registry.stats()}
+
+
+@app.post("/models/rollback")
+def models_rollback():
+    """Revient à la version servie avant la dernière bascule."""
+    try:
+        model_registry.rollback()
+    except LookupError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return model_registry.stats()
+
+
+class RefreshRequest(BaseModel):
+    id_employees: list[int]
+
+
+@app.post("/employees/refresh")
+def employees_refresh(payload: RefreshRequest):
+    """Relit en base les employés modifiés (liste de changements d'une ingestion).
+
+    Les caches de résultats, d'images et d'explications sont indexés par
+    l'empreinte de la ligne : une ligne modifiée n'y trouve plus d'entrée.
+    Seules les caractéristiques transformées, indexées par employé, sont oubliées.
+    """
+    ids = list(dict.fromkeys(payload.id_employees))
+    try:
+        employee_store.refresh_rows(ids)
+    except Exception as e:  # noqa: BLE001
+        raise HTTPException(status_code=500, detail=f"Erreur base de données: {e!s}")
+    for model in (model_registry.current, model_registry.previous):
+        if model is not None:
+            model.feature_cache.invalidate(ids)
+    return {"refreshed": len(ids), "employees": len(employee_store.ids())}
+
+
 def employee_list():
-    query = "SELECT id_employee FROM raw"
     try:
-        with engine.connect() as conn:
-            df = pd.read_sql(query, conn)
-        return df["id_employee"].drop_duplicates().tolist()
+        return employee_store.ids()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur base de données: {str(e)}")
 
 
-@app.get("/log_sample/")
-def log_sample(
-    table: str = Query(
-        ..., description="Table à inspecter: model_input/model_output/api_log"
-    ),
-    n: int = 3,
-):
-    if table not in {"model_input", "model_output", "api_log"}:
+@app.get("/employee_list")
+async def employee_list_async():
+    if employee_store.fresh:
+        return employee_list()
+    # Chargement ou rafraîchissement de la table raw : requêtes SQL bloquantes
+    return await run_in_threadpool(employee_list)
+
+
+LOG_TABLES = {"model_input", "model_output", "api_log"}
+
+
+def log_sample(table, n=3):
+    """Dernières lignes d'une table de logs (version synchrone)."""
+    if table not in LOG_TABLES:
         return {"error": "Table inconnue"}
 
     try:
@@ -374,3 +1614,25 @@ def log_sample(
     except Exception as e:
         print(f"Exception in log_sample: {e}")
         return {"error": "Erreur interne du serveur"}
+
+
+@app.get("/log_sample/")
+async def log_sample_async(
+    table: str = Query(
+        ..., description="Table à inspecter: model_input/model_output/api_log"
+    ),
+    n: int = 3,
+):
+    if table not in LOG_TABLES:
+        return {"error": "Table inconnue"}
+
+    try:
+        async with get_async_engine(engine_log).connect() as conn:
+            result = await conn.execute(
+                text(f"SELECT * FROM {table} ORDER BY timestamp DESC LIMIT :n"),
+                {"n": n},
+            )
+            return [dict(row._mapping) for row in result]
+    except Exception as e:  # noqa: BLE001
+        print(f"Exception in log_sample: {e}")
+        return {"error": "Erreur interne du serveur"}
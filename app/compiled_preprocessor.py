@@ -0,0 +1,173 @@
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+
+
+class CompiledPreprocessor:
+    """Version « compilée » d'un ColumnTransformer ajusté, sans pandas.
+
+    Les paramètres appris (ordre des colonnes, catégories ordinales et
+    one-hot, moyennes et écarts-types des StandardScaler) sont extraits une
+    fois en dicts et tableaux NumPy ; un dict (ligne `raw`) est ensuite
+    converti directement en vecteur d'entrée du modèle. Les opérations
+    flottantes sont celles de scikit-learn, dans le même ordre, si bien que
+    le résultat est identique au bit près.
+    """
+
+    def __init__(self, n_features, feature_names):
+        self.n_features = n_features
+        self.feature_names = feature_names
+        # (colonne, position)
+        self._numeric = []
+        # (colonne, position, {catégorie: code}, code si inconnue ou None)
+        self._ordinal = []
+        # (colonne, {catégorie: position}, ignorer les inconnues)
+        self._onehot = []
+        # Étapes de scaling successives : (moyennes, écarts-types) sur tout le vecteur
+        self._stages = []
+
+    def transform_one(self, record):
+        """Vecteur (1D) des features préprocessées d'une ligne `raw` (dict)."""
+        x = np.zeros(self.n_features)
+        self._fill(record, x)
+        for offset, scale in self._stages:
+            x = (x - offset) / scale
+        return x
+
+    def transform_many(self, records):
+        """Matrice (n × features) pour une liste de lignes `raw`."""
+        X = np.zeros((len(records), self.n_features))
+        for record, row in zip(records, X):
+            self._fill(record, row)
+        for offset, scale in self._stages:
+            X = (X - offset) / scale
+        return X
+
+    def _fill(self, record, x):
+        for col, pos in self._numeric:
+            value = record[col]
+            x[pos] = np.nan if value is None else value
+        for col, pos, mapping, unknown in self._ordinal:
+            code = mapping.get(record[col], unknown)
+            if code is None:
+                raise ValueError(
+                    f"Catégorie inconnue {record[col]!r} pour la colonne {col}"
+                )
+            x[pos] = code
+        for col, mapping, ignore_unknown in self._onehot:
+            pos = mapping.get(record[col])
+            if pos is not None:
+                x[pos] = 1.0
+            elif not ignore_unknown:
+                raise ValueError(
+                    f"Catégorie inconnue {record[col]!r} pour la colonne {col}"
+                )
+
+    def _add_scaler(self, depth, positions, scaler):
+        while len(self._stages) <= depth:
+            self._stages.append((np.zeros(self.n_features), np.ones(self.n_features)))
+        offset, scale = self._stages[depth]
+        if scaler.with_mean:
+            offset[positions] = scaler.mean_
+        if scaler.with_std:
+            scale[positions] = scaler.scale_
+
+
+def _split_steps(transformer):
+    """Décompose un transformer en (encodeur ou None, [StandardScaler...])."""
+    steps = (
+        [step for _, step in transformer.steps]
+        if isinstance(transformer, Pipeline)
+        else [transformer]
+    )
+    encoder = None
+    if steps and isinstance(steps[0], (OrdinalEncoder, OneHotEncoder)):
+        encoder = steps.pop(0)
+    if not all(isinstance(step, StandardScaler) for step in steps):
+        raise NotImplementedError(f"Transformer non compilable : {transformer!r}")
+    return encoder, steps
+
+
+def compile_preprocessor(preprocessor):
+    """Compile un ColumnTransformer ajusté ; NotImplementedError si non supporté."""
+    if not isinstance(preprocessor, ColumnTransformer):
+        raise NotImplementedError("Seul un ColumnTransformer peut être compilé")
+    if getattr(preprocessor, "sparse_output_", False):
+        raise NotImplementedError("Sortie creuse non supportée")
+
+    feature_names = list(preprocessor.get_feature_names_out())
+    compiled = CompiledPreprocessor(len(feature_names), feature_names)
+    pos = 0
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop" or (name == "remainder" and not len(columns)):
+            continue
+        if transformer == "passthrough":
+            encoder, scalers = None, []
+        else:
+            encoder, scalers = _split_steps(transformer)
+
+        if isinstance(encoder, OneHotEncoder):
+            if encoder.drop_idx_ is not None or encoder._infrequent_enabled:
+                raise NotImplementedError("OneHotEncoder drop/infrequent non supporté")
+            start = pos
+            for col, categories in zip(columns, encoder.categories_):
+                mapping = {cat: start + i for i, cat in enumerate(categories)}
+                compiled._onehot.append(
+                    (col, mapping, encoder.handle_unknown != "error")
+                )
+                start += len(categories)
+        elif isinstance(encoder, OrdinalEncoder):
+            unknown = (
+                encoder.unknown_value
+                if encoder.handle_unknown == "use_encoded_value"
+                else None
+            )
+            for i, (col, categories) in enumerate(zip(columns, encoder.categories_)):
+                mapping = {cat: float(code) for code, cat in enumerate(categories)}
+                compiled._ordinal.append((col, pos + i, mapping, unknown))
+        else:
+            for i, col in enumerate(columns):
+                compiled._numeric.append((col, pos + i))
+
+        width = (
+            sum(len(c) for c in encoder.categories_)
+            if isinstance(encoder, OneHotEncoder)
+            else len(columns)
+        )
+        positions = np.arange(pos, pos + width)
+        for depth, scaler in enumerate(scalers):
+            compiled._add_scaler(depth, positions, scaler)
+        pos += width
+
+    if pos != compiled.n_features:
+        raise NotImplementedError("Nombre de features incohérent après compilation")
+    return compiled
+
+
+def input_schema(preprocessor):
+    """Colonnes d'entrée d'un ColumnTransformer ajusté.
+
+    {colonne: catégories apprises par l'encodeur (OrdinalEncoder, OneHotEncoder),
+    ou None pour une colonne numérique}. Vide si le préprocesseur n'est pas
+    un ColumnTransformer ajusté.
+    """
+    schema = {}
+    for name, transformer, columns in getattr(preprocessor, "transformers_", []):
+        if transformer == "drop" or not len(columns):
+            continue
+        columns = list(columns)
+        if isinstance(columns[0], (int, np.integer)):
+            columns = [preprocessor.feature_names_in_[i] for i in columns]
+        steps = (
+            [step for _, step in transformer.steps]
+            if isinstance(transformer, Pipeline)
+            else [transformer]
+        )
+        encoder = steps[0]
+        for i, col in enumerate(columns):
+            if isinstance(encoder, (OrdinalEncoder, OneHotEncoder)):
+                schema[col] = set(encoder.categories_[i].tolist())
+            else:
+                schema[col] = None
+    return schema
@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.explainer import ExplainerRegistry, fast_contributions, get_estimator
+from app.waterfall import waterfall_png, waterfall_svg
+
+# État d'un processus worker : modèle, explainer et noms de features préchargés
+_worker = {}
+
+
+def _init_worker(model_path):
+    import joblib
+
+    pipeline = joblib.load(model_path, mmap_mode="r")
+    registry = ExplainerRegistry()
+    registry.get(pipeline)
+    _worker.update(
+        pipeline=pipeline,
+        estimator=get_estimator(pipeline),
+        registry=registry,
+        feature_names=list(
+            pipeline.named_steps["preprocessor"].get_feature_names_out()
+        ),
+    )
+
+
+def _ready():
+    return os.getpid()
+
+
+def _contributions_task(X_processed, explain):
+    """Exécuté dans un worker : (contributions, valeurs de base) d'un lot."""
+    if explain == "full":
+        explanation = _worker["registry"].get(_worker["pipeline"])(X_processed)
+        return explanation.values, explanation.base_values
+    return fast_contributions(_worker["estimator"], X_processed)
+
+
+def _render_task(explanation, fmt):
+    """Exécuté dans un worker : image waterfall (bytes) d'une explication."""
+    values, base_value, data = explanation
+    feature_names = _worker["feature_names"]
+    if fmt == "svg":
+        return waterfall_svg(values, base_value, feature_names, data).encode("utf-8")
+    return waterfall_png(values, base_value, feature_names, data)
+
+
+class ExplanationPool:
+    """Pool de processus dédiés aux explications (SHAP et rendu waterfall).
+
+    Chaque worker charge le modèle et son explainer une seule fois ; l'API
+    lui envoie des features préprocessées et récupère contributions ou
+    images. Le calcul CPU sort ainsi du GIL du processus API, qui garde les
+    entrées/sorties et le score. Les workers sont lancés en « spawn » : ils
+    n'héritent pas des threads (logs, store) du processus API.
+    """
+
+    def __init__(self, model_path, max_workers=None, timeout_s=30.0):
+        self.model_path = model_path
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout_s = timeout_s
+        self._executor = None
+        self._lock = threading.Lock()
+        self.start_time_ms = None
+        self.tasks = 0
+        self.failed = 0
+        self.busy_ms = 0.0
+
+    @property
+    def running(self):
+        return self._executor is not None
+
+    def start(self):
+        """Lance les workers et attend qu'ils aient chargé le modèle."""
+        with self._lock:
+            if self._executor is not None:
+                return
+            start = time.perf_counter()
+            executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_path,),
+            )
+            futures = [executor.submit(_ready) for _ in range(self.max_workers)]
+            for future in futures:
+                future.result()
+            self._executor = executor
+            self.start_time_ms = (time.perf_counter() - start) * 1000
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def contributions(self, X_processed, explain="fast", timeout_s=None):
+        """(contributions n × features, valeurs de base) calculées par un worker."""
+        return self._run(_contributions_task, X_processed, explain, timeout_s=timeout_s)
+
+    def render(self, explanation, fmt="png", timeout_s=None):
+        """Image waterfall (PNG ou SVG) rendue par un worker."""
+        return self._run(_render_task, explanation, fmt, timeout_s=timeout_s)
+
+    def _run(self, fn, *args, timeout_s=None):
+        """Exécute `fn` dans un worker (TimeoutError au-delà de `timeout_s`)."""
+        executor = self._executor
+        if executor is None:
+            raise RuntimeError("Pool d'explication non démarré")
+        start = time.perf_counter()
+        future = executor.submit(fn, *args)
+        try:
+            return future.result(
+                timeout=self.timeout_s if timeout_s is None else timeout_s
+            )
+        except Exception:
+            # Délai dépassé : la tâche est retirée de la file si elle n'a pas démarré
+            future.cancel()
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.tasks += 1
+                self.busy_ms += (time.perf_counter() - start) * 1000
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self._executor is not None,
+                "workers": self.max_workers,
+                "start_time_ms": self.start_time_ms,
+                "tasks": self.tasks,
+                "failed": self.failed,
+                "avg_task_ms": self.busy_ms / self.tasks if self.tasks else None,
+            }
@@ -0,0 +1,67 @@
+import threading
+import time
+
+
+def get_estimator(model_pipeline):
+    """Retourne la dernière étape du pipeline (le classifieur XGBoost)."""
+    return list(model_pipeline.named_steps.values())[-1]
+
+
+def fast_contributions(estimator, X_processed):
+    """Contributions TreeSHAP natives d'XGBoost (`pred_contribs`), sans shap.
+
+    Retourne (contributions n × features, valeur de base par ligne), en marge
+    log-odds, identiques aux valeurs de `shap.TreeExplainer` sur ce modèle.
+    """
+    import xgboost
+
+    booster = estimator.get_booster()
+    best_iteration = getattr(estimator, "best_iteration", None)
+    iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+    contribs = booster.predict(
+        xgboost.DMatrix(X_processed),
+        pred_contribs=True,
+        iteration_range=iteration_range,
+    )
+    return contribs[:, :-1], contribs[:, -1]
+
+
+class ExplainerRegistry:
+    """Registre d'explainers SHAP : un seul TreeExplainer par modèle chargé.
+
+    L'explainer est construit au chargement du modèle puis réutilisé par
+    toutes les requêtes ; il n'est reconstruit que si le pipeline change.
+    Une fois construit il n'est plus modifié, il peut donc être partagé
+    entre les threads du pool FastAPI.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (modèle, explainer) lus/écrits ensemble pour rester cohérents
+        self._entry = (None, None)
+        self.build_time_ms = None
+        self.build_count = 0
+
+    def get(self, model_pipeline):
+        model, explainer = self._entry
+        if model is model_pipeline and explainer is not None:
+            return explainer
+        with self._lock:
+            model, explainer = self._entry
+            if model is not model_pipeline or explainer is None:
+                explainer = self._build(model_pipeline)
+                self._entry = (model_pipeline, explainer)
+            return explainer
+
+    def _build(self, model_pipeline):
+        import shap
+
+        start = time.perf_counter()
+        explainer = shap.TreeExplainer(get_estimator(model_pipeline))
+        self.build_time_ms = (time.perf_counter() - start) * 1000
+        self.build_count += 1
+        return explainer
+
+    def clear(self):
+        with self._lock:
+            self._entry = (None, None)
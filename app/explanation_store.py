@@ -0,0 +1,126 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS explanation (
+    id_employee INTEGER NOT NULL,
+    model_version TEXT NOT NULL,
+    row_hash TEXT NOT NULL,
+    score REAL NOT NULL,
+    base_value REAL NOT NULL,
+    contributions BLOB NOT NULL,
+    image_png BLOB,
+    PRIMARY KEY (id_employee, model_version, row_hash)
+)
+"""
+
+
+class ExplanationStore:
+    """Explications précalculées sur disque (fichier SQLite), partagées par les workers.
+
+    Une entrée par (employé, version du modèle, empreinte de la ligne `raw`) :
+    score, contributions « fast » en float32 et, en option, image waterfall
+    PNG. Le fichier est rempli hors ligne (`scripts/precompute_explanations.py`)
+    et lu en lecture seule par l'API : il survit aux redémarrages et ses pages
+    sont dans le cache du système, commun à tous les workers uvicorn.
+    Fichier absent : toutes les lectures sont des miss.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _reader(self):
+        # Une connexion par thread et par processus (workers forkés)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        if not os.path.exists(self.path):
+            return None
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, id_employee, model_version, row_hash):
+        """Explication stockée (dict) ou None si absente ou obsolète."""
+        row = None
+        conn = self._reader()
+        if conn is not None:
+            try:
+                row = conn.execute(
+                    "SELECT score, base_value, contributions, image_png "
+                    "FROM explanation "
+                    "WHERE id_employee = ? AND model_version = ? AND row_hash = ?",
+                    (id_employee, model_version, row_hash),
+                ).fetchone()
+            except sqlite3.Error as e:
+                # Fichier en cours de création ou illisible : calcul direct
+                print(f"Lecture du store d'explications impossible: {e}")
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        score, base_value, contributions, image_png = row
+        return {
+            "score": score,
+            "base_value": base_value,
+            "contributions": np.frombuffer(contributions, dtype=np.float32),
+            "image_png": image_png,
+        }
+
+    def put_many(self, rows):
+        """Écrit des explications : tuples (id_employee, version, empreinte,
+        score, valeur de base, contributions, image PNG ou None)."""
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SCHEMA)
+            conn.executemany(
+                "INSERT OR REPLACE INTO explanation VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        int(id_employee),
+                        str(version),
+                        row_hash,
+                        float(score),
+                        float(base_value),
+                        np.asarray(contributions, dtype=np.float32).tobytes(),
+                        image_png,
+                    )
+                    for (
+                        id_employee,
+                        version,
+                        row_hash,
+                        score,
+                        base_value,
+                        contributions,
+                        image_png,
+                    ) in rows
+                ],
+            )
+        conn.close()
+
+    def delete_other_versions(self, model_version):
+        """Supprime les explications des autres versions du modèle."""
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(SCHEMA)
+            deleted = conn.execute(
+                "DELETE FROM explanation WHERE model_version != ?", (model_version,)
+            ).rowcount
+        conn.close()
+        return deleted
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "available": os.path.exists(self.path),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
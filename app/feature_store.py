@@ -0,0 +1,277 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_object_dtype, is_string_dtype
+from sqlalchemy import bindparam, text
+
+
+class _Snapshot:
+    """Copie immuable de la table `raw` : colonnes typées + index id → ligne."""
+
+    def __init__(self, frame, signature):
+        for col in frame.columns:
+            if is_object_dtype(frame[col]) or is_string_dtype(frame[col]):
+                frame[col] = frame[col].astype("category")
+        self.frame = frame.reset_index(drop=True)
+        self.columns = list(self.frame.columns)
+        self.arrays = [self.frame[col].to_numpy() for col in self.columns]
+        ids = self.frame["id_employee"].tolist()
+        self.index = {}
+        for pos, id_employee in enumerate(ids):
+            # Première occurrence, comme l'ancien SELECT ... iloc[0]
+            self.index.setdefault(id_employee, pos)
+        self.ids = list(self.index)
+        self.signature = signature
+
+
+def _native(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _row_hash(*values):
+    # hash() de Python : stable dans le processus, seul lecteur de la signature
+    return hash(values) & 0xFFFFFFFF
+
+
+class EmployeeStore:
+    """Table `raw` chargée une fois en mémoire pour servir les lectures de l'API.
+
+    Les lectures d'un employé deviennent une recherche dans un dict. Toutes les
+    `refresh_interval_s` secondes, la signature de la table (nombre de lignes,
+    id maximal, somme de contrôle du contenu) est relue : si seuls des
+    employés ont été ajoutés en fin de table, ils sont chargés seuls ; sinon
+    (mise à jour, suppression) la table est rechargée en entier.
+    `refresh_rows` permet d'invalider des employés précis.
+
+    Avec `start_watching()` (API), la signature est relue par un thread de
+    fond : une lecture ne touche jamais la base, une fois la table chargée.
+    Sans lui (scripts, tests), elle est relue par la lecture qui suit
+    l'échéance.
+    """
+
+    def __init__(self, get_engine, refresh_interval_s=30):
+        self.get_engine = get_engine
+        self.refresh_interval_s = refresh_interval_s
+        self._snapshot = None
+        self._load_lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._last_check = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self.load_time_ms = None
+        self.reloads = 0
+        self.incremental_loads = 0
+
+    # ----- Lecture -----
+
+    def get(self, id_employee):
+        """Ligne `raw` d'un employé (dict), ou None s'il est absent."""
+        snapshot = self._current()
+        pos = snapshot.index.get(id_employee)
+        if pos is None:
+            return None
+        return {
+            col: _native(arr[pos])
+            for col, arr in zip(snapshot.columns, snapshot.arrays)
+        }
+
+    def get_many(self, ids_employee):
+        """DataFrame des employés trouvés, dans l'ordre demandé."""
+        snapshot = self._current()
+        positions = [snapshot.index[i] for i in ids_employee if i in snapshot.index]
+        return self._decoded(snapshot.frame.iloc[positions].reset_index(drop=True))
+
+    def ids(self):
+        return list(self._current().ids)
+
+    def __len__(self):
+        return len(self._current().ids)
+
+    @property
+    def loaded(self):
+        return self._snapshot is not None
+
+    @property
+    def watching(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def fresh(self):
+        """Copie chargée, surveillée en tâche de fond ou vérifiée il y a moins de
+        refresh_interval_s : une lecture ne déclenchera aucune requête SQL."""
+        return self._snapshot is not None and (
+            self.watching
+            or time.monotonic() - self._last_check < self.refresh_interval_s
+        )
+
+    # ----- Chargement / rafraîchissement -----
+
+    def load(self):
+        """(Re)charge toute la table `raw`."""
+        with self._load_lock:
+            start = time.perf_counter()
+            with self.get_engine().connect() as conn:
+                frame = pd.read_sql(text("SELECT * FROM raw"), conn)
+                signature = self._read_signature(conn)
+            self._snapshot = _Snapshot(frame, signature)
+            self._last_check = time.monotonic()
+            self.load_time_ms = (time.perf_counter() - start) * 1000
+            self.reloads += 1
+        return self._snapshot
+
+    def refresh(self):
+        """Compare la signature de `raw` et recharge ce qui a changé."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load()
+        with self.get_engine().connect() as conn:
+            signature = self._read_signature(conn)
+            self._last_check = time.monotonic()
+            if signature == snapshot.signature:
+                return snapshot
+            old_count, old_max, old_sum = snapshot.signature
+            new_count, new_max, new_sum = signature
+            if old_max is not None and new_max is not None and new_max > old_max:
+                # Ajout seul : les lignes ajoutées expliquent tout l'écart
+                added_count, _, added_sum = self._read_signature(conn, old_max)
+                if old_count + added_count == new_count and (old_sum or 0) + (
+                    added_sum or 0
+                ) == (new_sum or 0):
+                    added = pd.read_sql(
+                        text("SELECT * FROM raw WHERE id_employee > :max_id"),
+                        conn,
+                        params={"max_id": old_max},
+                    )
+                    if len(added) == added_count:
+                        with self._load_lock:
+                            frame = pd.concat(
+                                [self._decoded(snapshot.frame), added],
+                                ignore_index=True,
+                            )
+                            self._snapshot = _Snapshot(frame, signature)
+                            self.incremental_loads += 1
+                        return self._snapshot
+        return self.load()
+
+    def refresh_rows(self, ids_employee):
+        """Relit en base les employés donnés (ajout, modification ou suppression)."""
+        ids_employee = list(ids_employee)
+        if self._snapshot is None or not ids_employee:
+            return self._current()
+        query = text("SELECT * FROM raw WHERE id_employee IN :ids").bindparams(
+            bindparam("ids", expanding=True)
+        )
+        with self.get_engine().connect() as conn:
+            fresh = pd.read_sql(query, conn, params={"ids": ids_employee})
+            signature = self._read_signature(conn)
+        with self._load_lock:
+            frame = self._decoded(self._snapshot.frame)
+            frame = frame[~frame["id_employee"].isin(ids_employee)]
+            frame = pd.concat([frame, fresh], ignore_index=True)
+            self._snapshot = _Snapshot(frame, signature)
+            self.incremental_loads += 1
+        return self._snapshot
+
+    def clear(self):
+        with self._load_lock:
+            self._snapshot = None
+
+    # ----- Surveillance -----
+
+    def start_watching(self):
+        if self.refresh_interval_s <= 0 or self.watching:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="employee-store-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.refresh_interval_s):
+            with self._check_lock:
+                try:
+                    self.refresh()
+                except Exception as e:  # noqa: BLE001
+                    # Base momentanément indisponible : on sert la copie en mémoire
+                    print(f"Rafraîchissement du cache employés impossible: {e}")
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "rows": len(snapshot.ids) if snapshot is not None else 0,
+            "load_time_ms": self.load_time_ms,
+            "reloads": self.reloads,
+            "incremental_loads": self.incremental_loads,
+        }
+
+    def _current(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._check_lock:
+                if self._snapshot is None:
+                    self.load()
+                return self._snapshot
+        if self.watching:
+            # Signature relue par le thread de fond, jamais sur une requête
+            return snapshot
+        expired = time.monotonic() - self._last_check >= self.refresh_interval_s
+        # Une seule requête vérifie la signature, les autres lisent la copie
+        if expired and self._check_lock.acquire(blocking=False):
+            try:
+                return self.refresh()
+            except Exception as e:  # noqa: BLE001
+                # Base momentanément indisponible : on sert la copie en mémoire
+                print(f"Rafraîchissement du cache employés impossible: {e}")
+                self._last_check = time.monotonic()
+            finally:
+                self._check_lock.release()
+        return snapshot
+
+    @classmethod
+    def _read_signature(cls, conn, min_id=None):
+        """(nombre de lignes, id maximal, somme de contrôle), au-delà de `min_id`.
+
+        La somme de contrôle additionne une empreinte 32 bits de chaque ligne :
+        un UPDATE en place la change, et elle se vérifie par addition après un
+        ajout en fin de table.
+        """
+        query = f"SELECT count(*), max(id_employee), {cls._checksum_sql(conn)} FROM raw"
+        params = {}
+        if min_id is not None:
+            query += " WHERE id_employee > :min_id"
+            params["min_id"] = min_id
+        row = conn.execute(text(query), params).one()
+        return (row[0], row[1], row[2])
+
+    @staticmethod
+    def _checksum_sql(conn):
+        dialect = conn.dialect.name
+        if dialect == "postgresql":
+            return "sum(('x' || substr(md5(raw::text), 1, 8))::bit(32)::bigint)"
+        if dialect == "sqlite":
+            # Valeurs passées telles quelles : pas de conversion en texte (quote)
+            conn.connection.driver_connection.create_function(
+                "row_hash", -1, _row_hash, deterministic=True
+            )
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(raw)"))]
+            values = ", ".join(f'"{col}"' for col in columns)
+            return f"sum(row_hash({values}))"
+        # Autre base : signature (nombre de lignes, id maximal) seule
+        return "NULL"
+
+    @staticmethod
+    def _decoded(frame):
+        frame = frame.copy()
+        for col in frame.columns:
+            if isinstance(frame[col].dtype, pd.CategoricalDtype):
+                frame[col] = frame[col].astype(object)
+        return frame
@@ -10,6 +10,7 @@ FASTAPI_URL = "http://localhost:8000/predict/"
 EMPLOYEE_LIST_URL = "http://localhost:8000/employee_list"
 HEALTH_URL = "http://localhost:8000/health"
 FASTAPI_LOG_URL = "http://localhost:8000/log_sample"
+WATERFALL_URL = "http://localhost:8000/explain/{id_employee}/waterfall.png"
 
 
 # Initialisation de la liste à vide
@@ -118,11 +119,18 @@ def predict_attrition(manual_id):
     table = match_and_sum_shap(raw_features, shap_contribs)
     img_b64 = res.get("shap_waterfall_img", None)
     img = None
-    if img_b64:
-        try:
+    try:
+        if img_b64:
             img = Image.open(io.BytesIO(base64.b64decode(img_b64)))
-        except Exception:
-            img = None
+        else:
+            # Image servie à part (et mise en cache) par l'API
+            resp_img = requests.get(
+                WATERFALL_URL.format(id_employee=id_employee), timeout=12
+            )
+            if resp_img.status_code == 200:
+                img = Image.open(io.BytesIO(resp_img.content))
+    except Exception:
+        img = None
     return pred, score, img, table
 
 
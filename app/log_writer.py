@@ -0,0 +1,116 @@
+import atexit
+import queue
+import threading
+import time
+
+
+class LogWriter:
+    """File d'écriture des logs (model_input / model_output / api_log) en tâche de fond.
+
+    Les requêtes déposent un enregistrement dans une file bornée et repartent
+    aussitôt ; un thread dédié vide la file par lots (toutes les `batch_size`
+    entrées ou toutes les `flush_interval_ms` millisecondes) et les passe à
+    `write_batch`, qui les écrit en une seule transaction. Si la file est
+    pleine, l'enregistrement est abandonné et compté dans `dropped`.
+    """
+
+    def __init__(
+        self, write_batch, max_queue=10000, batch_size=200, flush_interval_ms=500
+    ):
+        self.write_batch = write_batch
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        atexit.register(self.stop)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, record):
+        """Dépose un enregistrement ; retourne False s'il a été abandonné."""
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self):
+        """Bloque jusqu'à ce que tous les enregistrements déposés soient écrits."""
+        if self._thread is None or not self._thread.is_alive():
+            while not self._queue.empty():
+                self._write(self._drain())
+            return
+        self._queue.join()
+
+    def stop(self):
+        """Arrête le thread après avoir écrit tout ce qui reste dans la file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            records = self._drain()
+            if records:
+                self._write(records)
+
+    def _drain(self):
+        records = []
+        try:
+            records.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return records
+        deadline = time.monotonic() + self.flush_interval
+        while len(records) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                records.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return records
+
+    def _write(self, records):
+        if not records:
+            return
+        try:
+            self.write_batch(records)
+            self.written += len(records)
+            self.batches += 1
+        except Exception as e:  # noqa: BLE001
+            self.failed += len(records)
+            print(f"Erreur écriture lot de logs ({len(records)} entrées): {e}")
+        finally:
+            for _ in records:
+                self._queue.task_done()
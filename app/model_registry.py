@@ -0,0 +1,246 @@
+import hashlib
+import os
+import threading
+import time
+
+from app.compiled_preprocessor import input_schema
+from app.explainer import ExplainerRegistry
+from app.feature_cache import TransformedFeatureCache
+
+
+class LoadedModel:
+    """Une version de modèle prête à servir, avec ses artefacts dérivés.
+
+    Pipeline, explainer SHAP, cache de features préprocessées (et préprocesseur
+    compilé), moteur d'arbres et pool d'explication sont propres à la version.
+    Une requête lit le modèle courant une seule fois et travaille ensuite sur
+    un ensemble cohérent, même si une autre version est activée entre-temps.
+    """
+
+    def __init__(self, pipeline, version, path=None, digest=None):
+        self.pipeline = pipeline
+        self.version = version
+        self.path = path
+        self.digest = digest
+        self.explainers = ExplainerRegistry()
+        self.feature_cache = TransformedFeatureCache()
+        self.tree_engine = None
+        self.explain_pool = None
+        self.loaded_at = time.time()
+        self.prepare_time_ms = None
+        self._input_schema = None
+
+    @property
+    def is_dummy(self):
+        return type(self.pipeline).__name__ == "DummyModel"
+
+    @property
+    def fingerprint(self):
+        """Identité du modèle servi : version et empreinte du contenu du fichier.
+
+        Clé des caches, ETag et journaux : un fichier réécrit sous le même nom
+        (même version) change d'empreinte, aucun résultat de l'ancien modèle
+        n'est resservi.
+        """
+        return f"{self.version}+{self.digest}" if self.digest else self.version
+
+    @property
+    def explainer(self):
+        return self.explainers.get(self.pipeline)
+
+    @property
+    def input_schema(self):
+        """Colonnes d'entrée du préprocesseur et catégories connues (voir input_schema)."""
+        if self._input_schema is None:
+            steps = getattr(self.pipeline, "named_steps", {})
+            self._input_schema = input_schema(steps.get("preprocessor"))
+        return self._input_schema
+
+    def info(self):
+        return {
+            "version": self.version,
+            "fingerprint": self.fingerprint,
+            "path": self.path,
+            "loaded_at": time.strftime(
+                "%Y-%m-%dT%H:%M:%S", time.localtime(self.loaded_at)
+            ),
+            "prepare_time_ms": self.prepare_time_ms,
+        }
+
+
+def version_of(path, default_version):
+    """Version déduite du nom de fichier : `<nom>-<version>.joblib`, sinon défaut."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem.rsplit("-", 1)[1] if "-" in stem else default_version
+
+
+def file_digest(path):
+    """Empreinte courte (SHA-256) du contenu d'un fichier de modèle."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class ModelRegistry:
+    """Versions de modèle d'un répertoire, avec bascule à chaud et retour arrière.
+
+    Un thread surveille `models_dir` toutes les `watch_interval_s` secondes :
+    un fichier `.joblib` nouveau ou modifié est chargé et préparé (explainer,
+    caches chauds...) en tâche de fond, puis remplace le modèle courant en une
+    seule affectation. Les requêtes en cours terminent avec l'ancienne
+    version, gardée comme `previous` pour `rollback()`.
+
+    - `load(path)` : retourne le pipeline d'un fichier ;
+    - `prepare(model)` : construit les artefacts manquants d'un LoadedModel
+      (idempotent), avant son activation ;
+    - `retire(model)` : libère les ressources lourdes d'une version qui cesse
+      d'être servie.
+    """
+
+    def __init__(
+        self,
+        models_dir,
+        load,
+        prepare=None,
+        retire=None,
+        default_version="1.0",
+        watch_interval_s=10,
+    ):
+        self.models_dir = models_dir
+        self.load = load
+        self.prepare = prepare or (lambda model: None)
+        self.retire = retire or (lambda model: None)
+        self.default_version = default_version
+        self.watch_interval_s = watch_interval_s
+        self.current = None
+        self.previous = None
+        self._seen = {}
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.swaps = 0
+        self.failed = 0
+
+    # ----- Fichiers -----
+
+    def available(self):
+        """Fichiers de modèle du répertoire : {chemin: date de modification}."""
+        try:
+            names = os.listdir(self.models_dir)
+        except FileNotFoundError:
+            return {}
+        files = {}
+        for name in names:
+            if name.endswith(".joblib"):
+                path = os.path.join(self.models_dir, name)
+                files[path] = os.path.getmtime(path)
+        return files
+
+    def load_path(self, path):
+        """Charge et prépare la version d'un fichier, sans l'activer."""
+        start = time.perf_counter()
+        # Empreinte lue avant le chargement : un fichier réécrit entre-temps
+        # change de date et sera rechargé au contrôle suivant
+        digest = file_digest(path)
+        model = LoadedModel(
+            self.load(path), version_of(path, self.default_version), path, digest
+        )
+        self.prepare(model)
+        model.prepare_time_ms = (time.perf_counter() - start) * 1000
+        return model
+
+    # ----- Activation -----
+
+    def load_latest(self):
+        """Charge et active le fichier le plus récent du répertoire."""
+        files = self.available()
+        if not files:
+            raise FileNotFoundError(f"Aucun modèle dans {self.models_dir}")
+        path = max(files, key=files.get)
+        self._seen = dict(files)
+        return self.activate(self.load_path(path))
+
+    def activate(self, model):
+        """Sert `model` ; l'ancienne version devient `previous`."""
+        with self._lock:
+            replaced = self.current
+            self.previous, self.current = replaced, model
+            self.swaps += 1
+        if replaced is not None and replaced is not model:
+            self.retire(replaced)
+        return model
+
+    def rollback(self):
+        """Revient à la version précédente (gardée en mémoire)."""
+        with self._lock:
+            previous = self.previous
+        if previous is None:
+            raise LookupError("Aucune version précédente")
+        self.prepare(previous)
+        with self._lock:
+            self.previous, self.current = self.current, previous
+            self.swaps += 1
+        self.retire(self.previous)
+        return previous
+
+    def check(self):
+        """Charge et active un fichier nouveau ou modifié ; None sinon."""
+        with self._check_lock:
+            return self._check()
+
+    def _check(self):
+        files = self.available()
+        changed = [p for p, mtime in files.items() if self._seen.get(p) != mtime]
+        self._seen = dict(files)
+        if not changed:
+            return None
+        path = max(changed, key=files.get)
+        try:
+            model = self.load_path(path)
+        except Exception as e:  # noqa: BLE001
+            # Fichier illisible ou incompatible : la version servie ne change pas
+            self.failed += 1
+            print(f"Chargement du modèle {path} impossible: {e}")
+            return None
+        print(
+            f"Modèle {model.fingerprint} chargé en {model.prepare_time_ms:.1f} ms, activé"
+        )
+        return self.activate(model)
+
+    # ----- Surveillance -----
+
+    def start_watching(self):
+        if self.watch_interval_s <= 0:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="model-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval_s):
+            self.check()
+
+    def stats(self):
+        current, previous = self.current, self.previous
+        return {
+            "current": current.info() if current is not None else None,
+            "previous": previous.info() if previous is not None else None,
+            "available": sorted(
+                version_of(p, self.default_version) for p in self.available()
+            ),
+            "swaps": self.swaps,
+            "failed": self.failed,
+        }
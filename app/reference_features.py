@@ -0,0 +1,270 @@
+import bisect
+import datetime
+import hashlib
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+FORMAT = 1
+LABELS = ["Très bas", "Bas", "Moyen", "Haut"]
+QUARTILES = [0.25, 0.5, 0.75]
+
+# Colonnes de `raw` calculées à partir des autres (et de la population)
+DERIVED_COLUMNS = (
+    "nouveau_responsable",
+    "indice_evolution_salaire",
+    "score_evolution_carriere",
+    "indice_evol_cat",
+    "score_carriere_cat",
+    "salaire_cat",
+    "salaire_cat_eq",
+    "position_salaire_poste",
+    "position_salaire_poste_anc",
+)
+# Colonnes dont elles dépendent
+SOURCE_COLUMNS = (
+    "revenu_mensuel",
+    "augmentation_salaire_precedente",
+    "annees_depuis_la_derniere_promotion",
+    "annees_dans_l_entreprise",
+    "annees_dans_le_poste_actuel",
+    "annes_sous_responsable_actuel",
+    "poste_departement",
+)
+
+
+def career_scores(augmentation, annees_promotion, annees_entreprise, revenu):
+    """indice_evolution_salaire et score_evolution_carriere (scalaires ou tableaux)."""
+    indice = (augmentation + 1e-6) / (annees_promotion + 1)
+    score = indice * (1 / (annees_entreprise + 1)) * np.log1p(revenu)
+    return indice, score
+
+
+def compute_reference_stats(df):
+    """Quantiles et bornes de classes de la population (table `raw` ou extrait).
+
+    Mêmes calculs que `prepare_central_data` : pd.qcut (quartiles) pour
+    indice_evol_cat et score_carriere_cat, pd.cut (4 classes de même largeur)
+    pour salaire_cat_eq, quartiles global, par poste et par (poste, ancienneté
+    dans le poste) pour les catégories de salaire.
+    """
+    indice, score = career_scores(
+        df["augmentation_salaire_precedente"],
+        df["annees_depuis_la_derniere_promotion"],
+        df["annees_dans_l_entreprise"],
+        df["revenu_mensuel"],
+    )
+    revenu = df["revenu_mensuel"]
+    poste = df.groupby("poste_departement", observed=True)["revenu_mensuel"]
+    poste_anc = df.groupby(
+        ["poste_departement", "annees_dans_le_poste_actuel"], observed=True
+    )["revenu_mensuel"]
+    stats = {
+        "format": FORMAT,
+        "rows": len(df),
+        "salaire": revenu.quantile(QUARTILES).tolist(),
+        "salaire_eq_edges": pd.cut(revenu, bins=4, retbins=True)[1].tolist(),
+        "indice_evol_edges": pd.qcut(indice, q=4, retbins=True)[1].tolist(),
+        "score_carriere_edges": pd.qcut(score, q=4, retbins=True)[1].tolist(),
+        "poste": {
+            key: values
+            for key, values in zip(*_group_table(poste.quantile(QUARTILES).unstack()))
+        },
+        "poste_anciennete": [
+            [key[0], int(key[1]), *values]
+            for key, values in zip(
+                *_group_table(poste_anc.quantile(QUARTILES).unstack())
+            )
+        ],
+    }
+    stats["version"] = stats_version(stats)
+    stats["created_at"] = datetime.datetime.now(datetime.UTC).isoformat()
+    return stats
+
+
+def _group_table(table):
+    return list(table.index), table.to_numpy().tolist()
+
+
+def stats_version(stats):
+    """Empreinte du contenu : deux calculs sur les mêmes données ont la même version."""
+    content = {k: v for k, v in stats.items() if k not in ("version", "created_at")}
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()[:12]
+
+
+def save_reference_stats(stats, path):
+    """Écrit l'artefact (fichier temporaire puis renommage atomique)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_reference_stats(path):
+    with open(path, encoding="utf-8") as f:
+        stats = json.load(f)
+    if stats.get("format") != FORMAT:
+        raise ValueError(f"Format de statistiques inconnu : {stats.get('format')}")
+    return stats
+
+
+def _missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _quartile_label(x, quartiles):
+    """Règles de add_salary_group_feature (np.select), pour une valeur.
+
+    Même correspondance condition → libellé que le np.select d'origine
+    (au-dessus de Q3 : LABELS[2]), pour reproduire la table `raw`. Groupe
+    jamais observé (`quartiles` None) : groupe d'un seul employé, dont les
+    quartiles valent tous `x`, comme dans le calcul complet.
+    """
+    if _missing(x):
+        return "Moyen"
+    if quartiles is None:
+        quartiles = (x, x, x)
+    q1, mediane, q3 = quartiles
+    if x < q1:
+        return LABELS[0]
+    if q1 <= x < mediane:
+        return LABELS[1]
+    if x > q3:
+        return LABELS[2]
+    if mediane <= x <= q3:
+        return LABELS[3]
+    return "Moyen"
+
+
+class RowFeaturizer:
+    """Colonnes dérivées d'un employé à partir des statistiques de référence.
+
+    Une ligne se calcule seule, sans relire la table : les classes (qcut, cut)
+    sont fermées à droite comme dans pandas, une valeur hors de l'intervalle
+    observé va dans la classe extrême. Un poste ou un groupe (poste,
+    ancienneté) jamais observé est traité comme un groupe d'un seul employé
+    (Q1 = médiane = Q3 = son revenu) : « Haut », comme dans le calcul complet.
+    """
+
+    def __init__(self, stats):
+        self.version = stats["version"]
+        self.created_at = stats.get("created_at")
+        self.rows = stats["rows"]
+        self._salaire = tuple(stats["salaire"])
+        # Bornes intérieures : l'indice de classe est un bisect_left
+        self._salaire_eq = stats["salaire_eq_edges"][1:-1]
+        self._indice_evol = stats["indice_evol_edges"][1:-1]
+        self._score_carriere = stats["score_carriere_edges"][1:-1]
+        self._poste = {k: tuple(v) for k, v in stats["poste"].items()}
+        self._poste_anc = {
+            (poste, annees): (q1, mediane, q3)
+            for poste, annees, q1, mediane, q3 in stats["poste_anciennete"]
+        }
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(compute_reference_stats(df))
+
+    @classmethod
+    def load(cls, path):
+        return cls(load_reference_stats(path))
+
+    @staticmethod
+    def _bin(edges, x):
+        if _missing(x):
+            return None
+        return LABELS[bisect.bisect_left(edges, x)]
+
+    def featurize(self, record):
+        """Copie de `record` (dict) avec les colonnes dérivées recalculées."""
+        row = dict(record)
+        revenu = row["revenu_mensuel"]
+        poste = row["poste_departement"]
+        indice, score = career_scores(
+            row["augmentation_salaire_precedente"],
+            row["annees_depuis_la_derniere_promotion"],
+            row["annees_dans_l_entreprise"],
+            revenu,
+        )
+        indice, score = float(indice), float(score)
+        row["nouveau_responsable"] = (
+            "Oui" if row["annes_sous_responsable_actuel"] == 0 else "Non"
+        )
+        row["indice_evolution_salaire"] = indice
+        row["score_evolution_carriere"] = score
+        row["indice_evol_cat"] = self._bin(self._indice_evol, indice)
+        row["score_carriere_cat"] = self._bin(self._score_carriere, score)
+        row["salaire_cat"] = _quartile_label(revenu, self._salaire)
+        row["salaire_cat_eq"] = self._bin(self._salaire_eq, revenu)
+        row["position_salaire_poste"] = _quartile_label(revenu, self._poste.get(poste))
+        row["position_salaire_poste_anc"] = _quartile_label(
+            revenu, self._poste_anc.get((poste, row["annees_dans_le_poste_actuel"]))
+        )
+        return row
+
+    def featurize_frame(self, df):
+        """Version vectorisée de `featurize` (DataFrame, une ligne par employé)."""
+        df = df.copy()
+        revenu = df["revenu_mensuel"].to_numpy(dtype=float)
+        indice, score = career_scores(
+            df["augmentation_salaire_precedente"].to_numpy(dtype=float),
+            df["annees_depuis_la_derniere_promotion"].to_numpy(dtype=float),
+            df["annees_dans_l_entreprise"].to_numpy(dtype=float),
+            revenu,
+        )
+        df["nouveau_responsable"] = np.where(
+            df["annes_sous_responsable_actuel"] == 0, "Oui", "Non"
+        ).astype(object)
+        df["indice_evolution_salaire"] = indice
+        df["score_evolution_carriere"] = score
+        df["indice_evol_cat"] = self._bin_array(self._indice_evol, indice)
+        df["score_carriere_cat"] = self._bin_array(self._score_carriere, score)
+        df["salaire_cat"] = self._quartile_array(
+            revenu, np.tile(self._salaire, (len(df), 1))
+        )
+        df["salaire_cat_eq"] = self._bin_array(self._salaire_eq, revenu)
+        postes = df["poste_departement"].tolist()
+        annees = df["annees_dans_le_poste_actuel"].tolist()
+        df["position_salaire_poste"] = self._quartile_array(
+            revenu, self._lookup(self._poste, postes, revenu)
+        )
+        df["position_salaire_poste_anc"] = self._quartile_array(
+            revenu, self._lookup(self._poste_anc, list(zip(postes, annees)), revenu)
+        )
+        return df
+
+    @staticmethod
+    def _bin_array(edges, values):
+        labels = np.array(LABELS, dtype=object)[np.searchsorted(edges, values)]
+        labels[np.isnan(values)] = None
+        return labels
+
+    @staticmethod
+    def _lookup(table, keys, revenu):
+        """Quartiles du groupe de chaque ligne ; groupe inconnu : le revenu."""
+        return np.array(
+            [table.get(key, (x, x, x)) for key, x in zip(keys, revenu)], dtype=float
+        )
+
+    @staticmethod
+    def _quartile_array(revenu, quartiles):
+        q1, mediane, q3 = quartiles.T
+        conditions = [
+            revenu < q1,
+            (revenu >= q1) & (revenu < mediane),
+            (revenu > q3),
+            (revenu >= mediane) & (revenu <= q3),
+        ]
+        choices = np.array([*LABELS, "Moyen"], dtype=object)
+        return choices[np.select(conditions, range(4), default=4)]
+
+    def info(self):
+        return {
+            "version": self.version,
+            "created_at": self.created_at,
+            "rows": self.rows,
+        }
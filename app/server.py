@@ -0,0 +1,159 @@
+"""Lancement multi-workers de l'API : chargement unique, puis fork.
+
+Le processus maître importe `app.api` (modèle mappé en mémoire, explainer,
+engines), charge la table `raw` et préprocesse les features, puis ouvre le
+socket d'écoute et fork N workers uvicorn. Les tableaux en lecture seule
+sont partagés en copy-on-write au lieu d'être rechargés par chaque worker.
+
+Usage (depuis la racine du dépôt, Linux) :
+    python -m app.server --workers 4 --host 0.0.0.0 --port 8000
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import threading
+import time
+
+
+def memory_usage():
+    """Mémoire du processus courant en Mo : rss, pss (part des pages partagées), private.
+
+    Lue dans /proc/self/smaps_rollup (Linux) ; valeurs None si indisponible.
+    """
+    values = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        pass
+    private = None
+    if "Private_Clean" in values:
+        private = values["Private_Clean"] + values.get("Private_Dirty", 0.0)
+    return {"rss": values.get("Rss"), "pss": values.get("Pss"), "private": private}
+
+
+def _format_mb(value):
+    return "n/a" if value is None else f"{value:.1f}"
+
+
+def _listen(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(api, config, sock, report_fd):
+    import uvicorn
+
+    forked_at = time.perf_counter()
+    # Connexions SQLAlchemy héritées du maître : chaque worker ouvre les siennes
+    api.engine.dispose(close=False)
+    api.engine_log.dispose(close=False)
+    server = uvicorn.Server(config)
+
+    def report():
+        while not server.started:
+            if server.should_exit:
+                return
+            time.sleep(0.01)
+        line = {
+            "pid": os.getpid(),
+            "ready_ms": (time.perf_counter() - forked_at) * 1000,
+            **memory_usage(),
+        }
+        os.write(report_fd, (json.dumps(line) + "\n").encode("utf-8"))
+
+    threading.Thread(target=report, daemon=True).start()
+    server.run(sockets=[sock])
+
+
+def _print_reports(read_fd, n_workers):
+    with os.fdopen(read_fd) as reports:
+        for _ in range(n_workers):
+            line = reports.readline()
+            if not line:
+                return
+            r = json.loads(line)
+            print(
+                f"Worker {r['pid']} prêt en {r['ready_ms']:.1f} ms - "
+                f"RSS {_format_mb(r['rss'])} Mo, PSS {_format_mb(r['pss'])} Mo, "
+                f"privé {_format_mb(r['private'])} Mo"
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    # Les workers HTTP apportent déjà le parallélisme : pas de pool
+    # d'explication par worker, sauf demande explicite
+    os.environ.setdefault("EXPLAIN_WORKERS", "0")
+
+    import uvicorn
+
+    start = time.perf_counter()
+    from app import api
+
+    api.warm_up()
+    # shap et matplotlib importés avant le fork : pages partagées par les workers
+    api.warm_explain_stack(api.model_registry.current)
+    memory = memory_usage()
+    print(
+        f"Préchargement terminé en {(time.perf_counter() - start) * 1000:.1f} ms - "
+        f"RSS maître {_format_mb(memory['rss'])} Mo"
+    )
+
+    sock = _listen(args.host, args.port)
+    config = uvicorn.Config(api.app, log_level=args.log_level)
+    read_fd, write_fd = os.pipe()
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                _run_worker(api, config, sock, write_fd)
+            finally:
+                os._exit(0)
+        children.append(pid)
+    os.close(write_fd)
+    sock.close()
+    threading.Thread(
+        target=_print_reports, args=(read_fd, args.workers), daemon=True
+    ).start()
+
+    def stop_workers(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop_workers)
+    signal.signal(signal.SIGINT, stop_workers)
+    for pid in children:
+        while True:
+            try:
+                os.waitpid(pid, 0)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+
+
+if __name__ == "__main__":
+    main()
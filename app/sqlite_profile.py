@@ -0,0 +1,68 @@
+from sqlalchemy import create_engine, event
+
+
+def sqlite_pragmas(role, busy_timeout_ms=5000, cache_kb=65536, mmap_mb=256, wal=True):
+    """PRAGMA appliqués à chaque connexion SQLite, selon son rôle.
+
+    - "writer" : WAL (les lectures ne sont plus bloquées par les écritures),
+      synchronous=NORMAL (fsync au checkpoint seulement, sûr en WAL) ;
+    - "reader" : query_only, toute écriture est refusée.
+
+    Pour les deux : attente sur verrou (busy_timeout) au lieu d'une erreur
+    immédiate « database is locked », cache de pages et lecture par mmap.
+    """
+    pragmas = []
+    if role == "writer":
+        if wal:
+            pragmas.append(("journal_mode", "WAL"))
+        pragmas.append(("synchronous", "NORMAL"))
+    else:
+        pragmas.append(("query_only", "ON"))
+    pragmas += [
+        ("busy_timeout", int(busy_timeout_ms)),
+        # Valeur négative : taille en Kio plutôt qu'en pages
+        ("cache_size", -int(cache_kb)),
+        ("mmap_size", int(mmap_mb) * 1024 * 1024),
+    ]
+    return pragmas
+
+
+def apply_pragmas(engine, pragmas):
+    """Exécute `pragmas` à l'ouverture de chaque connexion de `engine`."""
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+def create_sqlite_engine(path, role="reader", readers=8, **pragma_options):
+    """Engine SQLite du profil de production.
+
+    - "writer" : une seule connexion (pool de taille 1, sans débordement) ;
+      les écritures de tous les threads passent l'une après l'autre par elle
+      et ne se disputent plus le verrou de la base ;
+    - "reader" : pool de `readers` connexions ouvertes en lecture seule
+      (`mode=ro`), qui lisent en parallèle de l'écrivain grâce au WAL.
+    """
+    if role == "writer":
+        engine = create_engine(
+            f"sqlite:///{path}",
+            pool_size=1,
+            max_overflow=0,
+            connect_args={"check_same_thread": False},
+        )
+    elif role == "reader":
+        engine = create_engine(
+            f"sqlite:///file:{path}?mode=ro&uri=true",
+            pool_size=readers,
+            max_overflow=0,
+            connect_args={"check_same_thread": False},
+        )
+    else:
+        raise ValueError("Role must be 'writer' or 'reader'")
+    return apply_pragmas(engine, sqlite_pragmas(role, **pragma_options))
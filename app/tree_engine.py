@@ -0,0 +1,112 @@
+import json
+
+import numpy as np
+
+
+class FlatTreeEnsemble:
+    """Évaluateur NumPy d'un ensemble d'arbres XGBoost (objectif binary:logistic).
+
+    Les arbres du booster sont exportés une fois dans des tableaux plats
+    (feature, seuil, fils gauche/droit, branche des valeurs manquantes,
+    valeur de feuille). L'évaluation parcourt tous les arbres et toutes les
+    lignes en même temps, un niveau de profondeur par itération, sans
+    DMatrix ni validation des noms de features.
+    """
+
+    def __init__(
+        self, feature, threshold, left, right, missing, value, roots, base_margin
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing = missing
+        self.value = value
+        self.roots = roots
+        self.base_margin = base_margin
+        self.max_depth = self._max_depth()
+
+    @classmethod
+    def from_xgb(cls, estimator):
+        """Construit l'évaluateur depuis un XGBClassifier entraîné."""
+        booster = estimator.get_booster()
+        model = json.loads(booster.save_raw(raw_format="json"))
+        learner = model["learner"]
+        objective = learner["objective"]["name"]
+        if objective != "binary:logistic":
+            raise NotImplementedError(f"Objectif non supporté : {objective}")
+        trees = learner["gradient_booster"]["model"]["trees"]
+        n_trees = booster.num_boosted_rounds()
+        best_iteration = getattr(estimator, "best_iteration", None)
+        if best_iteration is not None:
+            n_trees = best_iteration + 1
+        trees = trees[:n_trees]
+
+        feature, threshold, left, right, missing, value, roots = ([] for _ in range(7))
+        offset = 0
+        for tree in trees:
+            if any(tree.get("split_type", [])):
+                raise NotImplementedError("Splits catégoriels non supportés")
+            lefts = np.asarray(tree["left_children"])
+            rights = np.asarray(tree["right_children"])
+            is_leaf = lefts == -1
+            conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            default_left = np.asarray(tree["default_left"], dtype=bool)
+            roots.append(offset)
+            feature.append(np.where(is_leaf, -1, tree["split_indices"]))
+            threshold.append(conditions)
+            left.append(np.where(is_leaf, -1, lefts + offset))
+            right.append(np.where(is_leaf, -1, rights + offset))
+            missing.append(
+                np.where(is_leaf, -1, np.where(default_left, lefts, rights) + offset)
+            )
+            # Pour une feuille, XGBoost range la valeur dans split_conditions
+            value.append(np.where(is_leaf, conditions, 0.0))
+            offset += len(lefts)
+
+        base_score = float(learner["learner_model_param"]["base_score"])
+        return cls(
+            feature=np.concatenate(feature).astype(np.int64),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            left=np.concatenate(left).astype(np.int64),
+            right=np.concatenate(right).astype(np.int64),
+            missing=np.concatenate(missing).astype(np.int64),
+            value=np.concatenate(value).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int64),
+            base_margin=float(np.log(base_score / (1 - base_score))),
+        )
+
+    def leaves(self, X):
+        """Indice de la feuille atteinte, par ligne et par arbre (n × arbres)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            feat = self.feature[node]
+            internal = feat >= 0
+            if not internal.any():
+                break
+            x = X[rows, np.where(internal, feat, 0)]
+            go = np.where(x < self.threshold[node], self.left[node], self.right[node])
+            go = np.where(np.isnan(x), self.missing[node], go)
+            node = np.where(internal, go, node)
+        return node
+
+    def predict_margin(self, X):
+        return self.value[self.leaves(X)].sum(axis=1) + self.base_margin
+
+    def predict_proba(self, X):
+        """Probabilités [classe 0, classe 1], comme XGBClassifier.predict_proba."""
+        proba = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack([1.0 - proba, proba])
+
+    def _max_depth(self):
+        depth = np.zeros(len(self.feature), dtype=np.int64)
+        # Les fils ont toujours un indice supérieur à leur parent dans XGBoost
+        for node in range(len(self.feature)):
+            if self.feature[node] >= 0:
+                depth[self.left[node]] = depth[node] + 1
+                depth[self.right[node]] = depth[node] + 1
+        return int(depth.max()) if len(depth) else 0
@@ -0,0 +1,157 @@
+import io
+import threading
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+# Couleurs de shap.plots.waterfall
+POSITIVE_COLOR = "#ff0051"
+NEGATIVE_COLOR = "#008bfb"
+
+ROW_HEIGHT = 26
+LABEL_WIDTH = 260
+PLOT_WIDTH = 420
+MARGIN = 20
+
+_local = threading.local()
+
+
+def waterfall_rows(values, base_value, feature_names, data=None, max_display=10):
+    """Lignes du graphique waterfall, de haut en bas.
+
+    Reprend la logique de `shap.plots.waterfall` : les `max_display - 1`
+    contributions les plus fortes (en valeur absolue) sont affichées, les
+    autres sont regroupées sur une ligne « N autres features ». Chaque ligne
+    est un tuple (libellé, contribution, début, fin) en marge log-odds.
+    """
+    values = np.asarray(values, dtype=float)
+    order = np.argsort(-np.abs(values), kind="stable")
+    if len(order) > max_display:
+        shown, rest = order[: max_display - 1], order[max_display - 1 :]
+    else:
+        shown, rest = order, order[:0]
+
+    labels = []
+    for i in shown:
+        name = feature_names[i]
+        labels.append(name if data is None else f"{data[i]:.3g} = {name}")
+    contribs = [float(values[i]) for i in shown]
+    if len(rest):
+        labels.append(f"{len(rest)} autres features")
+        contribs.append(float(values[rest].sum()))
+
+    # Cumul depuis la valeur de base, de la ligne du bas vers celle du haut
+    rows = []
+    position = float(base_value)
+    for label, contrib in reversed(list(zip(labels, contribs))):
+        rows.append((label, contrib, position, position + contrib))
+        position += contrib
+    rows.reverse()
+    return rows
+
+
+def _x_range(rows, base_value):
+    points = [base_value] + [p for _, _, start, end in rows for p in (start, end)]
+    low, high = min(points), max(points)
+    pad = (high - low) * 0.08 or 1.0
+    return low - pad, high + pad
+
+
+def waterfall_svg(values, base_value, feature_names, data=None, max_display=10):
+    """Graphique waterfall au format SVG (str), sans matplotlib ni shap."""
+    base_value = float(base_value)
+    rows = waterfall_rows(values, base_value, feature_names, data, max_display)
+    low, high = _x_range(rows, base_value)
+
+    def x(value):
+        return LABEL_WIDTH + (value - low) / (high - low) * PLOT_WIDTH
+
+    width = LABEL_WIDTH + PLOT_WIDTH + MARGIN
+    top = MARGIN + 16
+    height = top + len(rows) * ROW_HEIGHT + 40
+    final_value = rows[0][3] if rows else base_value
+    parts = [
+        (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="12">'
+        ),
+        f'<rect width="{width}" height="{height}" fill="white"/>',
+        (
+            f'<text x="{x(final_value):.1f}" y="{MARGIN}" text-anchor="middle">'
+            f"f(x) = {final_value:.3f}</text>"
+        ),
+    ]
+    for i, (label, contrib, start, end) in enumerate(rows):
+        y = top + i * ROW_HEIGHT
+        color = POSITIVE_COLOR if contrib >= 0 else NEGATIVE_COLOR
+        left, right = sorted((x(start), x(end)))
+        parts.append(
+            f'<text x="{LABEL_WIDTH - 8}" y="{y + ROW_HEIGHT / 2 + 4:.1f}" '
+            f'text-anchor="end">{escape(label)}</text>'
+        )
+        parts.append(
+            f'<rect x="{left:.1f}" y="{y + 4}" width="{max(right - left, 1.0):.1f}" '
+            f'height="{ROW_HEIGHT - 8}" fill="{color}"/>'
+        )
+        parts.append(
+            f'<text x="{right + 4:.1f}" y="{y + ROW_HEIGHT / 2 + 4:.1f}" '
+            f'fill="{color}">{contrib:+.3f}</text>'
+        )
+    axis_y = top + len(rows) * ROW_HEIGHT
+    parts.append(
+        f'<line x1="{LABEL_WIDTH}" y1="{axis_y}" x2="{LABEL_WIDTH + PLOT_WIDTH}" '
+        f'y2="{axis_y}" stroke="#999"/>'
+    )
+    parts.append(
+        f'<line x1="{x(base_value):.1f}" y1="{top}" x2="{x(base_value):.1f}" '
+        f'y2="{axis_y}" stroke="#999" stroke-dasharray="3,3"/>'
+    )
+    parts.append(
+        f'<text x="{x(base_value):.1f}" y="{axis_y + 18}" text-anchor="middle">'
+        f"E[f(X)] = {base_value:.3f}</text>"
+    )
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+
+def _figure():
+    """Figure matplotlib propre au thread courant, sans l'état global de pyplot."""
+    figure = getattr(_local, "figure", None)
+    if figure is None:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        _local.figure = figure
+    figure.clear()
+    return figure
+
+
+def waterfall_png(values, base_value, feature_names, data=None, max_display=10):
+    """Graphique waterfall au format PNG (bytes).
+
+    Chaque thread dessine sur sa propre Figure : plusieurs requêtes peuvent
+    rendre en parallèle sans passer par `plt`.
+    """
+    base_value = float(base_value)
+    rows = waterfall_rows(values, base_value, feature_names, data, max_display)
+    figure = _figure()
+    figure.set_size_inches(8, 0.4 * len(rows) + 1.2)
+    ax = figure.add_subplot()
+    positions = np.arange(len(rows))[::-1]
+    labels, contribs, starts, ends = map(list, zip(*rows))
+    colors = [POSITIVE_COLOR if c >= 0 else NEGATIVE_COLOR for c in contribs]
+    ax.barh(positions, contribs, left=starts, color=colors, height=0.7)
+    for y, contrib, start, end, color in zip(positions, contribs, starts, ends, colors):
+        ax.text(max(start, end), y, f" {contrib:+.3f}", va="center", color=color)
+    ax.set_yticks(positions, labels)
+    ax.axvline(base_value, color="#999", linestyle="--", linewidth=0.8)
+    ax.set_xlim(*_x_range(rows, base_value))
+    final_value = rows[0][3] if rows else base_value
+    ax.set_xlabel(f"E[f(X)] = {base_value:.3f}    f(x) = {final_value:.3f}")
+    for side in ("top", "right"):
+        ax.spines[side].set_visible(False)
+    buf = io.BytesIO()
+    figure.savefig(buf, format="png", bbox_inches="tight")
+    return buf.getvalue()
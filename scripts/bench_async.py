@@ -0,0 +1,127 @@
+"""Débit de l'API à forte concurrence : endpoints async contre endpoints synchrones.
+
+Lance deux serveurs uvicorn sur la même base SQLite : l'API (endpoints
+async, SQLAlchemy async) et une variante dont /predict/, /employee_list et
+/log_sample/ appellent les fonctions synchrones (threadpool FastAPI). Chaque
+client enchaîne les trois endpoints pendant la durée donnée.
+
+Usage (depuis la racine du dépôt) :
+    DB_TYPE=sqlite DB_NAME=chemin/vers/base.sqlite \\
+        python scripts/bench_async.py [durée s] [clients...] [--log-sync]
+
+--log-sync : journalisation immédiate (LOG_ASYNC=0) au lieu du LogWriter.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+PORT = 8765
+
+
+def sync_app():
+    """Variante de l'API avec les versions synchrones des trois endpoints."""
+    from fastapi import FastAPI
+
+    from app import api
+
+    sync = FastAPI(lifespan=api.lifespan)
+
+    @sync.get("/predict/")
+    def predict(id_employee: int, explain: api.ExplainMode = "fast"):
+        return api.predict(id_employee, explain=explain)
+
+    @sync.get("/employee_list")
+    def employee_list():
+        return api.employee_list()
+
+    @sync.get("/log_sample/")
+    def log_sample(table: str, n: int = 3):
+        return api.log_sample(table, n)
+
+    @sync.get("/ready")
+    def ready():
+        return api.ready()
+
+    return sync
+
+
+def start_server(target, env):
+    command = [sys.executable, "-m", "uvicorn", target, "--port", str(PORT)]
+    command += ["--log-level", "warning"]
+    if target.endswith("sync_app"):
+        command += ["--factory", "--app-dir", os.path.dirname(__file__)]
+    server = subprocess.Popen(command, cwd=ROOT, env=env)
+    for _ in range(600):
+        try:
+            if httpx.get(f"http://127.0.0.1:{PORT}/ready").status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"Serveur {target} non prêt")
+
+
+async def load(clients, duration_s, ids):
+    paths = [
+        "/predict/?explain=none&id_employee={}",
+        "/employee_list",
+        "/log_sample/?table=api_log&n=3",
+    ]
+    latencies = []
+    errors = 0
+    stop_at = time.perf_counter() + duration_s
+
+    async def client(http, offset):
+        nonlocal errors
+        i = offset
+        while time.perf_counter() < stop_at:
+            path = paths[i % len(paths)].format(ids[i % len(ids)])
+            start = time.perf_counter()
+            try:
+                resp = await http.get(path)
+                errors += resp.status_code != 200
+            except httpx.HTTPError:
+                # Connexion keep-alive fermée par le serveur, délai dépassé...
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+            i += 1
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60
+    ) as http:
+        await asyncio.gather(*(client(http, k) for k in range(clients)))
+    return len(latencies) / duration_s, np.percentile(latencies, 95), errors
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    duration_s = float(args[0]) if args else 10.0
+    clients_list = [int(a) for a in args[1:]] or [64, 256]
+    env = dict(os.environ, EXPLAIN_WORKERS="0", MODEL_WATCH_INTERVAL_S="0")
+    if "--log-sync" in sys.argv:
+        env["LOG_ASYNC"] = "0"
+
+    print(f"{'API':>6} {'clients':>8} {'req/s':>8} {'p95 (ms)':>9} {'erreurs':>8}")
+    for name, target in (("sync", "bench_async:sync_app"), ("async", "app.api:app")):
+        server = start_server(target, env)
+        try:
+            ids = httpx.get(f"http://127.0.0.1:{PORT}/employee_list").json()
+            for clients in clients_list:
+                rate, p95, errors = asyncio.run(load(clients, duration_s, ids))
+                print(f"{name:>6} {clients:>8} {rate:>8.0f} {p95:>9.1f} {errors:>8}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
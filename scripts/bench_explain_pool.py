@@ -0,0 +1,75 @@
+"""Débit des explications (contributions + image PNG) : threads seuls contre pool de processus.
+
+Simule 1, 4 et 16 clients concurrents qui demandent chacun l'explication
+complète d'un employé, calculée soit dans les threads du processus (comme
+le threadpool FastAPI), soit dans un ExplanationPool.
+
+Usage (depuis la racine du dépôt) :
+    python scripts/bench_explain_pool.py [requêtes par client] [workers]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.explain_pool import ExplanationPool
+from app.explainer import fast_contributions, get_estimator
+from app.waterfall import waterfall_png
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+MODEL_PATH = os.path.join(ROOT, "models", "model_pipeline.joblib")
+CLIENTS = (1, 4, 16)
+
+
+def throughput(explain_one, X, clients, per_client):
+    def client(offset):
+        for i in range(per_client):
+            explain_one(X[(offset + i) % len(X)][None, :])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(client, range(clients)))
+    elapsed = time.perf_counter() - start
+    return clients * per_client / elapsed
+
+
+def main():
+    per_client = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    pipeline = joblib.load(MODEL_PATH)
+    estimator = get_estimator(pipeline)
+    preprocessor = pipeline.named_steps["preprocessor"]
+    feature_names = list(preprocessor.get_feature_names_out())
+    raw = pd.read_csv(os.path.join(ROOT, "raw_full.csv")).head(200)
+    X = preprocessor.transform(raw.drop(columns=["id_employee", "attrition_num"]))
+
+    def in_thread(x):
+        values, base_values = fast_contributions(estimator, x)
+        return waterfall_png(values[0], base_values[0], feature_names, x[0])
+
+    pool = ExplanationPool(MODEL_PATH, max_workers=workers)
+    pool.start()
+    print(f"Pool : {workers} workers prêts en {pool.start_time_ms:.0f} ms")
+
+    def in_pool(x):
+        values, base_values = pool.contributions(x, "fast")
+        return pool.render((values[0], base_values[0], x[0]), "png")
+
+    print(f"{'clients':>8} {'threads (req/s)':>16} {'pool (req/s)':>14}")
+    try:
+        for clients in CLIENTS:
+            threaded = throughput(in_thread, X, clients, per_client)
+            pooled = throughput(in_pool, X, clients, per_client)
+            print(f"{clients:>8} {threaded:>16.1f} {pooled:>14.1f}")
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark du moteur NumPy (arbres aplatis) contre XGBClassifier.predict_proba.
+
+Usage (depuis la racine du dépôt) :
+    python scripts/bench_tree_engine.py [raw_full.csv]
+"""
+
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.explainer import get_estimator
+from app.tree_engine import FlatTreeEnsemble
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def timed(fn, X, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "raw_full.csv")
+    pipeline = joblib.load(os.path.join(ROOT, "models", "model_pipeline.joblib"))
+    estimator = get_estimator(pipeline)
+    raw = pd.read_csv(csv_path)
+    X = pipeline.named_steps["preprocessor"].transform(
+        raw.drop(columns=["id_employee", "attrition_num"], errors="ignore")
+    )
+
+    start = time.perf_counter()
+    engine = FlatTreeEnsemble.from_xgb(estimator)
+    export_ms = (time.perf_counter() - start) * 1000
+    print(
+        f"Export : {len(engine.roots)} arbres, {len(engine.feature)} noeuds, "
+        f"profondeur {engine.max_depth}, {export_ms:.1f} ms"
+    )
+
+    ref = estimator.predict_proba(X)[:, 1]
+    got = engine.predict_proba(X)[:, 1]
+    print(f"\n{len(X)} employés")
+    print(f"Écart max de probabilité : {np.abs(ref - got).max():.2e}")
+    print(
+        f"Accord des classes (seuil 0,55) : {((ref >= 0.55) == (got >= 0.55)).mean():.2%}"
+    )
+
+    print(f"\n{'lot':>6} {'xgboost (ms)':>14} {'numpy (ms)':>12} {'gain':>6}")
+    for size, repeat in [(1, 500), (10, 200), (100, 50), (len(X), 10)]:
+        batch = X[:size]
+        t_xgb = timed(estimator.predict_proba, batch, repeat)
+        t_np = timed(engine.predict_proba, batch, repeat)
+        print(f"{size:>6} {t_xgb:>14.3f} {t_np:>12.3f} {t_xgb / t_np:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
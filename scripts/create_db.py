@@ -1,13 +1,23 @@
 # =========================
 # Imports and Utilities
 # =========================
+import io
 import os
+import sqlite3
+import sys
+import time
 import psycopg2
 import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
 import re
 
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+# Built once the rows are loaded (lookups by id, incremental refresh on max id)
+RAW_INDEXES = ["CREATE INDEX raw_id_employee_idx ON raw (id_employee);"]
+
 
 def sanitize_column(name):
     """
@@ -35,6 +45,27 @@ def get_pg_connection(role, creds, host, port):
 # =========================
 # Data Preparation & Feature Engineering
 # =========================
+QUARTILES = [0.25, 0.5, 0.75]
+
+
+def group_quartiles(df, group_cols, col_revenu="revenu_mensuel"):
+    """
+    Q1, median and Q3 of `col_revenu` for each row's group, as three arrays.
+
+    One grouped quantile pass computes the three quantiles of every group; they
+    are then broadcast back to the rows by group number. Rows whose group key
+    is missing get NaN, like groupby().transform().
+    """
+    grouped = df.groupby(group_cols, observed=True)[col_revenu]
+    per_group = grouped.quantile(QUARTILES).unstack().to_numpy()
+    # Group number of each row (NaN when a key is missing)
+    codes = grouped.ngroup()
+    missing = (codes.isna() | (codes < 0)).to_numpy()
+    values = np.full((len(df), len(QUARTILES)), np.nan)
+    values[~missing] = per_group[codes[~missing].to_numpy(dtype=np.intp)]
+    return values[:, 0], values[:, 1], values[:, 2]
+
+
 def add_salary_group_feature(
     df,
     group_cols=None,
@@ -45,20 +76,19 @@ def add_salary_group_feature(
     if labels is None:
         labels = ["Très bas", "Bas", "Moyen", "Haut"]
     if group_cols is not None:
-        q1 = df.groupby(group_cols)[col_revenu].transform(lambda x: x.quantile(0.25))
-        mediane = df.groupby(group_cols)[col_revenu].transform("median")
-        q3 = df.groupby(group_cols)[col_revenu].transform(lambda x: x.quantile(0.75))
+        q1, mediane, q3 = group_quartiles(df, group_cols, col_revenu)
     else:
-        q1 = pd.Series(df[col_revenu].quantile(0.25), index=df.index)
-        mediane = pd.Series(df[col_revenu].median(), index=df.index)
-        q3 = pd.Series(df[col_revenu].quantile(0.75), index=df.index)
+        q1, mediane, q3 = df[col_revenu].quantile(QUARTILES).to_numpy()
+    revenu = df[col_revenu].to_numpy()
     conditions = [
-        df[col_revenu] < q1,
-        (df[col_revenu] >= q1) & (df[col_revenu] < mediane),
-        (df[col_revenu] > q3),
-        (df[col_revenu] >= mediane) & (df[col_revenu] <= q3),
+        revenu < q1,
+        (revenu >= q1) & (revenu < mediane),
+        (revenu > q3),
+        (revenu >= mediane) & (revenu <= q3),
     ]
-    df[feature_name] = np.select(conditions, labels, default="Moyen")
+    # Select label positions, then take the labels as Python strings directly
+    choices = np.array([*labels, "Moyen"], dtype=object)
+    df[feature_name] = choices[np.select(conditions, range(4), default=4)]
     return df
 
 
@@ -173,10 +203,7 @@ def prepare_central_data():
 # =========================
 # Table Creation & Data Insertion
 # =========================
-def create_and_populate_table(conn, data, log_user, demo_user):
-    cur = conn.cursor()
-    print("Dropping and creating table 'raw'...")
-    cur.execute("DROP TABLE IF EXISTS raw;")
+def raw_table_sql(data):
     columns_types = []
     for col, dtype in zip(data.columns, data.dtypes):
         if dtype == "int64":
@@ -186,29 +213,80 @@ def create_and_populate_table(conn, data, log_user, demo_user):
         else:
             sql_type = "TEXT"
         columns_types.append(f"{col} {sql_type}")
-    table_sql = f"CREATE TABLE raw (\n    {', '.join(columns_types)}\n);"
-    cur.execute(table_sql)
+    return f"CREATE TABLE raw (\n    {', '.join(columns_types)}\n);"
+
+
+def copy_raw_rows(cur, data, chunk_size=50_000):
+    """
+    Stream the DataFrame into PostgreSQL with COPY FROM STDIN (CSV format),
+    one in-memory CSV chunk at a time. Empty fields are loaded as NULL.
+    """
+    copy_sql = f"COPY raw ({', '.join(data.columns)}) FROM STDIN WITH (FORMAT csv)"
+    for start in range(0, len(data), chunk_size):
+        buf = io.StringIO()
+        data.iloc[start : start + chunk_size].to_csv(buf, header=False, index=False)
+        buf.seek(0)
+        cur.copy_expert(copy_sql, buf)
+
+
+def insert_raw_rows(conn, data, batch_size=10_000):
+    """
+    Batched executemany, for drivers without COPY (SQLite). Values are
+    converted to Python objects and NaN to NULL once, for the whole frame.
+    """
+    placeholder = "?" if isinstance(conn, sqlite3.Connection) else "%s"
+    sql = (
+        f"INSERT INTO raw ({', '.join(data.columns)}) "
+        f"VALUES ({', '.join([placeholder] * len(data.columns))})"
+    )
+    rows = data.astype(object).where(data.notna(), None)
+    cur = conn.cursor()
+    for start in range(0, len(rows), batch_size):
+        cur.executemany(
+            sql,
+            rows.iloc[start : start + batch_size].itertuples(index=False, name=None),
+        )
+    cur.close()
+
+
+def create_and_populate_table(conn, data, log_user=None, demo_user=None):
+    """
+    (Re)create and bulk-load the 'raw' table: COPY for PostgreSQL, batched
+    executemany for SQLite. Indexes are built after the load.
+    """
+    is_sqlite = isinstance(conn, sqlite3.Connection)
+    cur = conn.cursor()
+    print("Dropping and creating table 'raw'...")
+    cur.execute("DROP TABLE IF EXISTS raw;")
+    cur.execute(raw_table_sql(data))
     conn.commit()
     print("Table ready.")
-    # Grants
-    cur.execute(f"GRANT INSERT, UPDATE, SELECT ON raw TO {log_user};")
-    cur.execute(f"GRANT SELECT ON raw TO {demo_user};")
-    cur.execute(
-        f"ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT INSERT, UPDATE, SELECT ON TABLES TO {log_user};"
-    )
-    cur.execute(
-        f"ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT SELECT ON TABLES TO {demo_user};"
-    )
+    if not is_sqlite:
+        # Grants
+        cur.execute(f"GRANT INSERT, UPDATE, SELECT ON raw TO {log_user};")
+        cur.execute(f"GRANT SELECT ON raw TO {demo_user};")
+        cur.execute(
+            f"ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT INSERT, UPDATE, SELECT ON TABLES TO {log_user};"
+        )
+        cur.execute(
+            f"ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT SELECT ON TABLES TO {demo_user};"
+        )
     print("Inserting data...")
-    cols = data.columns.tolist()
-    for idx, row in data.iterrows():
-        placeholders = ", ".join(["%s"] * len(row))
-        sql = f"INSERT INTO raw ({', '.join(cols)}) VALUES ({placeholders});"
-        cur.execute(sql, tuple(row))
-        if idx % 100 == 0:
-            print(f"  {idx} rows inserted...")
+    start = time.perf_counter()
+    if is_sqlite:
+        insert_raw_rows(conn, data)
+    else:
+        copy_raw_rows(cur, data)
+    load_s = time.perf_counter() - start
+    for index_sql in RAW_INDEXES:
+        cur.execute(index_sql)
     conn.commit()
-    print(f"Inserted {len(data)} rows.")
+    total_s = time.perf_counter() - start
+    print(
+        f"Inserted {len(data)} rows in {load_s:.2f}s "
+        f"({len(data) / max(load_s, 1e-9):,.0f} rows/s), "
+        f"indexes built in {total_s - load_s:.2f}s."
+    )
     cur.close()
 
 
@@ -283,6 +361,21 @@ def create_exchanges_tables(conn, log_user, demo_user):
 # =========================
 # Main Routine
 # =========================
+def write_reference_stats(data):
+    """
+    Save the population quantiles and bin edges behind the derived columns, so
+    the API can featurize a single new employee without the rest of the table.
+    """
+    from app.reference_features import compute_reference_stats, save_reference_stats
+
+    path = os.getenv(
+        "REFERENCE_STATS_PATH", os.path.join(ROOT, "models", "reference_stats.json")
+    )
+    stats = compute_reference_stats(data)
+    save_reference_stats(stats, path)
+    print(f"Reference statistics {stats['version']} written to {path}")
+
+
 def main():
     load_dotenv()
     db_name = os.getenv("DB_NAME")
@@ -306,6 +399,14 @@ def main():
         },
     }
     data = prepare_central_data()
+    write_reference_stats(data)
+    if os.getenv("DB_TYPE") == "sqlite":
+        # Local SQLite database: only the 'raw' table (no roles, no grants)
+        conn = sqlite3.connect(db_name)
+        create_and_populate_table(conn, data)
+        conn.close()
+        print(f"\nAll done! Table 'raw' loaded into {db_name}.")
+        return
     conn = get_pg_connection("admin", creds, db_host, db_port)
     create_and_populate_table(
         conn,
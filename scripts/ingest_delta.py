@@ -0,0 +1,170 @@
+"""Ingestion incrémentale d'un extrait RH dans la table `raw`.
+
+Compare l'extrait préparé à la table `raw` employé par employé (empreinte de
+ligne, la même que celle des caches de l'API) et n'applique que les
+insertions, mises à jour et suppressions, en une seule transaction : pas de
+DROP TABLE, `/predict/` continue de lire la table pendant l'ingestion.
+
+La liste des changements (`inserted`, `updated`, `deleted`) est écrite en
+JSON et peut être envoyée à l'API (POST /employees/refresh), qui ne relit
+et n'invalide que les employés concernés.
+
+Usage (depuis la racine du dépôt) :
+    python scripts/ingest_delta.py [--extract extrait_prepare.csv]
+        [--changes changes.json] [--notify http://localhost:8000] [--dry-run]
+
+Sans --extract, l'extrait est reconstruit par `create_db.prepare_central_data()`.
+Base : DB_TYPE=sqlite et DB_NAME, ou PostgreSQL (compte admin de create_db).
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import pandas as pd
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from create_db import (
+    copy_raw_rows,
+    get_pg_connection,
+    insert_raw_rows,
+    prepare_central_data,
+)
+
+from app.cache import hash_row
+
+
+def row_hashes(frame):
+    """{id_employee: empreinte de la ligne} (première occurrence de chaque id)."""
+    records = frame.astype(object).where(frame.notna(), None).to_dict("records")
+    hashes = {}
+    for record in records:
+        hashes.setdefault(record["id_employee"], hash_row(record))
+    return hashes
+
+
+def diff_extract(current, extract):
+    """Changements à appliquer à `current` (table raw) pour obtenir `extract`."""
+    old, new = row_hashes(current), row_hashes(extract)
+    inserted = sorted(i for i in new if i not in old)
+    updated = sorted(i for i in new if i in old and new[i] != old[i])
+    deleted = sorted(i for i in old if i not in new)
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": deleted,
+        "unchanged": len(new) - len(inserted) - len(updated),
+    }
+
+
+def align_extract(extract, current):
+    """Colonnes de `raw`, dans son ordre ; un seul enregistrement par employé."""
+    missing = [col for col in current.columns if col not in extract.columns]
+    if missing:
+        raise ValueError(f"Colonnes absentes de l'extrait : {', '.join(missing)}")
+    return extract[list(current.columns)].drop_duplicates("id_employee")
+
+
+def apply_changes(conn, extract, changes):
+    """Supprime les lignes modifiées ou disparues et insère les nouvelles
+    versions, en une transaction (annulée en cas d'erreur)."""
+    is_sqlite = isinstance(conn, sqlite3.Connection)
+    placeholder = "?" if is_sqlite else "%s"
+    removed = changes["updated"] + changes["deleted"]
+    written = set(changes["inserted"] + changes["updated"])
+    rows = extract[extract["id_employee"].isin(written)]
+    cur = conn.cursor()
+    try:
+        cur.executemany(
+            f"DELETE FROM raw WHERE id_employee = {placeholder}",
+            [(int(i),) for i in removed],
+        )
+        if len(rows):
+            if is_sqlite:
+                insert_raw_rows(conn, rows)
+            else:
+                copy_raw_rows(cur, rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def notify_api(url, changes):
+    """Signale à l'API les employés à relire (et à invalider dans ses caches)."""
+    import requests
+
+    ids = changes["inserted"] + changes["updated"] + changes["deleted"]
+    resp = requests.post(
+        f"{url.rstrip('/')}/employees/refresh",
+        json={"id_employees": [int(i) for i in ids]},
+        timeout=30,
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def connect():
+    if os.getenv("DB_TYPE") == "sqlite":
+        return sqlite3.connect(os.getenv("DB_NAME"))
+    creds = {
+        "admin": {
+            "dbname": os.getenv("DB_NAME"),
+            "user": os.getenv("DB_USER_ADMIN"),
+            "password": os.getenv("DB_PW_ADMIN"),
+        }
+    }
+    return get_pg_connection(
+        "admin", creds, os.getenv("DB_SYS_HOST"), os.getenv("DB_SYS_PORT", "5432")
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--extract", help="Extrait déjà préparé (CSV)")
+    parser.add_argument("--changes", default="changes.json")
+    parser.add_argument("--notify", help="URL de l'API à prévenir")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    start = time.perf_counter()
+    if args.extract:
+        # Relecture exacte des flottants : sinon des lignes inchangées diffèrent
+        extract = pd.read_csv(args.extract, float_precision="round_trip")
+    else:
+        extract = prepare_central_data()
+    conn = connect()
+    try:
+        current = pd.read_sql("SELECT * FROM raw", conn)
+        extract = align_extract(extract, current)
+        changes = diff_extract(current, extract)
+        print(
+            f"{len(changes['inserted'])} ajoutés, {len(changes['updated'])} modifiés, "
+            f"{len(changes['deleted'])} supprimés, {changes['unchanged']} inchangés"
+        )
+        has_changes = any(changes[k] for k in ("inserted", "updated", "deleted"))
+        if has_changes and not args.dry_run:
+            apply_changes(conn, extract, changes)
+    finally:
+        conn.close()
+    with open(args.changes, "w") as f:
+        json.dump(changes, f)
+    print(
+        f"Changements écrits dans {args.changes} "
+        f"({time.perf_counter() - start:.2f} s)"
+    )
+    if args.notify and has_changes and not args.dry_run:
+        print(f"API prévenue : {notify_api(args.notify, changes)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Précalcule les explications de tous les employés dans le store sur disque.
+
+Pour le modèle servi (clé : son empreinte, version + contenu du fichier) et
+chaque ligne de la table `raw` : score,
+contributions « fast » (TreeSHAP natif XGBoost, float32) et, avec
+--with-image, image waterfall PNG. Le fichier (EXPLANATION_STORE_PATH,
+`models/explanations.sqlite` par défaut) est ensuite lu par tous les workers
+de l'API avant tout calcul. Seules les entrées du modèle servi (même
+empreinte, y compris un fichier réécrit sous le même nom) et dont la ligne
+`raw` est inchangée sont servies : à relancer après chaque réentraînement ou
+changement de données, faute de quoi l'API recalcule les explications.
+
+Usage (depuis la racine du dépôt) :
+    python scripts/precompute_explanations.py [--with-image] [--batch-size 500]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Ni pool d'explication ni surveillance du répertoire des modèles
+os.environ.setdefault("EXPLAIN_WORKERS", "0")
+os.environ.setdefault("MODEL_WATCH_INTERVAL_S", "0")
+
+from app import api
+from app.cache import hash_row
+from app.explainer import fast_contributions, get_estimator
+from app.waterfall import waterfall_png
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--with-image", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument(
+        "--keep-other-versions",
+        action="store_true",
+        help="Conserver les explications des autres versions du modèle",
+    )
+    args = parser.parse_args(argv)
+
+    model = api.model_registry.current
+    if model.is_dummy:
+        sys.exit("Modèle factice : aucune explication à précalculer")
+    start = time.perf_counter()
+    api.warm_up()
+    store = api.explanation_store
+    estimator = get_estimator(model.pipeline)
+    ids = api.employee_store.ids()
+    for offset in range(0, len(ids), args.batch_size):
+        records = [
+            api.employee_store.get(i) for i in ids[offset : offset + args.batch_size]
+        ]
+        X_processed = api.processed_features(model, records)
+        scores = api.score_processed(model, X_processed)[:, 1]
+        values, base_values = fast_contributions(estimator, X_processed)
+        rows = []
+        for i, record in enumerate(records):
+            image = None
+            if args.with_image:
+                image = waterfall_png(
+                    values[i],
+                    base_values[i],
+                    model.feature_cache.feature_names,
+                    X_processed[i],
+                )
+            rows.append(
+                (
+                    record["id_employee"],
+                    model.fingerprint,
+                    hash_row(record),
+                    scores[i],
+                    base_values[i],
+                    values[i],
+                    image,
+                )
+            )
+        store.put_many(rows)
+        print(f"{offset + len(records)}/{len(ids)} employés")
+    if not args.keep_other_versions:
+        deleted = store.delete_other_versions(model.fingerprint)
+        if deleted:
+            print(f"{deleted} explications d'autres versions supprimées")
+    elapsed = time.perf_counter() - start
+    print(
+        f"{len(ids)} explications (modèle {model.fingerprint}) écrites dans "
+        f"{store.path} en {elapsed:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
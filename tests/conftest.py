@@ -156,5 +156,9 @@ def client(test_db):
     from app.api import app
     from fastapi.testclient import TestClient
 
+    from app.api import app_ready
+
     with TestClient(app) as test_client:
+        # Démarrage en tâche de fond : attendre /ready comme un déploiement
+        app_ready.wait(timeout=60)
         yield test_client
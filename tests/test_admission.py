@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from app.admission import AdmissionControl, Overloaded
+
+
+def test_admit_refuse_au_dela_de_la_limite():
+    """Au-delà de max_in_flight calculs simultanés, Overloaded ; place rendue en sortie."""
+    admission = AdmissionControl(max_in_flight=2)
+    with admission.admit(), admission.admit():
+        with pytest.raises(Overloaded), admission.admit():
+            pass
+        assert admission.stats()["in_flight"] == 2
+    with admission.admit():
+        pass
+    stats = admission.stats()
+    assert (stats["admitted"], stats["rejected"], stats["in_flight"]) == (3, 1, 0)
+
+
+def test_explain_stage_sature_apres_le_budget():
+    """Sans créneau libre avant l'échéance, l'étape n'est pas admise."""
+    admission = AdmissionControl(explain_concurrency=1, explain_budget_ms=30)
+    with admission.explain_stage() as first:
+        assert first.admitted
+        start = time.monotonic()
+        with admission.explain_stage() as second:
+            assert not second.admitted
+        assert time.monotonic() - start >= 0.025
+    with admission.explain_stage() as third:
+        assert third.admitted
+        assert 0 < third.remaining_s() <= 0.03
+        assert not third.expired()
+
+
+def test_explain_stage_attend_un_creneau_libere():
+    """Un créneau libéré pendant l'attente est obtenu dans le budget."""
+    admission = AdmissionControl(explain_concurrency=1, explain_budget_ms=2000)
+    entered = threading.Event()
+
+    def hold():
+        with admission.explain_stage():
+            entered.set()
+            time.sleep(0.05)
+
+    t = threading.Thread(target=hold)
+    t.start()
+    entered.wait()
+    with admission.explain_stage() as stage:
+        assert stage.admitted
+        assert admission.stats()["explain_running"] == 1
+    t.join()
+
+
+def test_sans_limite_ni_budget():
+    """Limites à 0 : tout est admis, aucune échéance."""
+    admission = AdmissionControl(max_in_flight=0, explain_concurrency=0)
+    with admission.admit(), admission.explain_stage() as stage:
+        assert stage.admitted
+        assert stage.remaining_s() is None
+        assert not stage.expired()
+    admission.degrade("explain_saturated")
+    assert admission.stats()["degraded"] == {"explain_saturated": 1}
@@ -0,0 +1,98 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.cache import LRUCache, SingleFlight, hash_row
+
+
+def test_hash_row_stable():
+    """L'empreinte ne dépend pas de l'ordre des clés mais change avec les valeurs."""
+    assert hash_row({"a": 1, "b": "x"}) == hash_row({"b": "x", "a": 1})
+    assert hash_row({"a": 1}) != hash_row({"a": 2})
+
+
+def test_lru_hit_miss():
+    """Un get sur clé présente compte un hit, sinon un miss."""
+    cache = LRUCache(maxsize=2)
+    assert cache.get("k") is None
+    cache.put("k", b"v")
+    assert cache.get("k") == b"v"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_eviction_moins_recent():
+    """Au-delà de maxsize, l'entrée la moins récemment utilisée est évincée."""
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_lru_ttl_expiration():
+    """Une entrée plus vieille que ttl_s est un miss et disparaît du cache."""
+    cache = LRUCache(maxsize=2, ttl_s=10)
+    with patch("app.cache.time.monotonic", return_value=100.0):
+        cache.put("k", 1)
+    with patch("app.cache.time.monotonic", return_value=105.0):
+        assert cache.get("k") == 1
+    with patch("app.cache.time.monotonic", return_value=111.0):
+        assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_single_flight_un_seul_calcul():
+    """Les appels simultanés de même clé attendent le calcul en cours et le partagent."""
+    flights = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def compute():
+        executions.append(1)
+        release.wait(5)
+        return {"score": 0.6}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flights.do("id-1", compute)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    while flights.stats()["calls"] < 8:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(executions) == 1
+    assert len(results) == 8 and all(r is results[0] for r in results)
+    assert flights.stats() == {
+        "calls": 8,
+        "executions": 1,
+        "coalesced": 7,
+        "in_flight": 0,
+    }
+    # Calcul terminé : un nouvel appel recalcule
+    flights.do("id-1", compute)
+    assert len(executions) == 2
+
+
+def test_single_flight_exception_partagee():
+    """Une erreur du calcul est levée pour l'appel et n'est pas gardée."""
+    flights = SingleFlight()
+
+    def fail():
+        raise ValueError("base indisponible")
+
+    with pytest.raises(ValueError):
+        flights.do("id-1", fail)
+    assert flights.do("id-1", lambda: 42) == 42
+    assert flights.stats()["in_flight"] == 0
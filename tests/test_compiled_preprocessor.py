@@ -0,0 +1,75 @@
+import os
+from unittest.mock import MagicMock
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.compiled_preprocessor import compile_preprocessor, input_schema
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+@pytest.fixture(scope="module")
+def preprocessor():
+    pipeline = joblib.load(os.path.join(ROOT, "models", "model_pipeline.joblib"))
+    return pipeline.named_steps["preprocessor"]
+
+
+@pytest.fixture(scope="module")
+def raw():
+    return pd.read_csv(os.path.join(ROOT, "raw_full.csv"))
+
+
+def test_compile_equivalent_sur_toute_la_table(preprocessor, raw):
+    """Chaque ligne de raw_full.csv donne exactement le vecteur scikit-learn."""
+    compiled = compile_preprocessor(preprocessor)
+    expected = preprocessor.transform(
+        raw.drop(columns=["id_employee", "attrition_num"])
+    )
+    records = raw.to_dict(orient="records")
+    np.testing.assert_array_equal(compiled.transform_many(records), expected)
+    for record, row in zip(records, expected):
+        np.testing.assert_array_equal(compiled.transform_one(record), row)
+
+
+def test_compile_noms_de_features(preprocessor):
+    """L'ordre des features est celui de get_feature_names_out."""
+    compiled = compile_preprocessor(preprocessor)
+    assert compiled.feature_names == list(preprocessor.get_feature_names_out())
+    assert compiled.n_features == len(compiled.feature_names)
+
+
+def test_compile_categorie_one_hot_inconnue(preprocessor, raw):
+    """Une modalité one-hot inconnue est ignorée comme avec handle_unknown='ignore'."""
+    compiled = compile_preprocessor(preprocessor)
+    record = raw.iloc[0].to_dict()
+    record["domaine_etude"] = "Astronomie"
+    expected = preprocessor.transform(pd.DataFrame([record]))[0]
+    np.testing.assert_array_equal(compiled.transform_one(record), expected)
+
+
+def test_compile_categorie_ordinale_inconnue(preprocessor, raw):
+    """Une modalité ordinale inconnue lève une erreur, comme OrdinalEncoder."""
+    compiled = compile_preprocessor(preprocessor)
+    record = raw.iloc[0].to_dict()
+    record["salaire_cat"] = "Inconnu"
+    with pytest.raises(ValueError):
+        compiled.transform_one(record)
+
+
+def test_compile_non_supporte():
+    """Un objet qui n'est pas un ColumnTransformer n'est pas compilable."""
+    with pytest.raises(NotImplementedError):
+        compile_preprocessor(MagicMock())
+
+
+def test_input_schema(preprocessor, raw):
+    """Colonnes numériques (None) et catégories apprises des colonnes encodées."""
+    schema = input_schema(preprocessor)
+    assert set(schema) == set(preprocessor.feature_names_in_)
+    assert schema["age"] is None
+    assert schema["genre"] == set(raw["genre"].unique())
+    assert schema["domaine_etude"] == set(raw["domaine_etude"].unique())
+    assert input_schema(None) == {}
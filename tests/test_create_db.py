@@ -0,0 +1,106 @@
+import csv
+import io
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import create_db
+
+
+def _raw(n=300):
+    data = pd.read_csv(os.path.join(ROOT, "raw_full.csv"))
+    return data if n is None else data.head(n)
+
+
+def test_chargement_sqlite_executemany(tmp_path):
+    """La table raw chargée par lots est identique au DataFrame, index compris."""
+    data = _raw()
+    data.loc[0, "domaine_etude"] = None
+    conn = sqlite3.connect(tmp_path / "raw.sqlite")
+    create_db.create_and_populate_table(conn, data)
+    loaded = pd.read_sql("SELECT * FROM raw", conn)
+    indexes = [
+        row[0]
+        for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    ]
+    conn.close()
+    pd.testing.assert_frame_equal(loaded, data, check_dtype=False)
+    assert indexes == ["raw_id_employee_idx"]
+
+
+def test_copy_postgresql_csv_par_morceaux():
+    """COPY FROM STDIN reçoit des morceaux CSV qui restituent toutes les lignes."""
+    data = _raw(250)
+
+    class FakeCursor:
+        def __init__(self):
+            self.calls = []
+
+        def copy_expert(self, sql, buf):
+            self.calls.append((sql, buf.read()))
+
+    cur = FakeCursor()
+    create_db.copy_raw_rows(cur, data, chunk_size=100)
+    assert len(cur.calls) == 3
+    assert cur.calls[0][0].startswith("COPY raw (id_employee, age,")
+    rows = [row for _, chunk in cur.calls for row in csv.reader(io.StringIO(chunk))]
+    assert len(rows) == 250
+    assert rows[-1][0] == str(data["id_employee"].iloc[-1])
+
+
+def _reference_salary_group(df, group_cols, col_revenu, labels):
+    """Implémentation d'origine (trois transform par groupe, lambdas Python)."""
+    if group_cols is not None:
+        grouped = df.groupby(group_cols)[col_revenu]
+        q1 = grouped.transform(lambda x: x.quantile(0.25))
+        mediane = grouped.transform("median")
+        q3 = grouped.transform(lambda x: x.quantile(0.75))
+    else:
+        q1 = pd.Series(df[col_revenu].quantile(0.25), index=df.index)
+        mediane = pd.Series(df[col_revenu].median(), index=df.index)
+        q3 = pd.Series(df[col_revenu].quantile(0.75), index=df.index)
+    conditions = [
+        df[col_revenu] < q1,
+        (df[col_revenu] >= q1) & (df[col_revenu] < mediane),
+        (df[col_revenu] > q3),
+        (df[col_revenu] >= mediane) & (df[col_revenu] <= q3),
+    ]
+    return (q1, mediane, q3), np.select(conditions, labels, default="Moyen")
+
+
+def test_quartiles_par_groupe_identiques_a_l_implementation_d_origine():
+    """Quartiles au bit près et catégories identiques, y compris clé manquante."""
+    data = _raw(None)
+    data.loc[0, "poste_departement"] = None
+    data.loc[1, "revenu_mensuel"] = None
+    labels = ["Très bas", "Bas", "Moyen", "Haut"]
+    for group_cols in (
+        None,
+        ["poste_departement"],
+        ["poste_departement", "annees_dans_le_poste_actuel"],
+    ):
+        expected_q, expected = _reference_salary_group(
+            data, group_cols, "revenu_mensuel", labels
+        )
+        if group_cols is not None:
+            quartiles = create_db.group_quartiles(data, group_cols)
+            for got, want in zip(quartiles, expected_q):
+                np.testing.assert_array_equal(got, want.to_numpy())
+        result = create_db.add_salary_group_feature(
+            data.copy(), group_cols, feature_name="cat", labels=labels
+        )
+        np.testing.assert_array_equal(result["cat"].to_numpy(), expected)
+
+
+def test_features_salaire_identiques_a_la_table_raw():
+    """create_salary_features redonne les colonnes enregistrées dans raw_full.csv."""
+    data = _raw(None)
+    columns = ["salaire_cat", "position_salaire_poste", "position_salaire_poste_anc"]
+    result = create_db.create_salary_features(data.drop(columns=columns))
+    pd.testing.assert_frame_equal(result[columns], data[columns])
@@ -0,0 +1,59 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.explain_pool import ExplanationPool
+from app.explainer import fast_contributions, get_estimator
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+MODEL_PATH = os.path.join(ROOT, "models", "model_pipeline.joblib")
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ExplanationPool(MODEL_PATH, max_workers=1)
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+@pytest.fixture(scope="module")
+def X_processed():
+    pipeline = joblib.load(MODEL_PATH)
+    raw = pd.read_csv(os.path.join(ROOT, "raw_full.csv")).head(5)
+    X = pipeline.named_steps["preprocessor"].transform(
+        raw.drop(columns=["id_employee", "attrition_num"])
+    )
+    return pipeline, X
+
+
+def test_pool_contributions_identiques(pool, X_processed):
+    """Les contributions du worker sont celles calculées dans le processus API."""
+    pipeline, X = X_processed
+    values, base_values = pool.contributions(X, "fast")
+    expected, expected_base = fast_contributions(get_estimator(pipeline), X)
+    np.testing.assert_array_equal(values, expected)
+    np.testing.assert_array_equal(base_values, expected_base)
+    full, _ = pool.contributions(X, "full")
+    np.testing.assert_allclose(full, expected, atol=1e-5)
+
+
+def test_pool_rendu_image(pool, X_processed):
+    _, X = X_processed
+    values, base_values = pool.contributions(X[:1], "fast")
+    explanation = (values[0], base_values[0], X[0])
+    assert pool.render(explanation, "png").startswith(b"\x89PNG")
+    assert pool.render(explanation, "svg").startswith(b"<svg")
+    stats = pool.stats()
+    assert stats["running"] and stats["failed"] == 0
+    assert stats["tasks"] >= 2
+
+
+def test_pool_non_demarre():
+    pool = ExplanationPool(MODEL_PATH, max_workers=1)
+    assert not pool.running
+    with pytest.raises(RuntimeError):
+        pool.contributions(np.zeros((1, 52)))
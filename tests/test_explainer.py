@@ -0,0 +1,57 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from app.explainer import ExplainerRegistry, get_estimator
+
+
+def _fake_pipeline():
+    pipeline = MagicMock()
+    pipeline.named_steps = {"preprocessor": MagicMock(), "estimator": MagicMock()}
+    return pipeline
+
+
+def test_get_estimator_derniere_etape():
+    """Le classifieur est la dernière étape du pipeline."""
+    pipeline = _fake_pipeline()
+    assert get_estimator(pipeline) is pipeline.named_steps["estimator"]
+
+
+def test_explainer_construit_une_seule_fois():
+    """Deux appels sur le même modèle réutilisent le même explainer."""
+    registry = ExplainerRegistry()
+    pipeline = _fake_pipeline()
+    with patch("shap.TreeExplainer") as tree_explainer:
+        first = registry.get(pipeline)
+        second = registry.get(pipeline)
+    assert first is second
+    assert tree_explainer.call_count == 1
+    assert registry.build_count == 1
+    assert registry.build_time_ms is not None
+
+
+def test_explainer_reconstruit_si_modele_change():
+    """Un nouveau pipeline déclenche la reconstruction de l'explainer."""
+    registry = ExplainerRegistry()
+    with patch("shap.TreeExplainer", side_effect=lambda est: object()):
+        first = registry.get(_fake_pipeline())
+        second = registry.get(_fake_pipeline())
+    assert first is not second
+    assert registry.build_count == 2
+
+
+def test_explainer_partage_entre_threads():
+    """Des threads concurrents obtiennent tous la même instance."""
+    registry = ExplainerRegistry()
+    pipeline = _fake_pipeline()
+    results = []
+    with patch("shap.TreeExplainer", side_effect=lambda est: object()):
+        threads = [
+            threading.Thread(target=lambda: results.append(registry.get(pipeline)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert len({id(r) for r in results}) == 1
+    assert registry.build_count == 1
@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.explanation_store import ExplanationStore
+
+
+def test_store_aller_retour_float32(tmp_path):
+    """Score, contributions (float32) et image relus tels qu'écrits."""
+    store = ExplanationStore(str(tmp_path / "explanations.sqlite"))
+    store.put_many(
+        [
+            (1, "1.0", "abc", 0.7, -1.5, np.array([0.25, -0.5]), b"png"),
+            (2, "1.0", "def", 0.2, -1.5, [0.1, 0.3], None),
+        ]
+    )
+    stored = store.get(1, "1.0", "abc")
+    assert stored["score"] == 0.7
+    assert stored["base_value"] == -1.5
+    assert stored["contributions"].dtype == np.float32
+    assert stored["contributions"].tolist() == [0.25, -0.5]
+    assert stored["image_png"] == b"png"
+    assert store.get(2, "1.0", "def")["image_png"] is None
+    assert store.stats()["hits"] == 2
+
+
+def test_store_ligne_ou_version_differente(tmp_path):
+    """Une autre empreinte de ligne ou une autre version n'est pas servie."""
+    store = ExplanationStore(str(tmp_path / "explanations.sqlite"))
+    store.put_many([(1, "1.0", "abc", 0.7, -1.5, [0.25], None)])
+    assert store.get(1, "1.0", "autre") is None
+    assert store.get(1, "2.0", "abc") is None
+    assert store.delete_other_versions("2.0") == 1
+    assert store.get(1, "1.0", "abc") is None
+    assert store.stats()["misses"] == 3
+
+
+def test_store_fichier_absent(tmp_path):
+    """Sans fichier précalculé, les lectures sont des miss (calcul direct)."""
+    store = ExplanationStore(str(tmp_path / "absent.sqlite"))
+    assert store.get(1, "1.0", "abc") is None
+    assert store.stats() == {
+        "path": str(tmp_path / "absent.sqlite"),
+        "available": False,
+        "hits": 0,
+        "misses": 1,
+    }
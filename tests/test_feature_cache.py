@@ -0,0 +1,70 @@
+import os
+from unittest.mock import MagicMock
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.feature_cache import TransformedFeatureCache, predict_proba_processed
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _fake_pipeline():
+    preproc = MagicMock()
+    preproc.transform.side_effect = lambda df: df[["age"]].to_numpy() * 2.0
+    preproc.get_feature_names_out.return_value = ["num__age"]
+    pipeline = MagicMock()
+    pipeline.named_steps = {"preprocessor": preproc, "clf": MagicMock()}
+    return pipeline
+
+
+def test_cache_un_seul_passage_par_ligne():
+    """Le préprocesseur n'est appliqué qu'une fois par employé."""
+    cache = TransformedFeatureCache()
+    pipeline = _fake_pipeline()
+    rows = [{"id_employee": 1, "age": 30}, {"id_employee": 2, "age": 40}]
+    cache.build(pipeline, "1.0", rows)
+    X = cache.get_many(pipeline, "1.0", rows[::-1])
+    assert X.tolist() == [[80.0], [60.0]]
+    assert pipeline.named_steps["preprocessor"].transform.call_count == 1
+    assert cache.feature_names == ["num__age"]
+    assert cache.stats()["hits"] == 2
+
+
+def test_cache_ligne_modifiee_recalculee():
+    """Une ligne raw modifiée (empreinte différente) est re-préprocessée seule."""
+    cache = TransformedFeatureCache()
+    pipeline = _fake_pipeline()
+    cache.build(pipeline, "1.0", [{"id_employee": 1, "age": 30}])
+    X = cache.get(pipeline, "1.0", {"id_employee": 1, "age": 31})
+    assert X.tolist() == [[62.0]]
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_vide_si_modele_change():
+    """Un autre pipeline ou une autre version de modèle repart d'un cache vide."""
+    cache = TransformedFeatureCache()
+    pipeline = _fake_pipeline()
+    rows = [{"id_employee": 1, "age": 30}]
+    cache.build(pipeline, "1.0", rows)
+    cache.get_many(pipeline, "2.0", rows)
+    assert cache.stats()["misses"] == 1
+    cache.invalidate([1])
+    assert cache.stats()["rows"] == 0
+
+
+def test_predict_proba_processed_identique_au_pipeline():
+    """Le score sur features en cache est celui du pipeline complet."""
+    pipeline = joblib.load(os.path.join(ROOT, "models", "model_pipeline.joblib"))
+    raw = pd.read_csv(os.path.join(ROOT, "raw_full.csv"))
+    records = raw.to_dict(orient="records")
+    cache = TransformedFeatureCache()
+    cache.build(pipeline, "1.0", records)
+    X_processed = cache.get_many(pipeline, "1.0", records)
+    expected = pipeline.predict_proba(
+        raw.drop(columns=["id_employee", "attrition_num"])
+    )
+    np.testing.assert_allclose(
+        predict_proba_processed(pipeline, X_processed), expected, rtol=1e-6
+    )
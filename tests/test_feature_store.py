@@ -0,0 +1,113 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.feature_store import EmployeeStore
+
+
+@pytest.fixture
+def raw_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'raw.sqlite'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text("CREATE TABLE raw (id_employee INTEGER, age INTEGER, genre TEXT)")
+        )
+        conn.execute(
+            text("INSERT INTO raw VALUES (1, 35, 'M'), (2, 41, 'F'), (2, 99, 'X')")
+        )
+    return engine
+
+
+def test_store_lecture_employe(raw_engine):
+    """Une ligne est rendue en dict de types Python natifs."""
+    store = EmployeeStore(lambda: raw_engine)
+    row = store.get(1)
+    assert row == {"id_employee": 1, "age": 35, "genre": "M"}
+    assert type(row["age"]) is int
+    assert store.get(-1) is None
+
+
+def test_store_premiere_occurrence_et_ids(raw_engine):
+    """Les doublons d'id renvoient la première ligne, comme l'ancien SELECT."""
+    store = EmployeeStore(lambda: raw_engine)
+    assert store.get(2)["age"] == 41
+    assert store.ids() == [1, 2]
+    frame = store.get_many([2, -1, 1])
+    assert frame["id_employee"].tolist() == [2, 1]
+    assert frame["genre"].dtype == object
+
+
+def test_store_ajout_incremental(raw_engine):
+    """Un employé ajouté en fin de table est chargé seul au rafraîchissement."""
+    store = EmployeeStore(lambda: raw_engine, refresh_interval_s=0)
+    store.load()
+    with raw_engine.begin() as conn:
+        conn.execute(text("INSERT INTO raw VALUES (3, 28, 'F')"))
+    assert store.get(3) == {"id_employee": 3, "age": 28, "genre": "F"}
+    assert store.stats()["incremental_loads"] == 1
+    assert store.stats()["reloads"] == 1
+
+
+def test_store_rechargement_complet(raw_engine):
+    """Une suppression change la signature et déclenche un rechargement complet."""
+    store = EmployeeStore(lambda: raw_engine, refresh_interval_s=0)
+    store.load()
+    with raw_engine.begin() as conn:
+        conn.execute(text("DELETE FROM raw WHERE id_employee = 1"))
+    assert store.get(1) is None
+    assert store.stats()["reloads"] == 2
+
+
+def test_store_refresh_rows(raw_engine):
+    """refresh_rows relit les employés modifiés sans toucher aux autres."""
+    store = EmployeeStore(lambda: raw_engine, refresh_interval_s=3600)
+    store.load()
+    with raw_engine.begin() as conn:
+        conn.execute(text("UPDATE raw SET age = 36 WHERE id_employee = 1"))
+    assert store.get(1)["age"] == 35
+    store.refresh_rows([1])
+    assert store.get(1)["age"] == 36
+
+
+def test_store_modification_en_place(raw_engine):
+    """Un UPDATE sans changement du nombre de lignes est vu au rafraîchissement."""
+    store = EmployeeStore(lambda: raw_engine, refresh_interval_s=0)
+    store.load()
+    with raw_engine.begin() as conn:
+        conn.execute(text("UPDATE raw SET genre = 'F' WHERE id_employee = 1"))
+    assert store.get(1)["genre"] == "F"
+    assert store.stats()["reloads"] == 2
+
+
+def test_store_ajout_et_modification(raw_engine):
+    """Un ajout masquant un UPDATE ne passe pas par le chargement incrémental."""
+    store = EmployeeStore(lambda: raw_engine, refresh_interval_s=0)
+    store.load()
+    with raw_engine.begin() as conn:
+        conn.execute(text("UPDATE raw SET age = 36 WHERE id_employee = 1"))
+        conn.execute(text("INSERT INTO raw VALUES (3, 28, 'F')"))
+    assert store.get(1)["age"] == 36
+    assert store.get(3)["age"] == 28
+    assert store.stats()["incremental_loads"] == 0
+
+
+def test_store_surveillance_en_tache_de_fond(raw_engine):
+    """Avec le thread de surveillance, une lecture ne touche pas la base."""
+    engines = [raw_engine]
+    store = EmployeeStore(lambda: engines[0], refresh_interval_s=0.05)
+    store.load()
+    store.start_watching()
+    try:
+        with raw_engine.begin() as conn:
+            conn.execute(text("UPDATE raw SET age = 36 WHERE id_employee = 1"))
+        for _ in range(100):
+            if store.stats()["reloads"] == 2:
+                break
+            time.sleep(0.02)
+        engines[0] = None  # toute requête SQL sur une lecture échouerait
+        assert store.fresh
+        assert store.get(1)["age"] == 36
+    finally:
+        store.stop()
+        engines[0] = raw_engine
@@ -1,3 +1,4 @@
+import base64
 from unittest.mock import patch
 
 
@@ -11,6 +12,21 @@ def test_health(client):
     assert "env" in data
 
 
+def test_ready_apres_demarrage(client, monkeypatch):
+    """Teste /ready : 503 pendant le démarrage, 200 après le passage de chauffe."""
+    from app import api
+
+    monkeypatch.setattr(api, "EXPLAIN_WORKERS", 0)
+    api.app_ready.clear()
+    assert client.get("/ready").status_code == 503
+    assert client.get("/health").status_code == 200
+    api.start_up()
+    resp = client.get("/ready")
+    assert resp.status_code == 200
+    phases = resp.json()["startup_ms"]
+    assert "passage de chauffe" in phases and "total" in phases
+
+
 def test_employee_list(client):
     """Teste le endpoint /employee_list pour la récupération de la liste des employés."""
     resp = client.get("/employee_list")
@@ -99,7 +115,471 @@ def test_log_sample_table_inconnue(client):
 
 
 def test_predict_generic_error(client):
+    from app import api
+
+    # Résultat en cache servi sans calcul : le vider pour passer par predict_core
+    api.result_cache.clear()
     # Patch predict_core pour lever Exception et générer un 500
     with patch("app.api.predict_core", side_effect=Exception("Erreur test")):
         resp = client.get("/predict", params={"id_employee": 1})
         assert resp.status_code == 500
+
+
+def test_predict_batch_valid(client):
+    """Teste /predict/batch avec des IDs existants et un ID absent."""
+    resp = client.post("/predict/batch", json={"id_employees": [2, 1, -5, 2]})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["count"] == 2
+    assert [r["id_employee"] for r in body["results"]] == [2, 1]
+    assert body["not_found"] == [-5]
+    for r in body["results"]:
+        assert r["prediction"] in ("OUI", "NON")
+        assert isinstance(r["score"], float)
+        assert "shap_waterfall" in r
+        assert "shap_waterfall_img" not in r
+
+
+def test_predict_batch_trop_volumineux(client, monkeypatch):
+    """Teste /predict/batch au-delà de la taille maximale (réponse 400 attendue)."""
+    monkeypatch.setattr("app.api.BATCH_MAX_SIZE", 1)
+    resp = client.post("/predict/batch", json={"id_employees": [1, 2]})
+    assert resp.status_code == 400
+
+
+def test_predict_sans_image_par_defaut(client):
+    """Teste que /predict ne rend pas l'image sauf demande explicite."""
+    resp = client.get("/predict", params={"id_employee": 1})
+    assert resp.status_code == 200
+    assert resp.json()["shap_waterfall_img"] == ""
+
+
+def test_predict_avec_image(client):
+    """Teste /predict?with_image=true : image base64 PNG incluse."""
+    resp = client.get("/predict", params={"id_employee": 1, "with_image": True})
+    assert resp.status_code == 200
+    img = base64.b64decode(resp.json()["shap_waterfall_img"])
+    assert img.startswith(b"\x89PNG")
+
+
+def test_predict_explain_fast_egal_full(client):
+    """Teste explain=fast : mêmes contributions que SHAP (explain=full)."""
+    fast = client.get("/predict", params={"id_employee": 1}).json()
+    full = client.get("/predict", params={"id_employee": 1, "explain": "full"}).json()
+    assert fast["score"] == full["score"]
+    assert fast["shap_waterfall_img"] == ""
+    assert full["shap_waterfall_img"] != ""
+    assert fast["shap_waterfall"].keys() == full["shap_waterfall"].keys()
+    for name, value in full["shap_waterfall"].items():
+        assert abs(fast["shap_waterfall"][name] - value) < 1e-5
+
+
+def test_predict_explain_none(client):
+    """Teste explain=none : score seul, sans contributions."""
+    resp = client.post("/predict", json={"id_employee": 1, "explain": "none"})
+    assert resp.status_code == 200
+    assert resp.json()["shap_waterfall"] == {}
+    resp = client.post("/predict/batch", json={"id_employees": [1], "explain": "none"})
+    assert resp.json()["results"][0]["shap_waterfall"] == {}
+
+
+def test_predict_explain_invalide(client):
+    """Teste explain inconnu : erreur de validation 422."""
+    resp = client.get("/predict", params={"id_employee": 1, "explain": "slow"})
+    assert resp.status_code == 422
+
+
+def test_predict_cache_et_etag(client):
+    """Teste le cache de résultats et la revalidation ETag / If-None-Match."""
+    from app import api
+
+    api.result_cache.clear()
+    resp = client.get("/predict", params={"id_employee": 2})
+    etag = resp.headers["etag"]
+    hits = api.result_cache.hits
+    resp2 = client.get("/predict", params={"id_employee": 2})
+    assert resp2.json() == resp.json()
+    assert resp2.headers["etag"] == etag
+    assert api.result_cache.hits == hits + 1
+
+    resp3 = client.get(
+        "/predict", params={"id_employee": 2}, headers={"If-None-Match": etag}
+    )
+    assert resp3.status_code == 304
+    assert resp3.content == b""
+    # Autre mode d'explication : autre résultat, autre ETag
+    resp4 = client.post(
+        "/predict",
+        json={"id_employee": 2, "explain": "none"},
+        headers={"If-None-Match": etag},
+    )
+    assert resp4.status_code == 200
+    assert resp4.headers["etag"] != etag
+
+
+def test_predict_surcharge_503_retry_after(client, monkeypatch):
+    """Au-delà de PREDICT_MAX_IN_FLIGHT calculs en cours : 503 avec Retry-After."""
+    from app import api
+    from app.admission import AdmissionControl
+
+    admission = AdmissionControl(max_in_flight=1)
+    monkeypatch.setattr(api, "admission", admission)
+    api.result_cache.clear()
+    with admission.admit():
+        resp = client.get("/predict", params={"id_employee": 1})
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == str(api.PREDICT_RETRY_AFTER_S)
+    assert admission.stats()["rejected"] == 1
+    # Place libérée : la requête suivante est servie
+    assert client.get("/predict", params={"id_employee": 1}).status_code == 200
+
+
+def test_predict_admission_avant_le_pool_de_threads(client, monkeypatch):
+    """La place est prise avant l'attente d'un thread : la file d'attente est bornée."""
+    from app import api
+    from app.admission import AdmissionControl
+
+    admission = AdmissionControl(max_in_flight=1)
+    monkeypatch.setattr(api, "admission", admission)
+    seen = []
+
+    async def run_in_threadpool(func, *args):
+        seen.append(admission.in_flight)
+        return func(*args)
+
+    monkeypatch.setattr(api, "run_in_threadpool", run_in_threadpool)
+    api.result_cache.clear()
+    resp = client.get("/predict", params={"id_employee": 1, "explain": "none"})
+    assert resp.status_code == 200
+    assert seen == [1]
+    assert admission.stats()["in_flight"] == 0
+
+
+def test_predict_degrade_si_explication_saturee(client, monkeypatch):
+    """Aucun créneau d'explication à temps : score seul, ni cache ni ETag."""
+    import os
+
+    import joblib
+
+    from app import api
+    from app.admission import AdmissionControl
+    from app.model_registry import LoadedModel
+
+    path = os.path.join(
+        os.path.dirname(__file__), "..", "models", "model_pipeline.joblib"
+    )
+    monkeypatch.setattr(
+        api.model_registry, "current", LoadedModel(joblib.load(path), "test")
+    )
+    admission = AdmissionControl(explain_concurrency=1, explain_budget_ms=20)
+    monkeypatch.setattr(api, "admission", admission)
+    api.result_cache.clear()
+    with admission.explain_stage():
+        resp = client.get("/predict", params={"id_employee": 2, "with_image": True})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["prediction"] in ("OUI", "NON")
+    assert data["degraded"] == "explain_saturated"
+    assert data["shap_waterfall"] == {}
+    assert data["shap_waterfall_img"] == ""
+    assert "etag" not in resp.headers
+    assert admission.stats()["degraded"] == {"explain_saturated": 1}
+
+    # Créneau libre : explication complète
+    resp2 = client.get("/predict", params={"id_employee": 2})
+    assert resp2.json()["degraded"] is None
+    assert resp2.json()["shap_waterfall"]
+
+
+def test_explain_waterfall_png(client):
+    """Teste /explain/{id}/waterfall.png : PNG servi puis relu depuis le cache."""
+    from app import api
+
+    api.waterfall_cache.clear()
+    hits = api.waterfall_cache.hits
+    resp = client.get("/explain/2/waterfall.png")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "image/png"
+    assert resp.content.startswith(b"\x89PNG")
+    resp2 = client.get("/explain/2/waterfall.png")
+    assert resp2.content == resp.content
+    assert api.waterfall_cache.hits == hits + 1
+
+
+def test_explain_waterfall_svg(client):
+    """Teste /explain/{id}/waterfall.svg : SVG rendu sans matplotlib."""
+    resp = client.get("/explain/1/waterfall.svg")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("image/svg+xml")
+    assert resp.text.startswith("<svg")
+
+
+def test_explain_waterfall_inexistant(client):
+    """Teste /explain/{id}/waterfall.png pour un employé inexistant (404)."""
+    resp = client.get("/explain/-987/waterfall.png")
+    assert resp.status_code == 404
+
+
+def test_models_version_servie(client):
+    """Teste /models : la version servie est celle renvoyée par /predict."""
+    resp = client.get("/models")
+    assert resp.status_code == 200
+    fingerprint = resp.json()["current"]["fingerprint"]
+    res = client.get("/predict", params={"id_employee": 1}).json()
+    assert res["model_version"] == fingerprint
+
+
+def test_modele_reecrit_sous_le_meme_nom(client, monkeypatch, tmp_path):
+    """Un fichier de modèle réécrit en place : nouvelle empreinte, nouveaux ETag et score."""
+    import os
+    import shutil
+
+    import joblib
+
+    from app import api
+    from app.model_registry import ModelRegistry
+
+    source = os.path.join(
+        os.path.dirname(__file__), "..", "models", "model_pipeline.joblib"
+    )
+    path = tmp_path / "model_pipeline.joblib"
+    shutil.copy(source, path)
+    os.utime(path, (1000, 1000))
+    monkeypatch.setattr(api, "explain_pools_enabled", False)
+    registry = ModelRegistry(
+        str(tmp_path),
+        load=api.load_pipeline,
+        prepare=api.prepare_model,
+        default_version=api.MODEL_VERSION,
+        watch_interval_s=0,
+    )
+    monkeypatch.setattr(api, "model_registry", registry)
+    first = registry.load_latest()
+    params = {"id_employee": 1, "explain": "none"}
+    resp = client.get("/predict", params=params)
+    etag = resp.headers["etag"]
+
+    # Réentraînement déposé sous le même nom (ici : le modèle factice)
+    joblib.dump(api.DummyModel(), path)
+    os.utime(path, (2000, 2000))
+    second = registry.check()
+    assert second.version == first.version == api.MODEL_VERSION
+    assert second.fingerprint != first.fingerprint
+    resp2 = client.get("/predict", params=params, headers={"If-None-Match": etag})
+    assert resp2.status_code == 200
+    assert resp2.headers["etag"] != etag
+    assert resp2.json()["model_version"] == second.fingerprint
+    assert resp2.json()["score"] != resp.json()["score"]
+
+
+def test_models_rollback_sans_version_precedente(client):
+    """Teste /models/rollback sans version précédente : 409."""
+    resp = client.post("/models/rollback")
+    assert resp.status_code == 409
+
+
+def test_metrics(client):
+    """Teste /metrics : profondeur de file et compteurs du LogWriter exposés."""
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    stats = resp.json()["log_writer"]
+    assert {"queue_depth", "dropped", "written"} <= stats.keys()
+
+
+def test_employees_refresh_relit_les_employes_modifies(client):
+    """Teste /employees/refresh : la ligne modifiée en base est relue."""
+    import os
+    import sqlite3
+
+    from app import api
+
+    client.get("/employee_list")
+    age = api.employee_store.get(1)["age"]
+    conn = sqlite3.connect(os.environ["DB_NAME"])
+    conn.execute("UPDATE raw SET age = ? WHERE id_employee = 1", (age + 1,))
+    conn.commit()
+    try:
+        resp = client.post("/employees/refresh", json={"id_employees": [1, 1]})
+        assert resp.status_code == 200
+        assert resp.json() == {"refreshed": 1, "employees": 2}
+        assert api.employee_store.get(1)["age"] == age + 1
+    finally:
+        conn.execute("UPDATE raw SET age = ? WHERE id_employee = 1", (age,))
+        conn.commit()
+        conn.close()
+        client.post("/employees/refresh", json={"id_employees": [1]})
+
+
+def test_predict_new_employe_hors_base(client, monkeypatch):
+    """Teste /predict/new : score d'un employé absent de raw, colonnes dérivées calculées."""
+    import pandas as pd
+
+    from app import api
+    from app.reference_features import DERIVED_COLUMNS, RowFeaturizer
+
+    raw = pd.read_csv("raw_full.csv", float_precision="round_trip")
+    monkeypatch.setattr(api, "_featurizer", RowFeaturizer.from_frame(raw))
+    record = raw.iloc[0].to_dict()
+    features = {
+        k: (v.item() if hasattr(v, "item") else v)
+        for k, v in record.items()
+        if k not in DERIVED_COLUMNS
+    }
+    features["id_employee"] = 10**6
+    resp = client.post("/predict/new", json={"features": features})
+    assert resp.status_code == 200
+    res = resp.json()
+    assert res["prediction"] in ("OUI", "NON")
+    assert res["reference_version"] == api._featurizer.version
+    assert res["donnees_brutes"]["salaire_cat"] == record["salaire_cat"]
+
+    del features["revenu_mensuel"]
+    resp = client.post("/predict/new", json={"features": features})
+    assert resp.status_code == 422
+    assert "revenu_mensuel" in resp.json()["detail"]
+
+
+def test_predict_new_modele_factice(client, monkeypatch):
+    """Teste /predict/new avec MODEL_MOCK : score du modèle factice, pas d'erreur 500."""
+    import pandas as pd
+
+    from app import api
+    from app.model_registry import LoadedModel
+    from app.reference_features import DERIVED_COLUMNS, RowFeaturizer
+
+    monkeypatch.setattr(
+        api.model_registry, "current", LoadedModel(api.DummyModel(), "1.0")
+    )
+    raw = pd.read_csv("raw_full.csv", float_precision="round_trip")
+    monkeypatch.setattr(api, "_featurizer", RowFeaturizer.from_frame(raw))
+    features = {
+        k: (v.item() if hasattr(v, "item") else v)
+        for k, v in raw.iloc[0].to_dict().items()
+        if k not in DERIVED_COLUMNS
+    }
+    resp = client.post("/predict/new", json={"features": features})
+    assert resp.status_code == 200
+    assert resp.json()["score"] == 0.6
+    assert resp.json()["model_version"] == "1.0"
+
+
+def test_simulate_grille_de_scores(client, monkeypatch):
+    """Teste /simulate : surface de scores, point d'origine égal au score de base."""
+    import os
+
+    import joblib
+    import pandas as pd
+
+    from app import api
+    from app.model_registry import LoadedModel
+    from app.reference_features import RowFeaturizer
+
+    path = os.path.join(
+        os.path.dirname(__file__), "..", "models", "model_pipeline.joblib"
+    )
+    monkeypatch.setattr(
+        api.model_registry, "current", LoadedModel(joblib.load(path), "test")
+    )
+    raw = pd.read_csv("raw_full.csv", float_precision="round_trip")
+    monkeypatch.setattr(api, "_featurizer", RowFeaturizer.from_frame(raw))
+    grid = {
+        "revenu_mensuel": [2000, 3200, 8000, 15000],
+        "annees_depuis_la_derniere_promotion": [0, 1, 5],
+    }
+    resp = client.post("/simulate", json={"id_employee": 1, "grid": grid})
+    assert resp.status_code == 200
+    res = resp.json()
+    assert res["shape"] == [4, 3]
+    assert res["axes"] == grid
+    assert len(res["scores"]) == 4 and all(len(row) == 3 for row in res["scores"])
+    # Employé 1 : revenu 3200, dernière promotion il y a 1 an
+    assert res["scores"][1][1] == res["baseline_score"]
+    assert len({s for row in res["scores"] for s in row}) > 1
+    assert res["model_version"] == "test"
+
+    # Catégories inconnues du modèle (ordinale, one-hot) : 422, pas de score
+    for grid in ({"genre": ["M", "X"]}, {"domaine_etude": ["Astronomie"]}):
+        resp = client.post("/simulate", json={"id_employee": 1, "grid": grid})
+        assert resp.status_code == 422
+        assert next(iter(grid)) in resp.json()["detail"]
+
+
+def test_simulate_modele_factice(client, monkeypatch):
+    """Teste /simulate avec MODEL_MOCK : grille de scores constants, pas d'erreur 500."""
+    import pandas as pd
+
+    from app import api
+    from app.model_registry import LoadedModel
+    from app.reference_features import RowFeaturizer
+
+    monkeypatch.setattr(
+        api.model_registry, "current", LoadedModel(api.DummyModel(), "1.0")
+    )
+    raw = pd.read_csv("raw_full.csv", float_precision="round_trip")
+    monkeypatch.setattr(api, "_featurizer", RowFeaturizer.from_frame(raw))
+    grid = {"revenu_mensuel": [2000, 8000], "age": [30, 40, 50]}
+    resp = client.post("/simulate", json={"id_employee": 1, "grid": grid})
+    assert resp.status_code == 200
+    res = resp.json()
+    assert res["shape"] == [2, 3]
+    assert res["scores"] == [[0.6] * 3] * 2
+    assert res["baseline_score"] == 0.6
+
+
+def test_simulate_requetes_invalides(client, monkeypatch):
+    """Teste /simulate : colonne dérivée ou inconnue (422), grille trop grande (400)."""
+    from app import api
+
+    for grid in (
+        {"salaire_cat": ["Haut"]},
+        {"inconnue": [1]},
+        {"age": []},
+        {"revenu_mensuel": [3000, "abc"]},
+        {"age": [None]},
+    ):
+        resp = client.post("/simulate", json={"id_employee": 1, "grid": grid})
+        assert resp.status_code == 422
+    monkeypatch.setattr(api, "SIMULATE_MAX_POINTS", 10)
+    grid = {"age": list(range(20, 40))}
+    resp = client.post("/simulate", json={"id_employee": 1, "grid": grid})
+    assert resp.status_code == 400
+    resp = client.post("/simulate", json={"id_employee": 999999, "grid": {"age": [30]}})
+    assert resp.status_code == 404
+
+
+def test_predict_new_valeurs_invalides_422(client, monkeypatch):
+    """Teste /predict/new : type ou catégorie invalide refusé (422, champ nommé)."""
+    import os
+
+    import joblib
+    import pandas as pd
+
+    from app import api
+    from app.model_registry import LoadedModel
+    from app.reference_features import DERIVED_COLUMNS, RowFeaturizer
+
+    path = os.path.join(
+        os.path.dirname(__file__), "..", "models", "model_pipeline.joblib"
+    )
+    monkeypatch.setattr(
+        api.model_registry, "current", LoadedModel(joblib.load(path), "test")
+    )
+    raw = pd.read_csv("raw_full.csv", float_precision="round_trip")
+    monkeypatch.setattr(api, "_featurizer", RowFeaturizer.from_frame(raw))
+    features = {
+        k: (v.item() if hasattr(v, "item") else v)
+        for k, v in raw.iloc[0].to_dict().items()
+        if k not in DERIVED_COLUMNS
+    }
+    assert client.post("/predict/new", json={"features": features}).status_code == 200
+    for col, value in (
+        ("revenu_mensuel", "abc"),
+        ("age", None),
+        ("annees_dans_l_entreprise", True),
+        ("genre", "X"),
+        ("domaine_etude", "Astronomie"),
+        ("poste_departement", "Nouveau_Poste"),
+    ):
+        resp = client.post("/predict/new", json={"features": {**features, col: value}})
+        assert resp.status_code == 422, col
+        assert col in resp.json()["detail"]
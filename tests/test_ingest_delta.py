@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import sys
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import create_db
+import ingest_delta
+
+
+def _raw(n=50):
+    return pd.read_csv(os.path.join(ROOT, "raw_full.csv")).head(n)
+
+
+def test_diff_et_application_des_changements(tmp_path):
+    """Seuls les employés ajoutés, modifiés ou supprimés sont réécrits."""
+    data = _raw()
+    conn = sqlite3.connect(tmp_path / "raw.sqlite")
+    create_db.create_and_populate_table(conn, data)
+
+    ids = data["id_employee"].tolist()
+    extract = data[data["id_employee"] != ids[3]].copy()
+    extract.loc[extract["id_employee"] == ids[0], "age"] += 1
+    extract.loc[extract["id_employee"] == ids[1], "domaine_etude"] = None
+    new_row = data.iloc[[5]].assign(id_employee=max(ids) + 1)
+    extract = pd.concat([extract, new_row], ignore_index=True)
+
+    current = pd.read_sql("SELECT * FROM raw", conn)
+    extract = ingest_delta.align_extract(extract, current)
+    changes = ingest_delta.diff_extract(current, extract)
+    assert changes == {
+        "inserted": [max(ids) + 1],
+        "updated": sorted(ids[:2]),
+        "deleted": [ids[3]],
+        "unchanged": len(ids) - 3,
+    }
+
+    ingest_delta.apply_changes(conn, extract, changes)
+    loaded = pd.read_sql("SELECT * FROM raw ORDER BY id_employee", conn)
+    expected = extract.sort_values("id_employee").reset_index(drop=True)
+    pd.testing.assert_frame_equal(loaded, expected, check_dtype=False)
+
+    # Relancer avec le même extrait ne change plus rien
+    again = ingest_delta.diff_extract(loaded, extract)
+    conn.close()
+    assert again["inserted"] == again["updated"] == again["deleted"] == []
+    assert again["unchanged"] == len(extract)
+
+
+def test_application_annulee_en_cas_d_erreur(tmp_path):
+    """Une erreur pendant l'écriture laisse la table raw intacte."""
+    data = _raw(10)
+    conn = sqlite3.connect(tmp_path / "raw.sqlite")
+    create_db.create_and_populate_table(conn, data)
+    changes = {"inserted": [], "updated": [int(data["id_employee"][0])], "deleted": []}
+    # Colonne inconnue : l'INSERT échoue après le DELETE
+    broken = data.assign(colonne_inconnue=1)
+    try:
+        ingest_delta.apply_changes(conn, broken, changes)
+    except sqlite3.Error:
+        pass
+    else:
+        raise AssertionError("L'INSERT aurait dû échouer")
+    count = conn.execute("SELECT COUNT(*) FROM raw").fetchone()[0]
+    conn.close()
+    assert count == len(data)
@@ -0,0 +1,56 @@
+import threading
+
+from app.log_writer import LogWriter
+
+
+def test_log_writer_flush_ecrit_tout():
+    """Tous les enregistrements déposés sont écrits après flush."""
+    written = []
+    writer = LogWriter(written.extend, batch_size=10, flush_interval_ms=20)
+    for i in range(25):
+        assert writer.submit({"i": i})
+    writer.flush()
+    assert [r["i"] for r in written] == list(range(25))
+    assert writer.stats()["written"] == 25
+    assert writer.stats()["queue_depth"] == 0
+    writer.stop()
+
+
+def test_log_writer_lots_bornes():
+    """Aucun lot ne dépasse batch_size."""
+    sizes = []
+    writer = LogWriter(lambda recs: sizes.append(len(recs)), batch_size=4)
+    for i in range(10):
+        writer.submit(i)
+    writer.stop()
+    assert sum(sizes) == 10
+    assert max(sizes) <= 4
+
+
+def test_log_writer_file_pleine_compte_les_abandons():
+    """Quand la file est pleine, les enregistrements sont abandonnés et comptés."""
+    release = threading.Event()
+    writer = LogWriter(lambda recs: release.wait(), max_queue=1, batch_size=1)
+    writer.submit("en cours")
+    # Le thread est bloqué sur le premier lot : la file se remplit
+    while writer.stats()["queue_depth"] or not writer._thread.is_alive():
+        pass
+    writer.submit("en file")
+    assert writer.submit("abandonné") is False
+    assert writer.stats()["dropped"] == 1
+    release.set()
+    writer.stop()
+    assert writer.stats()["written"] == 2
+
+
+def test_log_writer_erreur_ecriture():
+    """Une erreur d'écriture est comptée sans arrêter le thread."""
+
+    def boom(records):
+        raise RuntimeError("base indisponible")
+
+    writer = LogWriter(boom, flush_interval_ms=10)
+    writer.submit({"x": 1})
+    writer.flush()
+    assert writer.stats()["failed"] == 1
+    writer.stop()
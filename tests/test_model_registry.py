@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from app.model_registry import ModelRegistry, version_of
+
+
+class FakePipeline:
+    def __init__(self, path):
+        with open(path) as f:
+            self.content = f.read()
+
+
+def _write(directory, name, content, mtime):
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(content)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_version_of():
+    assert version_of("models/model_pipeline-1.2.joblib", "1.0") == "1.2"
+    assert version_of("models/model_pipeline.joblib", "1.0") == "1.0"
+
+
+def test_load_latest_et_bascule(tmp_path):
+    """Un nouveau fichier est chargé, préparé puis activé ; l'ancien reste en réserve."""
+    _write(tmp_path, "model_pipeline.joblib", "v1", 1000)
+    prepared, retired = [], []
+    registry = ModelRegistry(
+        str(tmp_path),
+        load=FakePipeline,
+        prepare=prepared.append,
+        retire=retired.append,
+    )
+    first = registry.load_latest()
+    assert first.version == "1.0" and first.pipeline.content == "v1"
+    assert registry.check() is None
+
+    _write(tmp_path, "model_pipeline-2.0.joblib", "v2", 2000)
+    second = registry.check()
+    assert registry.current is second and second.version == "2.0"
+    assert registry.previous is first
+    assert prepared == [first, second]
+    assert retired == [first]
+    assert registry.stats()["available"] == ["1.0", "2.0"]
+
+
+def test_fichier_reecrit_change_d_empreinte(tmp_path):
+    """Même nom, contenu réécrit : même version, autre empreinte."""
+    _write(tmp_path, "model_pipeline.joblib", "v1", 1000)
+    registry = ModelRegistry(str(tmp_path), load=FakePipeline)
+    first = registry.load_latest()
+    _write(tmp_path, "model_pipeline.joblib", "v1bis", 2000)
+    second = registry.check()
+    assert second.version == first.version == "1.0"
+    assert second.pipeline.content == "v1bis"
+    assert second.fingerprint != first.fingerprint
+    assert first.fingerprint.startswith("1.0+")
+
+
+def test_rollback(tmp_path):
+    _write(tmp_path, "model_pipeline.joblib", "v1", 1000)
+    registry = ModelRegistry(str(tmp_path), load=FakePipeline)
+    first = registry.load_latest()
+    with pytest.raises(LookupError):
+        registry.rollback()
+    _write(tmp_path, "model_pipeline-2.0.joblib", "v2", 2000)
+    second = registry.check()
+    assert registry.rollback() is first
+    assert registry.current is first and registry.previous is second
+    # Le fichier déjà vu n'est pas réactivé par la surveillance
+    assert registry.check() is None
+
+
+def test_fichier_invalide_ignore(tmp_path):
+    """Un modèle illisible est compté en échec, la version servie ne change pas."""
+    _write(tmp_path, "model_pipeline.joblib", "v1", 1000)
+
+    def load(path):
+        if "casse" in path:
+            raise ValueError("fichier tronqué")
+        return FakePipeline(path)
+
+    registry = ModelRegistry(str(tmp_path), load=load)
+    first = registry.load_latest()
+    _write(tmp_path, "model_pipeline-casse.joblib", "", 2000)
+    assert registry.check() is None
+    assert registry.current is first
+    assert registry.stats()["failed"] == 1
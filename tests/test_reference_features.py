@@ -0,0 +1,93 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from app.reference_features import (
+    DERIVED_COLUMNS,
+    RowFeaturizer,
+    compute_reference_stats,
+    load_reference_stats,
+    save_reference_stats,
+)
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def _raw():
+    return pd.read_csv(os.path.join(ROOT, "raw_full.csv"), float_precision="round_trip")
+
+
+def test_featurize_reproduit_les_colonnes_derivees_de_raw():
+    """Ligne par ligne, les colonnes dérivées sont celles de l'ingestion complète."""
+    raw = _raw()
+    featurizer = RowFeaturizer.from_frame(raw)
+    for record in raw.to_dict("records"):
+        row = featurizer.featurize(record)
+        assert {c: row[c] for c in DERIVED_COLUMNS} == {
+            c: record[c] for c in DERIVED_COLUMNS
+        }
+
+
+def test_featurize_frame_identique_a_featurize():
+    raw = _raw()
+    featurizer = RowFeaturizer.from_frame(raw)
+    result = featurizer.featurize_frame(raw.drop(columns=list(DERIVED_COLUMNS)))
+    for col in DERIVED_COLUMNS:
+        np.testing.assert_array_equal(result[col].to_numpy(), raw[col].to_numpy())
+
+
+def test_artefact_versionne(tmp_path):
+    """La version ne dépend que du contenu ; l'artefact relu donne les mêmes lignes."""
+    raw = _raw()
+    stats = compute_reference_stats(raw)
+    assert compute_reference_stats(raw)["version"] == stats["version"]
+    assert compute_reference_stats(raw.head(1000))["version"] != stats["version"]
+    path = tmp_path / "reference_stats.json"
+    save_reference_stats(stats, path)
+    assert load_reference_stats(path) == stats
+    loaded = RowFeaturizer.load(path)
+    record = raw.iloc[0].to_dict()
+    assert loaded.featurize(record) == RowFeaturizer(stats).featurize(record)
+    assert loaded.info()["version"] == stats["version"]
+
+
+def test_valeurs_hors_population():
+    """Hors de l'intervalle observé : classe extrême ; groupe inconnu : celle
+    que le calcul complet donne à un groupe d'un seul employé."""
+    raw = _raw()
+    featurizer = RowFeaturizer.from_frame(raw)
+    record = raw.iloc[0].to_dict()
+    record.update(revenu_mensuel=10**7, poste_departement="Nouveau_Poste")
+    row = featurizer.featurize(record)
+    assert row["salaire_cat_eq"] == "Haut"
+    assert row["score_carriere_cat"] == "Haut"
+    assert row["position_salaire_poste"] == "Haut"
+    assert row["position_salaire_poste_anc"] == "Haut"
+    record.update(revenu_mensuel=1)
+    assert featurizer.featurize(record)["salaire_cat_eq"] == "Très bas"
+    frame = featurizer.featurize_frame(pd.DataFrame([record]))
+    assert frame["salaire_cat_eq"].tolist() == ["Très bas"]
+    assert frame["position_salaire_poste_anc"].tolist() == ["Haut"]
+
+
+def test_groupe_inconnu_comme_le_calcul_complet():
+    """Un employé seul dans son groupe : même catégorie que create_salary_features."""
+    sys.path.insert(0, os.path.join(ROOT, "scripts"))
+    import create_db
+
+    raw = _raw()
+    record = raw.iloc[0].to_dict()
+    record.update(poste_departement="Nouveau_Poste", annees_dans_le_poste_actuel=40)
+    batch = create_db.create_salary_features(
+        pd.concat([raw, pd.DataFrame([record])], ignore_index=True)
+    ).iloc[-1]
+    row = RowFeaturizer.from_frame(raw).featurize(record)
+    for col in ("position_salaire_poste", "position_salaire_poste_anc"):
+        assert row[col] == batch[col]
+    # Groupes d'un seul employé de raw_full.csv
+    sizes = raw.groupby(["poste_departement", "annees_dans_le_poste_actuel"])[
+        "id_employee"
+    ].transform("size")
+    assert set(raw.loc[sizes == 1, "position_salaire_poste_anc"]) == {"Haut"}
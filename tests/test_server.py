@@ -0,0 +1,14 @@
+import sys
+
+import pytest
+
+from app.server import memory_usage
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="/proc requis")
+def test_memory_usage():
+    """RSS, PSS et mémoire privée du processus, en Mo."""
+    memory = memory_usage()
+    assert memory["rss"] > 0
+    assert 0 < memory["private"] <= memory["rss"]
+    assert memory["pss"] <= memory["rss"]
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.sqlite_profile import create_sqlite_engine
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "prod.sqlite")
+    writer = create_sqlite_engine(path, role="writer")
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE raw (id_employee INTEGER, age INTEGER)"))
+        conn.execute(
+            text("CREATE TABLE api_log (log_id INTEGER PRIMARY KEY, event_type TEXT)")
+        )
+        conn.execute(
+            text("INSERT INTO raw VALUES (:id, 30)"),
+            [{"id": i} for i in range(100)],
+        )
+    writer.dispose()
+    return path
+
+
+def test_pragmas_du_profil(db_path):
+    """Écrivain en WAL / synchronous=NORMAL, lecteurs en lecture seule."""
+    writer = create_sqlite_engine(db_path, role="writer", busy_timeout_ms=2000)
+    reader = create_sqlite_engine(db_path, role="reader", mmap_mb=64)
+    with writer.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 2000
+    with reader.connect() as conn:
+        assert conn.execute(text("PRAGMA query_only")).scalar() == 1
+        assert conn.execute(text("PRAGMA mmap_size")).scalar() == 64 * 1024 * 1024
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO api_log (event_type) VALUES ('x')"))
+    with pytest.raises(ValueError):
+        create_sqlite_engine(db_path, role="admin")
+
+
+def test_ecritures_et_lectures_concurrentes_sans_verrou(db_path):
+    """Écritures de 8 threads et lectures de 8 threads en parallèle : aucun
+    « database is locked », aucune écriture perdue."""
+    writer = create_sqlite_engine(db_path, role="writer")
+    reader = create_sqlite_engine(db_path, role="reader", readers=4)
+    errors = []
+    n_threads, n_ops = 8, 50
+
+    def write(k):
+        try:
+            for i in range(n_ops):
+                with writer.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO api_log (event_type) VALUES (:e)"),
+                        {"e": f"stress-{k}-{i}"},
+                    )
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    def read():
+        try:
+            for _ in range(n_ops):
+                with reader.connect() as conn:
+                    assert (
+                        conn.execute(text("SELECT count(*) FROM raw")).scalar() == 100
+                    )
+                    conn.execute(text("SELECT count(*) FROM api_log")).scalar()
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(k,)) for k in range(n_threads)]
+    threads += [threading.Thread(target=read) for _ in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    with reader.connect() as conn:
+        count = conn.execute(text("SELECT count(*) FROM api_log")).scalar()
+    assert count == n_threads * n_ops
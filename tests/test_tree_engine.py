@@ -0,0 +1,53 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from xgboost import XGBClassifier
+
+from app.explainer import get_estimator
+from app.tree_engine import FlatTreeEnsemble
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_moteur_numpy_modele_de_production():
+    """Même probabilité (à 1e-6) que predict_proba sur toute la table raw."""
+    pipeline = joblib.load(os.path.join(ROOT, "models", "model_pipeline.joblib"))
+    raw = pd.read_csv(os.path.join(ROOT, "raw_full.csv"))
+    X = pipeline.named_steps["preprocessor"].transform(
+        raw.drop(columns=["id_employee", "attrition_num"])
+    )
+    estimator = get_estimator(pipeline)
+    engine = FlatTreeEnsemble.from_xgb(estimator)
+    np.testing.assert_allclose(
+        engine.predict_proba(X), estimator.predict_proba(X), atol=1e-6
+    )
+
+
+def test_moteur_numpy_arbres_profonds_et_manquants():
+    """Arbres de profondeur > 1 et valeurs manquantes (branche par défaut)."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 6))
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    estimator = XGBClassifier(n_estimators=30, max_depth=4).fit(X, y)
+    engine = FlatTreeEnsemble.from_xgb(estimator)
+    assert engine.max_depth == 4
+    np.testing.assert_allclose(
+        engine.predict_proba(X), estimator.predict_proba(X), atol=1e-6
+    )
+    # Une seule ligne (vecteur 1D)
+    np.testing.assert_allclose(
+        engine.predict_proba(X[0]), estimator.predict_proba(X[:1]), atol=1e-6
+    )
+
+
+def test_moteur_numpy_objectif_non_supporte():
+    """Seul l'objectif binary:logistic est exporté."""
+    X = np.arange(20, dtype=float).reshape(10, 2)
+    y = np.arange(10) % 3
+    estimator = XGBClassifier(n_estimators=2).fit(X, y)
+    with pytest.raises(NotImplementedError):
+        FlatTreeEnsemble.from_xgb(estimator)
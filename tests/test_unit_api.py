@@ -11,7 +11,9 @@ from app.api import (
     log_model_output,
     log_api_event,
     get_raw_employee,
+    get_raw_employees,
     predict_core,
+    predict_batch_core,
     get_engine,
 )
 
@@ -60,6 +62,48 @@ def test_log_api_event_error():
     )
 
 
+def test_write_log_batch_lien_entree_sortie():
+    """Teste l'écriture groupée : chaque sortie référence l'input_id de son appel."""
+    from sqlalchemy import text
+
+    from app import api
+
+    record = {
+        "input": {"id_employee": 2},
+        "outputs": [{"prediction": "NON"}, {"prediction": "OUI"}],
+        "model_version": "test-batch",
+        "event": {"event_type": "predict", "req": {"id_employee": 2}},
+    }
+    api.write_log_batch([record])
+    with api.engine_log.connect() as conn:
+        last_input = conn.execute(text("SELECT max(rowid) FROM model_input")).scalar()
+        linked = conn.execute(
+            text("SELECT input_id FROM model_output WHERE model_version = 'test-batch'")
+        ).fetchall()
+    assert [row[0] for row in linked] == [last_input, last_input]
+
+
+def test_log_call_asynchrone():
+    """Teste que log_call dépose l'appel dans le LogWriter (écrit après flush)."""
+    from sqlalchemy import text
+
+    from app import api
+
+    api.log_call(
+        {"id_employee": 1},
+        [{"prediction": "OUI"}],
+        model_version="test-async",
+        event_type="predict",
+        http_code=200,
+    )
+    api.log_writer.flush()
+    with api.engine_log.connect() as conn:
+        n = conn.execute(
+            text("SELECT count(*) FROM model_output WHERE model_version = 'test-async'")
+        ).scalar()
+    assert n == 1
+
+
 def test_get_raw_employee_trouve():
     """Teste la récupération des infos d’un employé existant via get_raw_employee."""
     emp = get_raw_employee(1)
@@ -91,6 +135,39 @@ def test_predict_core():
     assert résultat["id_employee"] == 1
 
 
+def test_get_raw_employees():
+    """Teste la récupération groupée de plusieurs employés en une requête."""
+    df = get_raw_employees([1, 2, -999])
+    assert sorted(df["id_employee"].tolist()) == [1, 2]
+
+
+def test_predict_batch_core():
+    """Teste la prédiction par lot : ordre conservé, doublons et absents gérés."""
+    results, not_found = predict_batch_core([2, -999, 1, 2])
+    assert [r["id_employee"] for r in results] == [2, 1]
+    assert not_found == [-999]
+    single = predict_core(1)
+    assert results[1]["score"] == single["score"]
+    assert results[1]["shap_waterfall"] == single["shap_waterfall"]
+
+
+def test_warm_up_idempotent():
+    """Teste le préchargement : la table raw n'est lue qu'une fois."""
+    import app.api
+
+    app.api.warm_up()
+    loads = app.api.employee_store.reloads
+    app.api.warm_up()
+    assert app.api.employee_store.loaded
+    assert app.api.employee_store.reloads == loads
+
+
+def test_predict_batch_core_vide():
+    """Teste la prédiction par lot sans aucun employé trouvé."""
+    assert predict_batch_core([]) == ([], [])
+    assert predict_batch_core([-1]) == ([], [-1])
+
+
 def test_get_engine_role_inconnu():
     with pytest.raises(ValueError):
         get_engine("unknownrole")
@@ -134,6 +211,9 @@ def test_log_model_input_other_dialect(monkeypatch):
 def test_predict_core_real_pipeline(monkeypatch):
     import numpy as np
 
+    from app import api
+    from app.model_registry import LoadedModel
+
     # -- Mock de get_raw_employee --
     class DummyRow:
         def to_dict(self):
@@ -147,52 +227,173 @@ def test_predict_core_real_pipeline(monkeypatch):
     dummy_preproc.get_feature_names_out.return_value = ["age", "salaire"]
 
     dummy_estimator = MagicMock()
+    # Le score est calculé sur les features préprocessées (cache)
+    dummy_estimator.predict_proba.return_value = [[0.4, 0.6]]
 
     dummy_shap_explanation = MagicMock()
     dummy_shap_explanation.values.tolist.return_value = [0.5, -0.2]
     dummy_shap_values = [dummy_shap_explanation]
     dummy_explainer = MagicMock(return_value=dummy_shap_values)
-    dummy_plt = MagicMock()
-    dummy_buf = MagicMock()
-    dummy_buf.read.return_value = b"testimg"
     dummy_base64 = MagicMock()
     dummy_base64.b64encode.return_value.decode.return_value = "imgb64"
 
-    with patch("app.api.model_pipeline") as mp:
-        mp.named_steps = {"preprocessor": dummy_preproc, "estimator": dummy_estimator}
-        mp.predict_proba.return_value = [[0.4, 0.6]]
-        mp.__class__.__name__ = "NotDummyModel"
+    mp = MagicMock()
+    mp.named_steps = {"preprocessor": dummy_preproc, "estimator": dummy_estimator}
+    mp.predict_proba.return_value = [[0.4, 0.6]]
+    with patch.object(api.model_registry, "current", LoadedModel(mp, "test")):
         with patch("shap.TreeExplainer", return_value=dummy_explainer):
-            with patch("shap.plots.waterfall", return_value=None):
-                with patch("matplotlib.pyplot", dummy_plt):
-                    with patch("io.BytesIO", lambda: dummy_buf):
-                        with patch("base64.b64encode", dummy_base64.b64encode):
-                            import app.api
-
-                            res = app.api.predict_core(1)
-                            assert res["prediction"] == "OUI"
-                            assert res["score"] == 0.6
-                            assert "shap_waterfall_img" in res
-                            assert res["shap_waterfall"] == {
-                                "age": 0.5,
-                                "salaire": -0.2,
-                            }
+            with patch("app.api.render_waterfall", return_value=b"testimg"):
+                with patch("base64.b64encode", dummy_base64.b64encode):
+                    import app.api
+
+                    res = app.api.predict_core(1, explain="full")
+                    assert res["prediction"] == "OUI"
+                    assert res["score"] == 0.6
+                    assert "shap_waterfall_img" in res
+                    assert res["shap_waterfall"] == {
+                        "age": 0.5,
+                        "salaire": -0.2,
+                    }
 
     # Variante pour le else (pas de get_feature_names_out)
     del dummy_preproc.get_feature_names_out
-    with patch("app.api.model_pipeline") as mp:
-        mp.named_steps = {"preprocessor": dummy_preproc, "estimator": dummy_estimator}
-        mp.predict_proba.return_value = [[0.4, 0.6]]
-        mp.__class__.__name__ = "NotDummyModel"
+    # Même employé, même version : vider le cache de résultats
+    api.result_cache.clear()
+    mp = MagicMock()
+    mp.named_steps = {"preprocessor": dummy_preproc, "estimator": dummy_estimator}
+    mp.predict_proba.return_value = [[0.4, 0.6]]
+    with patch.object(api.model_registry, "current", LoadedModel(mp, "test")):
         with patch("shap.TreeExplainer", return_value=dummy_explainer):
-            with patch("shap.plots.waterfall", return_value=None):
-                with patch("matplotlib.pyplot", dummy_plt):
-                    with patch("io.BytesIO", lambda: dummy_buf):
-                        with patch("base64.b64encode", dummy_base64.b64encode):
-                            import app.api
-
-                            res2 = app.api.predict_core(1)
-                            assert list(res2["shap_waterfall"].keys()) == [
-                                "feat_0",
-                                "feat_1",
-                            ]
+            with patch("app.api.render_waterfall", return_value=b"testimg"):
+                with patch("base64.b64encode", dummy_base64.b64encode):
+                    import app.api
+
+                    res2 = app.api.predict_core(1, explain="full")
+                    assert list(res2["shap_waterfall"].keys()) == [
+                        "feat_0",
+                        "feat_1",
+                    ]
+
+
+def test_predict_core_lit_le_store_d_explications(monkeypatch, tmp_path):
+    """Explication précalculée : ni score ni contributions recalculés."""
+    import base64
+
+    from app import api
+    from app.cache import hash_row
+    from app.explanation_store import ExplanationStore
+    from app.model_registry import LoadedModel
+
+    row = {"id_employee": 1, "attrition_num": 0, "age": 45, "salaire": 2200}
+    monkeypatch.setattr("app.api.get_raw_employee", lambda _id: pd.Series(row))
+    store = ExplanationStore(str(tmp_path / "explanations.sqlite"))
+    entry = (hash_row(row), 0.7, -1.0, [0.25, -0.5], b"png")
+    # Même version, autre fichier (réentraîné) : entrée jamais servie
+    store.put_many([(1, "test+ancien", *entry), (1, "test+abc", *entry)])
+    store.put_many([(2, "test+ancien", *entry)])
+    monkeypatch.setattr(api, "explanation_store", store)
+
+    dummy_preproc = MagicMock()
+    dummy_preproc.get_feature_names_out.return_value = ["age", "salaire"]
+    mp = MagicMock()
+    mp.named_steps = {"preprocessor": dummy_preproc}
+    api.result_cache.clear()
+    model = LoadedModel(mp, "test", digest="abc")
+    with patch.object(api.model_registry, "current", model):
+        res = api.predict_core(1, with_image=True)
+        assert api.explanation_store.get(2, model.fingerprint, hash_row(row)) is None
+    assert res["score"] == 0.7
+    assert res["prediction"] == "OUI"
+    assert res["shap_waterfall"] == {"age": 0.25, "salaire": -0.5}
+    assert res["shap_waterfall_img"] == base64.b64encode(b"png").decode("utf-8")
+    dummy_preproc.transform.assert_not_called()
+    assert store.stats()["hits"] == 1
+
+
+def test_alog_call_ecriture_async(monkeypatch):
+    """Sans LOG_ASYNC, alog_call écrit les trois tables sans attendre le LogWriter."""
+    import asyncio
+
+    from sqlalchemy import text
+
+    from app import api
+
+    monkeypatch.setattr(api, "LOG_ASYNC", False)
+    asyncio.run(
+        api.alog_call(
+            {"id_employee": 1},
+            [{"prediction": "OUI"}],
+            model_version="test-aio",
+            event_type="predict",
+            http_code=200,
+        )
+    )
+    with api.engine_log.connect() as conn:
+        n = conn.execute(
+            text("SELECT count(*) FROM model_output WHERE model_version = 'test-aio'")
+        ).scalar()
+    assert n == 1
+
+
+def test_predict_et_log_sample_synchrones():
+    """Les versions synchrones restent utilisables hors serveur (scripts)."""
+    from app import api
+
+    api.result_cache.clear()
+    result = api.predict(1)
+    assert result["id_employee"] == 1
+    not_modified = api.predict(
+        1, if_none_match=api.predict_outcome(1, False, "fast", None)[1]
+    )
+    assert not_modified.status_code == 304
+    assert isinstance(api.log_sample("api_log", n=2), list)
+    assert api.log_sample("inconnue") == {"error": "Table inconnue"}
+
+
+def test_lifespan_rend_la_main_avant_la_chauffe(monkeypatch):
+    """Le serveur peut ouvrir son socket avant la fin du démarrage : /ready 503 puis 200."""
+    import asyncio
+    import threading
+
+    from app import api
+    from app.model_registry import LoadedModel
+
+    release = threading.Event()
+    monkeypatch.setattr(api, "warm_up", lambda: release.wait(5))
+    monkeypatch.setattr(
+        api.model_registry, "current", LoadedModel(api.DummyModel(), "1.0")
+    )
+    monkeypatch.setattr(api.log_writer, "stop", lambda: None)
+
+    async def run():
+        async with api.lifespan(api.app):
+            with pytest.raises(HTTPException) as exc:
+                api.ready()
+            assert exc.value.status_code == 503
+            release.set()
+            assert await asyncio.to_thread(api.app_ready.wait, 5)
+            assert api.ready()["ready"] is True
+
+    asyncio.run(run())
+
+
+def test_dispose_async_engines():
+    """À l'arrêt, les pools async de la boucle sont fermés, ceux des boucles
+    terminées oubliés."""
+    import asyncio
+
+    from app import api
+
+    async def create():
+        return api.get_async_engine(api.engine_log)
+
+    first = asyncio.run(create())
+
+    async def run():
+        api.get_async_engine(api.engine_log)
+        assert len(api._async_engines) >= 2
+        await api.dispose_async_engines()
+
+    asyncio.run(run())
+    assert not any(e is first for e in api._async_engines.values())
+    assert all(not loop.is_closed() for _, loop in api._async_engines)
@@ -0,0 +1,43 @@
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.waterfall import waterfall_png, waterfall_rows, waterfall_svg
+
+NAMES = [f"f{i}" for i in range(15)]
+VALUES = np.linspace(-0.7, 0.7, 15)
+
+
+def test_rows_cumul_depuis_la_base():
+    """La ligne du haut se termine sur f(x) = base + somme des contributions."""
+    rows = waterfall_rows(VALUES, -1.0, NAMES, max_display=10)
+    assert len(rows) == 10
+    assert rows[-1][0] == "6 autres features"
+    assert rows[-1][2] == -1.0
+    assert rows[0][3] == pytest.approx(-1.0 + VALUES.sum())
+    # Les contributions affichées sont triées par valeur absolue décroissante
+    shown = [abs(contrib) for _, contrib, _, _ in rows[:-1]]
+    assert shown == sorted(shown, reverse=True)
+
+
+def test_rows_libelle_avec_valeur():
+    rows = waterfall_rows([0.2], 0.0, ["num__age"], data=[1.23456])
+    assert rows == [("1.23 = num__age", 0.2, 0.0, 0.2)]
+
+
+def test_svg_bien_forme():
+    """Le SVG est un XML valide, avec une barre par ligne affichée."""
+    svg = waterfall_svg(VALUES, -1.0, NAMES, data=np.ones(15))
+    root = ET.fromstring(svg)
+    bars = [el for el in root if el.tag.endswith("rect")][1:]
+    assert len(bars) == 10
+
+
+def test_png_rendu_en_parallele():
+    """Plusieurs threads rendent en même temps des images identiques."""
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        images = list(pool.map(lambda _: waterfall_png(VALUES, -1.0, NAMES), range(8)))
+    assert all(img.startswith(b"\x89PNG") for img in images)
+    assert len(set(images)) == 1